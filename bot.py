@@ -3,7 +3,10 @@ import logging
 import sys
 import os
 
-from aiogram import Bot, Dispatcher, types
+from aiogram import Bot, Dispatcher, types, F
+from aiogram.client.default import DefaultBotProperties
+from aiogram.filters import Command, CommandObject
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage # Using MemoryStorage for simplicity in this example
 # If you need persistent FSM state, consider SQLAlchemyStorage or RedisStorage
@@ -16,6 +19,7 @@ import services.scheduler as scheduler_service
 import services.telegram_api as telegram_api_service # Assuming this exists and is needed
 import services.content_manager as content_manager_service # Assuming this exists and is needed
 import services.rss as rss_service # Assuming this exists and is needed
+import services.dead_chats as dead_chats_service
 
 # Import handlers
 from handlers import (
@@ -31,6 +35,9 @@ from handlers import (
 # Import ReplyKeyboard from keyboards
 from keyboards.reply_keyboards import get_main_menu_keyboard
 
+# Per-update shared DB session
+from utils.db_middleware import DbSessionMiddleware
+
 # Configure logging
 # The utils.logger module should handle the actual configuration (console and file output)
 # Import the logger config to ensure handlers are added
@@ -55,6 +62,24 @@ if not DATABASE_URL:
     logger.critical("DATABASE_URL environment variable not set!")
     sys.exit(1)
 
+# HTTP connection pool of the Bot API client: aiohttp opens one keep-alive connection per in-flight request,
+# so the pool must be larger than the number of concurrent sends (services.telegram_api.BROADCAST_MAX_CONCURRENCY)
+TELEGRAM_HTTP_POOL_SIZE = int(os.getenv("TELEGRAM_HTTP_POOL_SIZE", "100"))
+TELEGRAM_HTTP_KEEPALIVE_SECONDS = 75 # Keep idle connections open between broadcast batches and scheduled posts (aiohttp default: 15)
+
+
+def _create_bot_session() -> AiohttpSession:
+    """Bot API session with a connection pool sized for concurrent broadcasts."""
+    session = AiohttpSession(limit=TELEGRAM_HTTP_POOL_SIZE)
+    # AiohttpSession exposes only `limit`; the other TCPConnector arguments are set on its connector config
+    # (applied whenever it builds the connector, so its TLS/DNS/proxy handling stays aiogram's own)
+    session._connector_init.update(
+        limit_per_host=TELEGRAM_HTTP_POOL_SIZE, # All requests go to api.telegram.org
+        keepalive_timeout=TELEGRAM_HTTP_KEEPALIVE_SECONDS,
+    )
+    return session
+
+
 # Get logging level from environment variables
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 # Set the logging level based on environment variable
@@ -78,7 +103,7 @@ async def main() -> None:
 
 
     # Initialize Bot, Dispatcher and Storage
-    bot = Bot(BOT_TOKEN, parse_mode=ParseMode.HTML)
+    bot = Bot(BOT_TOKEN, session=_create_bot_session(), default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
     # Use SQLAlchemyStorage for persistent FSM state
     # Pass the async_session_maker from db_service
@@ -99,6 +124,9 @@ async def main() -> None:
 
     dp = Dispatcher(storage=storage)
 
+    # One DB session/transaction per incoming update (see services.db.session_scope)
+    dp.update.outer_middleware(DbSessionMiddleware())
+
     # Pass necessary services to workflow_data
     # These services can then be accessed in handlers using dependency injection
     services_container = type('ServicesContainer', (object,), {
@@ -160,6 +188,35 @@ async def main() -> None:
             await message.answer("Произошла ошибка при инициализации вашего аккаунта. Попробуйте позже.")
 
 
+    # Снять отметку "мертвого" чата (services/dead_chats.py), чтобы рассылки снова отправляли в него посты.
+    # Доступно владельцу чата в боте: чат должен быть среди его каналов.
+    @dp.message(Command("reset_chat"))
+    async def handle_reset_chat_command(message: types.Message, command: CommandObject):
+        try:
+            chat_id = int((command.args or "").strip())
+        except ValueError:
+            await message.answer("Использование: /reset_chat <ID чата>")
+            return
+        try:
+            user = await db_service.get_or_create_user(message.from_user.id)
+            user_chat_ids = {channel.chat_id for channel in await db_service.get_user_channels(user.id, active_only=False)}
+            if chat_id not in user_chat_ids:
+                await message.answer("Этот чат не найден среди ваших каналов.")
+                return
+            if await dead_chats_service.reset(chat_id):
+                await message.answer(f"Чат {chat_id} снова будет получать посты.")
+            else:
+                await message.answer(f"Чат {chat_id} не был отключен.")
+        except Exception as e:
+            logger.error(f"Error handling reset_chat command for user {message.from_user.id}: {e}", exc_info=True)
+            await message.answer("Произошла ошибка. Попробуйте позже.")
+
+    # Бота снова добавили в чат (или разблокировали): снимаем отметку "мертвого" чата
+    @dp.my_chat_member(F.new_chat_member.status.in_({"member", "administrator"}))
+    async def handle_bot_added_to_chat(event: types.ChatMemberUpdated):
+        await dead_chats_service.reset(event.chat.id)
+
+
     # Start polling
     logger.info("Starting bot polling...")
     try:
@@ -170,7 +227,7 @@ async def main() -> None:
         # Ensure scheduler is shut down gracefully
         logger.info("Shutting down scheduler...")
         # Pass the scheduler instance to shutdown
-        await scheduler_service.shutdown_scheduler(scheduler_service.scheduler, wait=True) # Wait for jobs to finish
+        await scheduler_service.shutdown_scheduler(scheduler_service.get_scheduler(), wait=True) # Wait for jobs to finish
         logger.info("Scheduler shutdown complete.")
 
         # Ensure database connection pool is disposed
@@ -1,7 +1,9 @@
 # bot_tasks.py
+import asyncio
 import logging
 import datetime
-import pytz
+import operator
+from typing import Any
 
 # Assume these classes/types are defined elsewhere in your project
 # Import actual models and services
@@ -18,23 +20,53 @@ logger = logging.getLogger(__name__)
 # Note: Actual handler configuration is in utils.logger.py
 
 
-# Update function signatures to accept services and bot as keyword arguments
-# This aligns with _get_job_services in scheduler.py
-async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_service, content_manager_service, scheduler_service):
+# Реестр сервисов процесса. Заполняется один раз при старте (scheduler.initialize_and_start_scheduler
+# вызывает register_services). Задачи APScheduler хранят в БД только id сущностей, а сервисы
+# (bot, db_service, ...) исполнители берут отсюда: они не сериализуются в строки apscheduler_jobs.
+_SERVICES: dict[str, Any] = {}
+
+# Сервисы, которые нужны исполнителям задач; имена совпадают с атрибутами services_container из bot.py
+_REQUIRED_SERVICES = (
+    'bot',
+    'db_service',
+    'telegram_api_service',
+    'content_manager_service',
+    'scheduler_service', # Post publish schedules deletion of the sent messages
+    'rss_service', # RSS checks call functions within rss_service
+)
+
+
+# Готовые геттеры: набор сервисов исполнителя извлекается из реестра одним вызовом (C-level itemgetter)
+_get_post_services = operator.itemgetter('bot', 'db_service', 'telegram_api_service', 'content_manager_service', 'scheduler_service')
+_get_deletion_services = operator.itemgetter('bot', 'telegram_api_service')
+_get_rss_services = operator.itemgetter('bot', 'db_service', 'telegram_api_service', 'content_manager_service', 'rss_service')
+
+
+def register_services(services_container: Any) -> None:
+    """
+    Регистрирует сервисы из services_container для исполнителей задач.
+    Отсутствующие сервисы регистрируются как None с предупреждением.
+    """
+    _SERVICES.update((name, getattr(services_container, name, None)) for name in _REQUIRED_SERVICES)
+    for service_name in _REQUIRED_SERVICES:
+        if _SERVICES[service_name] is None:
+            logger.warning(f"Required service '{service_name}' not found in services_container for task executors.")
+
+
+# Services are taken from the _SERVICES registry (see register_services), not from job kwargs
+async def execute_scheduled_post(post_id: int):
     """
     Исполнитель задачи APScheduler для публикации отложенного поста.
 
     Извлекает данные поста из БД, публикует его в указанных каналах,
     и при необходимости планирует задачу автоудаления сообщения.
+    Сервисы (bot, db_service, telegram_api_service, content_manager_service, scheduler_service)
+    берутся из реестра _SERVICES.
 
     Args:
         post_id (int): ID поста для публикации.
-        bot: Экземпляр объекта бота (aiogram.Bot).
-        db_service: Экземпляр сервиса для работы с БД.
-        telegram_service: Экземпляр сервиса для работы с Telegram API.
-        content_manager_service: Экземпляр сервиса для подготовки контента.
-        scheduler_service: Экземпляр сервиса для планирования задач.
     """
+    bot, db_service, telegram_api_service, content_manager_service, scheduler_service = _get_post_services(_SERVICES)
     logger.info(f"Запущена задача execute_scheduled_post для поста ID: {post_id}")
 
     post = None
@@ -65,6 +97,7 @@ async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_
         sent_to_count = 0
         failed_to_count = 0
         successfully_sent_messages = [] # Store successfully sent message objects
+        pending_deletions: list[tuple[int, list[int], datetime.datetime]] = [] # (chat_id, message_ids, delete_at_utc), stored with the status update
 
         # Prepare content using content_manager_service
         # content_manager_service.prepare_content needs Post object data
@@ -84,6 +117,7 @@ async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_
              return # Cannot publish if content preparation fails
 
 
+        target_chat_ids: list[int] = []
         for chat_id in post.chat_ids:
             # Ensure chat_id is int for telegram_api_service calls
             try:
@@ -92,88 +126,67 @@ async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_
                  logger.error(f"Invalid chat_id found in post {post_id}: '{chat_id}'. Skipping.")
                  failed_to_count += 1
                  continue
+            target_chat_ids.append(chat_id_int)
+        target_chat_ids = list(dict.fromkeys(target_chat_ids)) # Each channel once, order kept
 
+        # TODO: Реализовать проверку прав бота на публикацию в конкретном канале
+        # Это можно сделать здесь или в telegram_api_service.send_post
+        # Let's assume send_post in telegram_api_service handles basic errors like permissions.
+        # A dedicated check_bot_permissions here would be more proactive.
+        # is_bot_admin, bot_can_post = await telegram_api_service.is_bot_admin_in_channel(bot, chat_id_int)
 
-            logger.info(f"Пост ID {post_id}: Попытка публикации в канал {chat_id_int}")
-
-            # TODO: Реализовать проверку прав бота на публикацию в конкретном канале
-            # Это можно сделать здесь или в telegram_api_service.send_post
-            # Let's assume send_post in telegram_api_service handles basic errors like permissions.
-            # A dedicated check_bot_permissions here would be more proactive.
-            # is_bot_admin, bot_can_post = await telegram_api_service.is_bot_admin_in_channel(bot, chat_id_int)
-            # if not is_bot_admin or not bot_can_post:
-            #      logger.error(f"Пост ID {post_id}: Боту не хватает прав для публикации в канале {chat_id_int}. Пропускаю этот канал.")
-            #      failed_to_count += 1
-            #      # TODO: Возможно, уведомить пользователя об ошибке отправки в конкретный канал
-            #      continue # Skip this channel
-
-            try:
-                # Отправляем сообщение
-                # telegram_api_service.send_post returns Optional[List[Message]]
-                sent_messages_list = await telegram_api_service.send_post(
-                    bot=bot,
-                    chat_id=chat_id_int,
-                    text=post_text_prepared,
-                    media_files=media_files_prepared,
-                    # parse_mode could be passed from post data if stored, default to HTML/MarkdownV2
-                    parse_mode='HTML' # Or get from post or user settings
-                )
-
-                if sent_messages_list:
-                    logger.info(f"Пост ID {post_id} успешно отправлен в канал {chat_id_int}. Message IDs: {[m.message_id for m in sent_messages_list]}")
-                    sent_to_count += 1
-                    # Store successfully sent message objects info for potential deletion
-                    successfully_sent_messages.extend([(chat_id_int, m.message_id) for m in sent_messages_list]) # Store chat_id and message_id tuple
-
-
-                    # Планируем автоудаление для КАЖДОГО отправленного сообщения, если настроено
-                    # This requires the specific message_id that was just sent.
-                    # The send_post function should return the message(s) object(s).
-                    if post.delete_after_seconds is not None or post.delete_at_utc is not None:
-                        # Determine the deletion time in UTC
-                        delete_run_date_utc = None
-                        if post.delete_after_seconds is not None:
-                            # Calculate deletion time based on *now* + seconds
-                            delete_run_date_utc = datetime.datetime.now(pytz.utc) + datetime.timedelta(seconds=post.delete_after_seconds)
-                        elif post.delete_at_utc is not None:
-                            # Use the stored delete_at_utc from the post data (should be UTC naive or aware based on model)
-                            # Ensure it's timezone-aware UTC for the scheduler
-                            delete_run_date_utc = post.delete_at_utc.astimezone(pytz.utc) if post.delete_at_utc.tzinfo is not None else pytz.utc.localize(post.delete_at_utc)
-
-
-                        if delete_run_date_utc and delete_run_date_utc > datetime.datetime.now(pytz.utc): # Only schedule if time is in the future
-                            for sent_msg in sent_messages_list:
-                                try:
-                                    # Plan the deletion job for this specific message
-                                    # scheduler_service.schedule_message_deletion expects post_id, chat_id, message_id, delete_at_utc, and services
-                                    await scheduler_service.schedule_message_deletion(
-                                        post_id=post.id,
-                                        chat_id=chat_id_int, # Pass the integer chat_id
-                                        message_id=sent_msg.message_id,
-                                        delete_at_utc=delete_run_date_utc, # Pass the determined UTC time
-                                        services_container={ # Pass necessary services as a container object
-                                             'bot': bot,
-                                             'db_service': db_service,
-                                             'telegram_api_service': telegram_api_service
-                                             # Add other services if execute_message_deletion needs them
-                                        }
-                                    )
-                                    logger.info(f"Задача удаления сообщения (Пост ID: {post.id}, Чат ID: {chat_id_int}, Msg ID: {sent_msg.message_id}) запланирована на {delete_run_date_utc}")
-                                except Exception as scheduler_ex:
-                                    logger.error(f"Ошибка при планировании задачи удаления сообщения (Пост ID: {post.id}, Чат ID: {chat_id_int}, Msg ID: {sent_msg.message_id}): {scheduler_ex}", exc_info=True)
-
-                        elif delete_run_date_utc:
-                             # If deletion time is in the past, log a warning but don't schedule
-                             logger.warning(f"Deletion time {delete_run_date_utc} for message {sent_msg.message_id} in chat {chat_id_int} is not in the future. Skipping deletion scheduling.")
-                        # else: Neither delete_after_seconds nor delete_at_utc is set, no deletion needed
-
-                else:
-                    logger.error(f"Пост ID {post.id}: Не удалось получить message_id(s) после отправки в канал {chat_id_int} (send_post returned None/empty).")
-                    failed_to_count += 1
-
-            except Exception as telegram_ex:
-                # Catch exceptions during send_post or message ID handling for a specific channel
-                logger.error(f"Пост ID {post.id}: Ошибка при отправке в канал {chat_id_int}: {telegram_ex}", exc_info=True)
+        # Рассылка во все каналы разом: контент готовится один раз, каналы обрабатываются параллельно пачками
+        logger.info(f"Пост ID {post_id}: Попытка публикации в каналы {target_chat_ids}")
+        try:
+            # telegram_api_service.send_post_bulk returns {chat_id: Optional[List[Message]]}
+            send_results = await telegram_api_service.send_post_bulk(
+                bot=bot,
+                chat_ids=target_chat_ids,
+                text=post_text_prepared,
+                media_files=media_files_prepared,
+                # parse_mode could be passed from post data if stored, default to HTML/MarkdownV2
+                parse_mode='HTML' # Or get from post or user settings
+            )
+        except Exception as telegram_ex:
+            logger.error(f"Пост ID {post.id}: Ошибка при рассылке в каналы {target_chat_ids}: {telegram_ex}", exc_info=True)
+            send_results = {}
+
+        for chat_id_int in target_chat_ids:
+            sent_messages_list = send_results.get(chat_id_int)
+            if sent_messages_list:
+                logger.info(f"Пост ID {post_id} успешно отправлен в канал {chat_id_int}. Message IDs: {[m.message_id for m in sent_messages_list]}")
+                sent_to_count += 1
+                # Store successfully sent message objects info for potential deletion
+                successfully_sent_messages.extend([(chat_id_int, m.message_id) for m in sent_messages_list]) # Store chat_id and message_id tuple
+
+
+                # Планируем автоудаление для КАЖДОГО отправленного сообщения, если настроено
+                # This requires the specific message_id that was just sent.
+                # The send_post function should return the message(s) object(s).
+                if post.delete_after_seconds is not None or post.delete_at_utc is not None:
+                    # Determine the deletion time in UTC
+                    delete_run_date_utc = None
+                    if post.delete_after_seconds is not None:
+                        # Calculate deletion time based on *now* + seconds
+                        delete_run_date_utc = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=post.delete_after_seconds)
+                    elif post.delete_at_utc is not None:
+                        # Use the stored delete_at_utc from the post data (should be UTC naive or aware based on model)
+                        # Ensure it's timezone-aware UTC for the scheduler
+                        delete_run_date_utc = post.delete_at_utc.astimezone(datetime.timezone.utc) if post.delete_at_utc.tzinfo is not None else post.delete_at_utc.replace(tzinfo=datetime.timezone.utc)
+
+
+                    if delete_run_date_utc and delete_run_date_utc > datetime.datetime.now(datetime.timezone.utc): # Only schedule if time is in the future
+                        # Deletion jobs are stored after the loop, in the same transaction as the post status
+                        # One deletion job per chat: its messages are removed with a single deleteMessages call
+                        pending_deletions.append((chat_id_int, [m.message_id for m in sent_messages_list], delete_run_date_utc))
+
+                    elif delete_run_date_utc:
+                         # If deletion time is in the past, log a warning but don't schedule
+                         logger.warning(f"Deletion time {delete_run_date_utc} for messages {[m.message_id for m in sent_messages_list]} in chat {chat_id_int} is not in the future. Skipping deletion scheduling.")
+                    # else: Neither delete_after_seconds nor delete_at_utc is set, no deletion needed
+
+            else:
+                logger.error(f"Пост ID {post.id}: Не удалось получить message_id(s) после отправки в канал {chat_id_int} (send_post returned None/empty).")
                 failed_to_count += 1
                 # TODO: Уведомить пользователя об ошибке отправки в конкретный канал
 
@@ -204,8 +217,35 @@ async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_
         # For now, just update status:
         # Always attempt status update if post object was retrieved
         if post:
+            # Задачи автоудаления записываются в apscheduler_jobs в одной транзакции со статусом поста
+            # (один коммит вместо отдельного add_job на каждое отправленное сообщение)
+            deletion_rows = []
+            if pending_deletions:
+                deletion_rows = scheduler_service.build_message_deletion_job_rows(post.id, pending_deletions)
+                if deletion_rows is None:
+                    # Scheduler can't take prepared rows (not running / not a SQL job store): one add_job per chat
+                    deletion_rows = []
+                    for del_chat_id, del_message_ids, delete_run_date_utc in pending_deletions:
+                        try:
+                            await scheduler_service.schedule_message_deletion(
+                                post_id=post.id,
+                                chat_id=del_chat_id,
+                                message_ids=del_message_ids,
+                                delete_at_utc=delete_run_date_utc
+                            )
+                        except Exception as scheduler_ex:
+                            logger.error(f"Ошибка при планировании задачи удаления сообщений (Пост ID: {post.id}, Чат ID: {del_chat_id}, Msg IDs: {del_message_ids}): {scheduler_ex}", exc_info=True)
             try:
-                 await db_service.update_post_status(post.id, new_status)
+                 async with db_service.session_scope():
+                     await db_service.update_post_status(post.id, new_status)
+                     inserted_jobs = 0
+                     if deletion_rows:
+                         inserted_jobs = await db_service.insert_scheduler_job_rows(
+                             deletion_rows, *scheduler_service.job_rows_replace_statements([row['id'] for row in deletion_rows])
+                         )
+                 if inserted_jobs:
+                     scheduler_service.notify_jobs_added([row['id'] for row in deletion_rows])
+                     logger.info(f"Пост ID {post.id}: запланировано задач удаления сообщений: {inserted_jobs}.")
                  logger.info(f"Пост ID {post.id}: Обновлен статус на '{new_status}'. Отправлено в {sent_to_count}, не отправлено в {failed_to_count}.")
             except Exception as db_update_ex:
                  logger.error(f"Error updating post {post.id} status to '{new_status}': {db_update_ex}", exc_info=True)
@@ -224,73 +264,51 @@ async def execute_scheduled_post(post_id: int, *, bot, db_service, telegram_api_
     logger.info(f"Задача execute_scheduled_post для поста ID: {post_id} завершена.")
 
 
-# Update function signature to accept services as keyword arguments
-async def execute_message_deletion(chat_id: int, message_id: int, *, bot, db_service, telegram_api_service):
+# Services are taken from the _SERVICES registry (see register_services)
+async def execute_message_deletion(chat_id: int, message_ids: int | list[int]):
     """
-    Исполнитель задачи APScheduler для удаления сообщения Telegram.
+    Исполнитель задачи APScheduler для удаления сообщений Telegram.
+    Сервисы (bot, telegram_api_service) берутся из реестра _SERVICES.
 
     Args:
-        chat_id (int): ID чата/канала, где находится сообщение.
-        message_id (int): ID сообщения для удаления.
-        bot: Экземпляр объекта бота.
-        db_service: Экземпляр сервиса БД (может понадобиться для логирования удаления в БД).
-        telegram_service: Экземпляр сервиса для работы с Telegram API.
+        chat_id (int): ID чата/канала, где находятся сообщения.
+        message_ids (list[int]): ID сообщений поста в этом чате (удаляются пачкой через deleteMessages).
+            Задачи, запланированные до перехода на пакетное удаление, передают один message_id (int).
     """
-    # Note: post_id is not directly used by the task function itself based on the provided args,
-    # but it's used to generate the job ID in scheduler.py.
-    # If needed in the task function, it must be passed as an argument.
-    # The scheduler.py schedule_message_deletion passes [chat_id, message_id] as args.
-    # If post_id is needed, change schedule_message_deletion args to [post_id, chat_id, message_id]
-    # And update this function signature to execute_message_deletion(post_id: int, chat_id: int, message_id: int, ...)
-    # Let's keep it as is based on the scheduler.py args definition.
+    bot, telegram_api_service = _get_deletion_services(_SERVICES)
+    if isinstance(message_ids, int):
+        message_ids = [message_ids]
 
-    logger.info(f"Запущена задача execute_message_deletion для Чат ID: {chat_id}, Msg ID: {message_id}")
+    logger.info(f"Запущена задача execute_message_deletion для Чат ID: {chat_id}, Msg IDs: {message_ids}")
 
     try:
-        # telegram_api_service.delete_message returns True on success or if already deleted
+        # telegram_api_service.delete_messages returns message_id -> True on success or if already deleted
         # This function handles logging success/failure internally
-        await telegram_api_service.delete_message(bot, chat_id, message_id)
-
-        # TODO: Опционально: обновить статус сообщения в БД, если вы храните информацию об отправленных сообщениях
-        # This requires a DB method like db_service.mark_message_as_deleted(chat_id, message_id)
-        # which in turn requires storing sent message info (chat_id, message_id, post_id etc.) in DB.
-        # Example:
-        # if success: # delete_message returns success flag
-        #     try:
-        #         # Assuming you have a table or JSON column storing sent messages and their status
-        #         await db_service.mark_sent_message_deleted(chat_id, message_id)
-        #         logger.debug(f"Marked message {message_id} in chat {chat_id} as deleted in DB.")
-        #     except Exception as db_ex:
-        #         logger.error(f"Error marking message {message_id} in chat {chat_id} as deleted in DB: {db_ex}", exc_info=True)
-        # else:
-        #      # Handle deletion failure logging in DB if needed
-        #      pass
-
+        results = await telegram_api_service.delete_messages(bot, chat_id, message_ids)
+        failed_ids = [message_id for message_id, deleted in results.items() if not deleted]
+        if failed_ids:
+            logger.warning(f"Не удалось удалить сообщения {failed_ids} в чате {chat_id}.")
+            # TODO: Опционально: отметить в БД как 'ошибка удаления'
 
     except Exception as e:
         # Catch unexpected errors during the task execution
-        logger.error(f"Ошибка при выполнении задачи execute_message_deletion для Чат ID: {chat_id}, Msg ID: {message_id}: {e}", exc_info=True)
+        logger.error(f"Ошибка при выполнении задачи execute_message_deletion для Чат ID: {chat_id}, Msg IDs: {message_ids}: {e}", exc_info=True)
         # TODO: Опционально: отметить в БД как 'ошибка удаления'
 
 
-    logger.info(f"Задача execute_message_deletion для Чат ID: {chat_id}, Msg ID: {message_id} завершена.")
+    logger.info(f"Задача execute_message_deletion для Чат ID: {chat_id}, Msg IDs: {message_ids} завершена.")
 
 
-# Update function signature to accept services as keyword arguments
-# This task executor is for a job scheduled per RSS feed ID by scheduler.py
-async def execute_rss_feed_check(feed_id: int, *, bot, db_service, telegram_api_service, content_manager_service, rss_service):
+# This task executor is for a job scheduled per RSS feed ID (legacy; feeds are now checked by execute_rss_master_tick)
+async def execute_rss_feed_check(feed_id: int):
     """
     Исполнитель задачи APScheduler для проверки RSS-ленты на наличие новых записей.
-    Вызывается планировщиком для конкретной RSS-ленты.
+    Вызывается планировщиком для конкретной RSS-ленты. Сервисы берутся из реестра _SERVICES.
 
     Args:
         feed_id (int): ID RSS-ленты для проверки.
-        bot: Экземпляр объекта бота.
-        db_service: Экземпляр сервиса для работы с БД.
-        telegram_service: Экземпляр сервиса для работы с Telegram API.
-        content_manager_service: Экземпляр сервиса для подготовки контента.
-        rss_service: Экземпляр сервиса для работы с RSS (парсинг, публикация).
     """
+    db_service = _SERVICES['db_service']
     logger.info(f"Запущена задача execute_rss_feed_check для RSS-ленты ID: {feed_id}")
 
     rss_feed = None
@@ -307,21 +325,7 @@ async def execute_rss_feed_check(feed_id: int, *, bot, db_service, telegram_api_
         #     logger.info(f"RSS-лента ID {feed_feed} неактивна. Пропускаю проверку.")
         #     return
 
-        if not rss_feed.feed_url:
-             logger.warning(f"RSS-лента ID {feed_id} не имеет URL. Пропускаю проверку.")
-             # TODO: Обновить статус ленты на ошибку в БД if status column exists
-             return
-
-        # Вызываем сервис RSS для обработки конкретной ленты
-        # process_single_feed expects db, telegram_api, content_manager, bot_instance, rss_feed_obj
-        published_count = await rss_service.process_single_feed(
-            db=db_service,
-            telegram_api=telegram_api_service,
-            content_manager=content_manager_service,
-            bot_instance=bot,
-            rss_feed_obj=rss_feed # Pass the RssFeed object from DB
-        )
-        logger.info(f"RSS-лента ID {feed_id}: Завершена обработка. Опубликовано новых элементов: {published_count}.")
+        await _process_rss_feed(rss_feed)
 
     except Exception as e:
         logger.error(f"Ошибка при выполнении задачи execute_rss_feed_check для RSS-ленты ID {feed_id}: {e}", exc_info=True)
@@ -336,4 +340,65 @@ async def execute_rss_feed_check(feed_id: int, *, bot, db_service, telegram_api_
 
     logger.info(f"Задача execute_rss_feed_check для RSS-ленты ID: {feed_id} завершена.")
 
+async def _process_rss_feed(rss_feed) -> int:
+    """
+    Проверяет одну RSS-ленту (объект RssFeed из БД) и публикует новые элементы.
+    Общая часть execute_rss_feed_check и execute_rss_master_tick. Возвращает число опубликованных элементов.
+    """
+    bot, db_service, telegram_api_service, content_manager_service, rss_service = _get_rss_services(_SERVICES)
+    if not rss_feed.feed_url:
+         logger.warning(f"RSS-лента ID {rss_feed.id} не имеет URL. Пропускаю проверку.")
+         # TODO: Обновить статус ленты на ошибку в БД if status column exists
+         return 0
+
+    # Вызываем сервис RSS для обработки конкретной ленты
+    # process_single_feed expects db, telegram_api, content_manager, bot_instance, rss_feed_obj
+    # posted_cache_scope: повторные проверки одного элемента за цикл не обращаются к БД
+    with db_service.posted_cache_scope():
+        published_count = await rss_service.process_single_feed(
+            db=db_service,
+            telegram_api=telegram_api_service,
+            content_manager=content_manager_service,
+            bot_instance=bot,
+            rss_feed_obj=rss_feed # Pass the RssFeed object from DB
+        )
+    logger.info(f"RSS-лента ID {rss_feed.id}: Завершена обработка. Опубликовано новых элементов: {published_count}.")
+    return published_count
+
+
+# Размер пачки лент, забираемых из очереди за один запрос
+RSS_TICK_BATCH_SIZE = 100
+
+
+async def execute_rss_master_tick():
+    """
+    Исполнитель общей периодической задачи APScheduler для всех RSS-лент (см. scheduler.RSS_MASTER_TICK_JOB_ID).
+    Забирает из БД ленты с наступившим next_check_utc (db_service сдвигает их next_check_utc
+    на frequency_minutes в той же транзакции) и проверяет каждую пачку параллельно.
+    Одна задача и один SELECT на пачку вместо отдельной задачи APScheduler на каждую ленту.
+    Сервисы берутся из реестра _SERVICES.
+    """
+    db_service = _SERVICES['db_service']
+    checked_count = 0
+    while True:
+        due_feeds = await db_service.get_active_rss_feeds_due_for_check(batch_size=RSS_TICK_BATCH_SIZE)
+        if not due_feeds:
+            break
+
+        results = await asyncio.gather(
+            *(_process_rss_feed(feed) for feed in due_feeds),
+            return_exceptions=True # Ошибка одной ленты не прерывает проверку остальных
+        )
+        for feed, result in zip(due_feeds, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Ошибка при проверке RSS-ленты ID {feed.id}: {result}", exc_info=result)
+        checked_count += len(due_feeds)
+
+        if len(due_feeds) < RSS_TICK_BATCH_SIZE:
+            break # Queue drained
+
+    if checked_count:
+        logger.info(f"Общая проверка RSS: обработано лент: {checked_count}.")
+
+
 # TODO: Добавить любые другие функции-исполнители по мере необходимости
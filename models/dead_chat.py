@@ -0,0 +1,22 @@
+# models/dead_chat.py
+
+from sqlalchemy import Column, BigInteger, String, DateTime, func
+
+from services.db_base import Base
+
+
+class DeadChat(Base):
+    """
+    Модель SQLAlchemy для таблицы 'dead_chats'.
+    Чаты, отправка в которые гарантированно завершается ошибкой (бот заблокирован или удален из чата,
+    чат не найден, группа преобразована в супергруппу). Рассылки пропускают такие чаты, пока отметка
+    не будет снята (см. services/dead_chats.py).
+    """
+    __tablename__ = 'dead_chats'
+
+    chat_id = Column(BigInteger, primary_key=True) # ID чата в Telegram
+    reason = Column(String(255), nullable=True) # Описание ошибки Telegram, по которой чат отмечен
+    marked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DeadChat(chat_id={self.chat_id}, reason='{self.reason}', marked_at={self.marked_at})>"
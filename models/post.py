@@ -3,7 +3,7 @@
 import enum
 from sqlalchemy import (
     Column, Integer, String, DateTime, Enum, BigInteger, func,
-    ForeignKey, Text, JSON
+    ForeignKey, Text, JSON, Index
 )
 from sqlalchemy.orm import relationship # Potentially useful for relationships, though not strictly required by the prompt
 
@@ -46,8 +46,7 @@ class Post(Base):
     user_id = Column(
         Integer,
         ForeignKey('users.id'), # Ссылка на таблицу 'users'
-        nullable=False,
-        index=True,
+        nullable=False, # Индекс - ведущий столбец ix_post_user_status
         comment='ID пользователя, создавшего пост'
     )
     chat_ids = Column(
@@ -104,7 +103,7 @@ class Post(Base):
         Enum(PostStatusEnum, name='post_status_enum'),
         nullable=False,
         default=PostStatusEnum.SCHEDULED.value, # Храним строковое значение enum
-        index=True,
+        # Индекс - ведущий столбец ix_post_status_run
         comment="Статус поста: 'draft', 'scheduled', 'sent', 'error', 'deleted', 'invalid'"
     )
     created_at = Column(
@@ -121,8 +120,17 @@ class Post(Base):
         comment='Время последнего обновления записи'
     )
 
-    # Опционально можно добавить отношение к модели User, если она определена
-    # user = relationship("User")
+    # Составные индексы под частые фильтры:
+    # (status, run_date_utc) - загрузка запланированных постов при старте планировщика,
+    # (user_id, status) - список постов пользователя с фильтром по статусу
+    __table_args__ = (
+        Index('ix_post_status_run', 'status', 'run_date_utc'),
+        Index('ix_post_user_status', 'user_id', 'status'),
+    )
+
+    # Отношение к модели User (автор поста). В async-коде ленивая загрузка недоступна,
+    # поэтому там, где нужен post.user, загружайте его явно (selectinload).
+    user = relationship("User")
 
     def __repr__(self):
         return (
@@ -1,6 +1,7 @@
 # models/rss_feed.py
 
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, func, Index
+from sqlalchemy.orm import relationship
 # from sqlalchemy.ext.declarative import declarative_base # Removed local Base definition
 
 # Import Base from a common location
@@ -23,6 +24,20 @@ class RssFeed(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="Время создания записи")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="Время последнего обновления записи")
 
+    # Items are removed by the database (rss_items.feed_id ON DELETE CASCADE);
+    # passive_deletes stops the ORM from loading them just to delete them
+    items = relationship("RssItem", passive_deletes=True)
+
+    # Partial index for the due-feeds queue (next_check_utc <= now ORDER BY next_check_utc);
+    # feeds without a scheduled check are left out of the index
+    __table_args__ = (
+        Index(
+            'ix_rss_due', 'next_check_utc',
+            postgresql_where=next_check_utc.isnot(None),
+            sqlite_where=next_check_utc.isnot(None),
+        ),
+    )
+
     def __repr__(self):
         return f"<RssFeed(id={self.id}, user_id={self.user_id}, feed_url='{self.feed_url[:50]}...', frequency_minutes={self.frequency_minutes})>"
 
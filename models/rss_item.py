@@ -1,6 +1,6 @@
 # models/rss_item.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, func, Index
 
 # Base импортируется из центрального файла, где определена декларативная база
 # Это обеспечивает использование одной и той же метаданных для всех моделей
@@ -15,12 +15,24 @@ class RssItem(Base):
     __tablename__ = 'rss_items'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    feed_id = Column(Integer, ForeignKey('rss_feeds.id'), nullable=False, index=True)
-    item_guid = Column(String, nullable=False, unique=True, index=True) # Уникальный идентификатор элемента
+    feed_id = Column(Integer, ForeignKey('rss_feeds.id', ondelete='CASCADE'), nullable=False) # Элементы удаляются вместе с лентой на стороне БД
+    item_guid = Column(String, nullable=False) # Идентификатор элемента, уникален в пределах ленты (см. __table_args__)
     published_at = Column(DateTime(timezone=True), nullable=True)      # Время публикации элемента в UTC
     is_posted = Column(Boolean, nullable=False, default=False, index=True) # Флаг, был ли элемент опубликован ботом
     created_at = Column(DateTime(timezone=True), server_default=func.now()) # Время создания записи
 
+    # Уникальность (feed_id, item_guid): один и тот же элемент может встречаться в разных лентах.
+    # Индекс обслуживает поиск по ленте и служит целью ON CONFLICT для upsert в mark_rss_items_posted.
+    # На PostgreSQL is_posted добавлен через INCLUDE, чтобы проверки "опубликован ли элемент"
+    # выполнялись как Index Only Scan (уникальность при этом остаётся по двум столбцам).
+    __table_args__ = (
+        Index(
+            'ix_rss_items_feed_guid_posted', 'feed_id', 'item_guid',
+            unique=True,
+            postgresql_include=['is_posted'],
+        ),
+    )
+
     def __repr__(self):
         """
         Строковое представление объекта RssItem для удобства отладки.
@@ -0,0 +1,25 @@
+# models/telegram_file.py
+
+from sqlalchemy import Column, String, DateTime, func
+
+from services.db_base import Base
+
+
+class TelegramFile(Base):
+    """
+    Модель SQLAlchemy для таблицы 'telegram_files'.
+    Хранит file_id, выданные Telegram при загрузке локальных медиафайлов, чтобы повторные отправки
+    (в том числе после перезапуска бота) передавали file_id вместо повторной загрузки файла.
+    Ключ - хэш содержимого файла и тип медиа: один и тот же файл, отправленный как фото и как документ,
+    получает разные file_id.
+    """
+    __tablename__ = 'telegram_files'
+
+    content_hash = Column(String(64), primary_key=True) # SHA-256 (hex) начала и конца файла и его размера, см. services/file_id_cache.py
+    media_type = Column(String(16), primary_key=True) # 'photo', 'video', 'document', 'audio', 'animation'
+    file_id = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False) # После этого момента (UTC) запись не используется
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<TelegramFile(content_hash='{self.content_hash[:12]}...', media_type='{self.media_type}', expires_at={self.expires_at})>"
@@ -3,6 +3,7 @@
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey, func, Index
 )
+from sqlalchemy.orm import relationship
 # Импортируем Base из центрального файла определения декларативной базы
 from services.db_base import Base
 
@@ -25,15 +26,14 @@ class UserChannel(Base):
         Integer,
         ForeignKey('users.id'),
         nullable=False,
-        index=True, # Добавляем индекс для ускорения поиска по пользователю
+        # Поиск по пользователю покрывают составные индексы в __table_args__
         comment="ID пользователя из таблицы 'users'"
     )
     chat_id = Column(
         BigInteger,
         nullable=False,
         comment="ID чата (канала или группы) в Telegram"
-        # Уникальность chat_id в рамках user_id не обеспечивается на уровне БД
-        # для гибкости, но комбинация user_id + chat_id часто уникальна
+        # Комбинация user_id + chat_id уникальна (см. __table_args__)
     )
     chat_username = Column(
         String(255),
@@ -58,10 +58,15 @@ class UserChannel(Base):
         comment="Время удаления/отключения связи пользователь-канал"
     )
 
-    # Добавляем составной индекс по user_id и chat_id для ускорения запросов
-    # и помощи в обеспечении логической уникальности (user, chat) комбинации
+    # Отношение к модели User (владелец связи); в async-коде загружать явно (selectinload)
+    user = relationship("User")
+
+    # Уникальный составной индекс по user_id и chat_id: ускоряет поиск связи и
+    # гарантирует одну запись на пару (user, chat) - add_user_channel реактивирует существующую.
+    # Индекс (user_id, is_active) обслуживает выборку активных каналов пользователя.
     __table_args__ = (
-        Index('idx_user_channel', 'user_id', 'chat_id'),
+        Index('ix_userchannel_user_chat', 'user_id', 'chat_id', unique=True),
+        Index('ix_userchannel_user_active', 'user_id', 'is_active'),
     )
 
     def __repr__(self):
@@ -1,28 +1,49 @@
+import io
 import logging
 import os
-from typing import Any, Optional, List, Dict, Union, Tuple
+from functools import lru_cache
+from importlib import resources
+from typing import Any, Optional, Dict, Tuple, Union
 
 from aiogram import Bot
-from aiogram.types import (
-    Message, InputMediaPhoto, InputMediaVideo,
-    InputMediaDocument, InputMediaAudio, InputMediaAnimation,
-    BufferedInputFile # For sending bytes
-)
-from aiogram.types import FSInputFile # For sending local files by path
 from aiogram.exceptions import TelegramAPIError
 
-# Try importing Pillow for watermarking (lazy import)
-try:
-    from PIL import Image, ImageDraw, ImageFont
-except ImportError:
-    Image = ImageDraw = ImageFont = None
-    logging.warning("Pillow library not found. Watermarking functionality will be disabled. Install with 'pip install Pillow'.")
-
-
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+# Pillow (and the optional PyTurboJPEG codec) are imported on first use in apply_watermark,
+# so deployments that never watermark don't load them at startup.
+_PIL = None
+_TJ = None # (TurboJPEG instance, TJPF_RGB, numpy), or False once found to be unavailable
+
+
+def _pil():
+    """Imports Pillow on first call and memoizes (Image, ImageDraw, ImageFont). Raises ImportError if missing."""
+    global _PIL
+    if _PIL is None:
+        from PIL import Image, ImageDraw, ImageFont
+        _PIL = (Image, ImageDraw, ImageFont)
+    return _PIL
+
+
+def _turbojpeg():
+    """
+    Imports PyTurboJPEG on first call for SIMD-accelerated JPEG decode/encode.
+    Returns (TurboJPEG instance, TJPF_RGB, numpy) or None if the package or libjpeg-turbo is missing,
+    in which case Pillow's own codec is used. Installing 'pillow-simd' instead of 'Pillow' is a drop-in alternative.
+    """
+    global _TJ
+    if _TJ is None:
+        try:
+            import numpy as np
+            from turbojpeg import TurboJPEG, TJPF_RGB
+            _TJ = (TurboJPEG(), TJPF_RGB, np)
+        except (ImportError, OSError, RuntimeError):
+            _TJ = False
+    return _TJ or None
+
+
 # Configuration constants and limits
 MEDIA_DIR = "media_temp"
 MAX_FILE_SIZE_MB = 20
@@ -43,6 +64,11 @@ ALLOWED_MIME_TYPES: Dict[str, str] = {
     # Using send_document is a fallback for unsupported types.
 }
 
+# Font bundled with the package so watermarking works on hosts without Arial (e.g. Linux servers)
+# Licence (Bitstream Vera / DejaVu, must ship with the font): assets/DejaVuSans-LICENSE.txt
+# DejaVu Sans covers Latin and Cyrillic, which is what watermark texts are written in.
+_FONT_PATH = resources.files(__package__).joinpath("assets/DejaVuSans.ttf")
+
 # Telegram API limits (re-defined or imported if available elsewhere)
 TELEGRAM_MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP = 1024 # Used for photos, videos, animations, and documents in media groups
 TELEGRAM_MAX_CAPTION_LENGTH_DOCUMENT_SINGLE = 4096 # Used for single documents
@@ -106,27 +132,27 @@ async def save_media_file(
         # Ensure media directory exists
         os.makedirs(MEDIA_DIR, exist_ok=True)
     except OSError as e:
-        logger.error(f"Failed to create media directory {MEDIA_DIR}: {e}", exc_info=True)
+        logger.error("Failed to create media directory %s: %s", MEDIA_DIR, e, exc_info=True)
         return None # Cannot proceed without directory
 
-    logger.debug(f"Attempting to get file info for file_id: {file_id}")
+    logger.debug("Attempting to get file info for file_id: %s", file_id)
     try:
         file_info = await bot.get_file(file_id)
         file_size = file_info.file_size
         file_path_telegram = file_info.file_path # Path on Telegram servers
-        logger.debug(f"Got file info from Telegram: size={file_size}, path={file_path_telegram}, mime_type={mime_type}, file_unique_id={file_unique_id}")
+        logger.debug("Got file info from Telegram: size=%s, path=%s, mime_type=%s, file_unique_id=%s", file_size, file_path_telegram, mime_type, file_unique_id)
 
     except TelegramAPIError as e:
-        logger.error(f"Failed to get file info for file_id {file_id}: {e}", exc_info=True)
+        logger.error("Failed to get file info for file_id %s: %s", file_id, e, exc_info=True)
         return None
     except Exception as e:
-        logger.error(f"Unexpected error getting file info for file_id {file_id}: {e}", exc_info=True)
+        logger.error("Unexpected error getting file info for file_id %s: %s", file_id, e, exc_info=True)
         return None
 
 
     # Basic validation against max size
     if file_size is None or file_size == 0 or file_size > MAX_FILE_SIZE_BYTES:
-        logger.warning(f"File {file_id} skipped due to invalid size: {file_size} bytes (Max {MAX_FILE_SIZE_BYTES})")
+        logger.warning("File %s skipped due to invalid size: %s bytes (Max %s)", file_id, file_size, MAX_FILE_SIZE_BYTES)
         return None # {"error": "File size exceeded or invalid"}
 
     # Determine file extension and Telegram media type ('photo', 'video', etc.)
@@ -145,7 +171,7 @@ async def save_media_file(
             elif mime_type == 'application/pdf': media_telegram_type = 'document'
             elif mime_type.startswith('audio/'): media_telegram_type = 'audio'
         else:
-             logger.warning(f"Provided MIME type '{mime_type}' is not in ALLOWED_MIME_TYPES. Attempting inference from file path.")
+             logger.warning("Provided MIME type '%s' is not in ALLOWED_MIME_TYPES. Attempting inference from file path.", mime_type)
 
 
     # 2. Fallback: Try to infer from Telegram's file_path
@@ -164,7 +190,7 @@ async def save_media_file(
 
     # 3. Final check for unsupported type
     if not ext or media_telegram_type is None:
-        logger.warning(f"File {file_id} skipped due to unknown or unsupported type based on MIME ({mime_type}) or path extension ({ext}).")
+        logger.warning("File %s skipped due to unknown or unsupported type based on MIME (%s) or path extension (%s).", file_id, mime_type, ext)
         return None # {"error": "Unsupported file type"}
 
 
@@ -172,11 +198,11 @@ async def save_media_file(
     local_file_name = f"{file_unique_id}.{ext}"
     local_file_path = os.path.join(MEDIA_DIR, local_file_name)
 
-    logger.debug(f"Downloading file_id {file_id} to {local_file_path}")
+    logger.debug("Downloading file_id %s to %s", file_id, local_file_path)
     try:
         # Download the file
         await bot.download_file(file_path_telegram, local_file_path)
-        logger.info(f"File {file_id} successfully downloaded to {local_file_path}")
+        logger.info("File %s successfully downloaded to %s", file_id, local_file_path)
 
         # Return info about the saved file
         return {
@@ -189,32 +215,43 @@ async def save_media_file(
         }
 
     except TelegramAPIError as e:
-        logger.error(f"Failed to download file {file_id} to {local_file_path}: {e}", exc_info=True)
+        logger.error("Failed to download file %s to %s: %s", file_id, local_file_path, e, exc_info=True)
         # Clean up partially downloaded file if it exists
         if os.path.exists(local_file_path):
              try:
                  os.remove(local_file_path)
-                 logger.debug(f"Cleaned up partial download {local_file_path}")
+                 logger.debug("Cleaned up partial download %s", local_file_path)
              except OSError:
                  pass # Ignore cleanup errors
         return None # {"error": "Failed to download file"}
     except Exception as e:
-        logger.error(f"Unexpected error downloading file {file_id}: {e}", exc_info=True)
+        logger.error("Unexpected error downloading file %s: %s", file_id, e, exc_info=True)
         if os.path.exists(local_file_path):
              try:
                  os.remove(local_file_path)
-                 logger.debug(f"Cleaned up partial download {local_file_path}")
+                 logger.debug("Cleaned up partial download %s", local_file_path)
              except OSError:
                  pass # Ignore cleanup errors
         return None # {"error": "Unexpected download error"}
 
 
+@lru_cache(maxsize=32)
+def _load_font(size: int):
+    """Loads the bundled TrueType font at the given size. Cached per size."""
+    return _pil()[2].truetype(str(_FONT_PATH), size)
+
+
 # Note: prepare_media_group is NOT needed here if telegram_api.send_post
 # takes the list format produced by this service (list of dicts) and handles
 # creating InputMedia objects itself. This was confirmed in vS0zE review.
 
 
-async def apply_watermark(image_path: str, watermark_text: str, output_path: Optional[str] = None) -> Optional[str]:
+async def apply_watermark(
+    image_path: str,
+    watermark_text: str,
+    output_path: Optional[str] = None,
+    return_bytes: bool = False
+) -> Optional[Union[str, bytes]]:
     """
     Applies a text watermark to an image. Requires Pillow.
     Currently applies a basic watermark to the bottom right.
@@ -223,22 +260,33 @@ async def apply_watermark(image_path: str, watermark_text: str, output_path: Opt
         image_path: Path to the source image file.
         watermark_text: Text to use as the watermark.
         output_path: Optional path to save the watermarked image. If None, overwrites source.
+        return_bytes: If True, nothing is written to disk and the encoded image is returned as bytes,
+                      ready for BufferedInputFile(data, filename=...). Avoids a write + re-read of the file.
 
     Returns:
-        The path to the watermarked file, or None on failure.
+        The path to the watermarked file (or its bytes if return_bytes is True), or None on failure.
     """
     # Check if Pillow is available
-    if Image is None or ImageDraw is None or ImageFont is None:
-        logger.warning("Pillow not installed. Cannot apply watermark.")
+    try:
+        Image, ImageDraw, ImageFont = _pil()
+    except ImportError:
+        logger.warning("Pillow not installed. Cannot apply watermark. Install with 'pip install Pillow'.")
         return None
+    tj, TJPF_RGB, np = _turbojpeg() or (None, None, None)
 
     if not os.path.exists(image_path):
-        logger.error(f"Image file not found for watermarking: {image_path}")
+        logger.error("Image file not found for watermarking: %s", image_path)
         return None
 
     try:
         # Open image and convert to RGBA for transparency layer
-        image = Image.open(image_path).convert("RGBA")
+        source_image = Image.open(image_path)
+        original_format = source_image.format # convert() below returns an image without format info
+        if tj is not None and original_format == 'JPEG':
+            # Decode through libjpeg-turbo (SIMD IDCT) instead of Pillow's baseline decoder
+            with open(image_path, 'rb') as f:
+                source_image = Image.fromarray(tj.decode(f.read(), pixel_format=TJPF_RGB))
+        image = source_image.convert("RGBA")
         img_width, img_height = image.size
 
         # Create a transparent layer for the watermark
@@ -247,26 +295,12 @@ async def apply_watermark(image_path: str, watermark_text: str, output_path: Opt
 
         # Define font and size (adjust as needed, scale with image size)
         # A smaller font size might be better for small images
-        font_size = int(min(img_width, img_height) * 0.04) # Scale font size based on smaller dimension
+        # Integer arithmetic: 4% of the smaller side is min_dim // 25, 2% is min_dim // 50
+        min_dim = img_width if img_width < img_height else img_height
+        font_size = min_dim // 25 # Scale font size based on smaller dimension
         if font_size < 10: font_size = 10 # Minimum font size
 
-        try:
-            # Try a common font (Arial)
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            # Fallback to default PIL font if Arial is not found
-            logger.warning("Arial font not found. Using default PIL font for watermark.")
-            # PIL.ImageFont.load_default() returns a font object, not a path.
-            # We need to handle this if using the default font, it might not support size scaling easily.
-            # For simplicity, let's just use load_default() which is fixed size, or raise error if Truetype is needed.
-            # Let's stick to Truetype and require a font or handle the error.
-            # A better fallback is to use a font included with Pillow or find one.
-            # For demonstration, we'll raise the error if Arial isn't found.
-            raise FileNotFoundError("Arial.ttf not found. Please install a common font or specify a font file.")
-        except Exception as font_ex:
-             logger.error(f"Error loading font for watermark: {font_ex}", exc_info=True)
-             return None # Cannot watermark without a font
-
+        font = _load_font(font_size)
 
         # Calculate text size using textbbox
         # The position (0,0) in textbbox is relative to where the text would start drawing
@@ -275,7 +309,7 @@ async def apply_watermark(image_path: str, watermark_text: str, output_path: Opt
         text_height = text_bbox[3] - text_bbox[1]
 
         # Position (bottom right corner with padding)
-        padding = int(min(img_width, img_height) * 0.02) # Padding scales with image size
+        padding = min_dim // 50 # Padding scales with image size
         position = (img_width - text_width - padding, img_height - text_height - padding)
 
         # Ensure position is within image bounds (might happen with very long text/small image)
@@ -293,18 +327,44 @@ async def apply_watermark(image_path: str, watermark_text: str, output_path: Opt
         # Convert back to RGB if saving as JPEG (JPEG does not support alpha channel)
         # Or save as PNG to preserve transparency if original was PNG.
         # Let's save in the original format if possible, or convert to RGB for JPG/JPEG.
-        original_format = image.format
         final_path = output_path if output_path else image_path
+        # Encode into memory when the caller wants bytes, otherwise straight to the target file
+        target = io.BytesIO() if return_bytes else final_path
 
         if original_format in ['JPEG', 'JPG'] and not (final_path.lower().endswith('.png')):
              # Convert to RGB if saving to JPEG format or overwriting original JPG
              watermarked_image = watermarked_image.convert("RGB")
-             # If saving to JPG, specify quality
-             watermarked_image.save(final_path, format='JPEG', quality=90) # Adjust quality as needed
+             if tj is not None:
+                 # Encode through libjpeg-turbo (SIMD FDCT), same quality as the Pillow path
+                 jpeg_data = tj.encode(np.asarray(watermarked_image), quality=90, pixel_format=TJPF_RGB)
+                 if return_bytes:
+                     return jpeg_data
+                 with open(final_path, 'wb') as f:
+                     f.write(jpeg_data)
+             else:
+                 # If saving to JPG, specify quality
+                 watermarked_image.save(target, format='JPEG', quality=90) # Adjust quality as needed
         elif original_format == 'PNG':
             # Save as PNG to preserve transparency
-             watermarked_image.save(final_path, format='PNG')
+             watermarked_image.save(target, format='PNG')
         else:
              # For other formats, try saving with the original format or default
              try:
-                 watermarked_image.save(final_path, format=original
+                 watermarked_image.save(target, format=original_format)
+             except (KeyError, ValueError, OSError):
+                 # Format unknown or cannot store RGBA - fall back to PNG
+                 logger.warning("Cannot save watermarked image as %s. Saving as PNG instead.", original_format)
+                 if return_bytes:
+                     target = io.BytesIO() # Discard any partially written data
+                 watermarked_image.save(target, format='PNG')
+
+        if return_bytes:
+            logger.info("Watermark applied to %s, returned as bytes", image_path)
+            return target.getvalue()
+
+        logger.info("Watermark applied to %s, saved to %s", image_path, final_path)
+        return final_path
+
+    except Exception as e:
+        logger.error("Failed to apply watermark to %s: %s", image_path, e, exc_info=True)
+        return None
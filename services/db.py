@@ -1,15 +1,23 @@
 # services/db.py
 
 import asyncio
+import contextvars
 import os
+import time
 import logging # Import logging
 from datetime import datetime, timezone, timedelta # Import timezone, timedelta from datetime
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select, update, delete, exists, func
+from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy import select, insert, update, delete, exists, func, literal, values, column, Integer, Row, lambda_stmt, event, bindparam, text, inspect
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.sql.dml import Delete, Insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 # Removed specific Column imports as they are not used for definitions here
 
 
@@ -22,10 +30,19 @@ from models.user_channel import UserChannel
 from models.post import Post, ScheduleTypeEnum, PostStatusEnum
 from models.rss_feed import RssFeed
 from models.rss_item import RssItem
+from models.telegram_file import TelegramFile
+from models.dead_chat import DeadChat
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
 
+# Shared UTC tzinfo singleton (stdlib; no pytz lookup/localize needed for UTC)
+_UTC = timezone.utc
+
+# Updatable column names, computed once for O(1) membership checks in the *_details updaters
+_POST_COLS: frozenset[str] = frozenset(Post.__table__.columns.keys())
+_RSSFEED_COLS: frozenset[str] = frozenset(RssFeed.__table__.columns.keys())
+
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -35,19 +52,246 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable not set")
 
 
+# Connection pool settings (tunable via environment for busy deployments)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20")) # Persistent connections kept in the pool
+DB_POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", "30")) # Extra connections allowed during bursts
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10")) # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Recycle connections older than this (seconds)
+
 # Use echo=True for detailed SQL logging, or link to a logging level
-engine = create_async_engine(DATABASE_URL, echo=False)
+# insertmanyvalues_page_size: rows folded into one multi-VALUES INSERT ... RETURNING for bulk inserts
+# pool_use_lifo: reuse the most recently returned connection so a small hot set stays warm
+# and idle ones age out via pool_recycle / server-side timeouts
+# Statement caching: SQLAlchemy's compiled-SQL cache (query_cache_size) for every dialect, plus
+# asyncpg's client/server prepared statement caches when running on PostgreSQL via asyncpg
+DB_QUERY_CACHE_SIZE = 2048
+_connect_args: Dict[str, Any] = {}
+if make_url(DATABASE_URL).get_driver_name() == 'asyncpg':
+    _connect_args = {"prepared_statement_cache_size": 512, "statement_cache_size": 1024}
+
+_pool_options: Dict[str, Any] = {'pool_recycle': DB_POOL_RECYCLE, 'pool_pre_ping': True}
+if make_url(DATABASE_URL).get_backend_name() != 'sqlite': # SQLite pools (e.g. StaticPool for :memory:) don't take size/overflow/LIFO
+    _pool_options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_use_lifo=True,
+    )
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    connect_args=_connect_args,
+    insertmanyvalues_page_size=1000,
+    **_pool_options,
+)
 
 # Async Session Maker
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Request-scoped session shared by every CRUD call made inside session_scope()
+# (e.g. one bot update: get_or_create_user + add_user_channel + add_scheduled_post -> one connection, one transaction).
+# Stored with the task that owns the scope: tasks and callbacks started inside a scope (create_task, call_later,
+# APScheduler wakeups) inherit the context var, but must not reuse a session that the owner commits and closes.
+_current_session: contextvars.ContextVar[Optional[tuple[Optional[asyncio.Task], AsyncSession]]] = contextvars.ContextVar('db_current_session', default=None)
+
+
+def _ambient_session() -> Optional[AsyncSession]:
+    """The session of the enclosing session_scope() if it belongs to the current task, otherwise None."""
+    scoped = _current_session.get()
+    if scoped is None or scoped[0] is not asyncio.current_task():
+        return None
+    return scoped[1]
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Opens a session shared by all CRUD functions called within the block by the same task
+    (tasks and callbacks started inside the block use their own sessions).
+    Commits once on normal exit, rolls back on exception.
+    Note: a CRUD function that hits a DB error inside the scope re-raises it instead of returning a failure value.
+    """
+    outer_session = _ambient_session()
+    if outer_session is not None:
+        # Already inside a scope (nested usage) - reuse the outer one, it owns commit/rollback
+        yield outer_session
+        return
+    async with async_session_maker() as session:
+        token = _current_session.set((asyncio.current_task(), session))
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+
+
+@asynccontextmanager
+async def _session_scope(session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """
+    Yields the session to use for one CRUD call:
+    - an explicitly passed session (made ambient for the call, so _commit only flushes and the caller commits),
+    - otherwise the ambient session from session_scope() if any,
+    - otherwise a fresh per-call session.
+    """
+    if session is not None and session is not _ambient_session():
+        token = _current_session.set((asyncio.current_task(), session))
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
+        return
+    session = _ambient_session()
+    if session is not None:
+        yield session
+    else:
+        async with async_session_maker() as session:
+            yield session
+
+
+async def _commit(session: AsyncSession) -> None:
+    """Commits a per-call session; inside session_scope() only flushes, the scope owner commits."""
+    if session is _ambient_session():
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def _rollback(session: AsyncSession, error: BaseException) -> None:
+    """
+    Rolls back a per-call session after a failed CRUD call. Inside session_scope() the rollback
+    would discard the whole shared transaction while the caller carries on, so the error is
+    re-raised instead and the scope owner rolls back.
+    """
+    if session is _ambient_session():
+        raise error
+    await session.rollback()
+
+
+def call_after_commit(callback: Callable[[], None]) -> None:
+    """
+    Calls callback once the enclosing session_scope() has committed, and not at all if it rolls back.
+    Without a scope the callback is called right away: per-call CRUD sessions commit before returning.
+    Used for work that must see the scope's rows from another session (e.g. publishing a post created by a handler).
+    """
+    session = _ambient_session()
+    if session is None:
+        callback()
+        return
+    finished = False
+
+    def _on_commit(_sync_session) -> None:
+        nonlocal finished
+        if not finished:
+            finished = True
+            callback()
+
+    def _on_rollback(_sync_session) -> None:
+        nonlocal finished
+        finished = True
+
+    # once=True: the listeners never fire twice; the session itself is discarded with the scope
+    event.listen(session.sync_session, 'after_commit', _on_commit, once=True)
+    event.listen(session.sync_session, 'after_rollback', _on_rollback, once=True)
+
+
+def _read_failed(session: AsyncSession, error: BaseException) -> None:
+    """
+    Error handling of a failed read: inside session_scope() the error is re-raised like in the writers
+    (on PostgreSQL the shared transaction is aborted, later statements of the scope would fail anyway).
+    With a per-call session the reader returns its fallback value.
+    """
+    if session is _ambient_session():
+        raise error
+
+
+# In-process cache for get_user_timezone: telegram_user_id -> (timezone, expiry on time.monotonic() clock)
+# Timezones change rarely, so repeat lookups within the TTL skip the DB round-trip.
+# set_user_timezone invalidates the entry on update.
+USER_TIMEZONE_CACHE_TTL_SECONDS = 300
+_tz_cache: Dict[int, tuple[str, float]] = {}
+
+if engine.dialect.name == 'sqlite':
+    # SQLite enforces foreign keys (and so ON DELETE CASCADE) only when enabled per connection
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+# Indexes of earlier schema versions, replaced by the composite indexes declared in the models.
+# ix_rss_items_item_guid (UNIQUE item_guid) must go: it rejects the same item in a second feed,
+# and that conflict is not covered by ON CONFLICT (feed_id, item_guid) in mark_rss_items_posted.
+_LEGACY_INDEXES = (
+    'ix_rss_items_item_guid', 'ix_rss_items_feed_id',
+    'idx_user_channel', 'ix_user_channels_user_id',
+    'ix_posts_user_id', 'ix_posts_status',
+)
+
+# False when rss_items.feed_id has no ON DELETE CASCADE and it cannot be added in place (SQLite table
+# created by an earlier version); delete_rss_feed_by_id then deletes the feed's items itself.
+_rss_items_cascade = True
+
+
+def _upgrade_schema(connection) -> None:
+    """
+    Idempotent in-place upgrade of tables created by earlier versions (create_all never alters
+    existing tables): drops replaced indexes, creates missing ones (unique user_channels (user_id, chat_id)
+    and rss_items (feed_id, item_guid) are ON CONFLICT targets) and adds ON DELETE CASCADE to rss_items.feed_id.
+    On an up-to-date schema it only reads the catalog.
+    """
+    global _rss_items_cascade
+    inspector = inspect(connection)
+
+    for index_name in _LEGACY_INDEXES:
+        connection.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+
+    # The old (user_id, chat_id) index was not unique: keep one row per pair - the active one, the newest among equals
+    if 'ix_userchannel_user_chat' not in {index['name'] for index in inspector.get_indexes(UserChannel.__tablename__)}:
+        ranked = select(
+            UserChannel.id,
+            func.row_number().over(
+                partition_by=(UserChannel.user_id, UserChannel.chat_id),
+                order_by=(UserChannel.is_active.desc(), UserChannel.id.desc()),
+            ).label('rank'),
+        ).subquery()
+        duplicates = connection.execute(
+            delete(UserChannel).where(UserChannel.id.in_(select(ranked.c.id).where(ranked.c.rank > 1)))
+        ).rowcount
+        if duplicates:
+            logger.warning("Removed %s duplicate user_channels rows before creating the unique (user_id, chat_id) index.", duplicates)
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+    for fk in inspector.get_foreign_keys(RssItem.__tablename__):
+        if fk['referred_table'] != RssFeed.__tablename__ or (fk.get('options') or {}).get('ondelete', '').upper() == 'CASCADE':
+            continue
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text(
+                f'ALTER TABLE rss_items DROP CONSTRAINT "{fk["name"]}", '
+                f'ADD CONSTRAINT "{fk["name"]}" FOREIGN KEY (feed_id) REFERENCES rss_feeds (id) ON DELETE CASCADE'
+            ))
+            logger.info("Added ON DELETE CASCADE to rss_items.feed_id.")
+        else:
+            _rss_items_cascade = False
+            logger.warning("rss_items.feed_id has no ON DELETE CASCADE (%s can't alter it in place); feed items are deleted explicitly.", connection.dialect.name)
+
+
 async def init_db():
-    """Initializes the database by creating all tables."""
+    """Initializes the database by creating all tables and upgrading tables created by earlier versions."""
     logger.info("Initializing database...")
     try:
         async with engine.begin() as conn:
             # Base.metadata.drop_all(conn) # Optional: uncomment to drop tables before creating
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_upgrade_schema)
         logger.info("Database initialized and tables created.")
     except SQLAlchemyError as e:
          logger.critical(f"Error initializing database: {e}", exc_info=True)
@@ -58,6 +302,7 @@ async def close_db_connection(engine_instance):
     logger.info("Closing database connection pool...")
     if engine_instance:
         try:
+            logger.info(f"Connection pool status before dispose: {engine_instance.pool.status()}")
             await engine_instance.dispose()
             logger.info("Database connection pool disposed.")
         except Exception as e:
@@ -66,77 +311,133 @@ async def close_db_connection(engine_instance):
         logger.warning("Database engine instance is None, nothing to dispose.")
 
 
+def _sql_utc_now():
+    """
+    SQL expression for the current UTC time as a naive timestamp, evaluated by the database
+    (authoritative clock shared by all app hosts, no Python datetime per call).
+    SQLite's CURRENT_TIMESTAMP is already UTC.
+    """
+    if engine.dialect.name == 'postgresql':
+        return func.timezone('utc', func.now())
+    return func.now()
+
+
+def _upsert_insert(model):
+    """
+    Returns a dialect-specific INSERT construct supporting ON CONFLICT ... RETURNING
+    (PostgreSQL or SQLite), or None if the current dialect has no such construct.
+    """
+    dialect_name = engine.dialect.name
+    if dialect_name == 'postgresql':
+        return pg_insert(model)
+    if dialect_name == 'sqlite':
+        return sqlite_insert(model)
+    return None
+
+
 # --- CRUD FUNCTIONS ---
 
 async def get_or_create_user(telegram_user_id: int, preferred_mode: str = UserPreferredModeEnum.BUTTONS.value, timezone: str = "Europe/Berlin") -> User:
     """
     Finds an existing user by telegram_user_id or creates a new one.
+    On PostgreSQL/SQLite this is a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING round-trip,
+    which also closes the race between the existence check and the insert.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
+            insert_stmt = _upsert_insert(User)
+            if insert_stmt is not None:
+                insert_stmt = insert_stmt.values(
+                    telegram_user_id=telegram_user_id,
+                    preferred_mode=preferred_mode,
+                    timezone=timezone
+                )
+                # No-op update on conflict so RETURNING yields the existing row as well
+                stmt = insert_stmt.on_conflict_do_update(
+                    index_elements=[User.telegram_user_id],
+                    set_={'telegram_user_id': insert_stmt.excluded.telegram_user_id}
+                ).returning(User).execution_options(populate_existing=True)
+                user = (await session.scalars(stmt)).one()
+                await _commit(session)
+                logger.debug("User upserted: %s", user)
+                return user
+
+            # Fallback for dialects without ON CONFLICT support
             # Check if user exists
-            result = await session.execute(select(User).where(User.telegram_user_id == telegram_user_id))
-            user = result.scalars().first()
+            result = await session.execute(select(User).where(User.telegram_user_id == telegram_user_id).limit(1))
+            user = result.scalar_one_or_none()
 
             if user:
-                logger.debug(f"User found: {user}")
+                logger.debug("User found: %s", user)
                 return user
             else:
-                # Create new user
-                new_user = User(
-                    telegram_user_id=telegram_user_id,
-                    preferred_mode=preferred_mode,
-                    timezone=timezone
-                )
-                session.add(new_user)
-                await session.commit()
-                await session.refresh(new_user)
+                # Create new user; RETURNING populates server defaults, no refresh needed
+                new_user = (await session.scalars(
+                    insert(User).values(
+                        telegram_user_id=telegram_user_id,
+                        preferred_mode=preferred_mode,
+                        timezone=timezone
+                    ).returning(User)
+                )).one()
+                await _commit(session)
                 logger.info(f"New user created with telegram_user_id: {telegram_user_id}, user_id: {new_user.id}")
                 return new_user
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in get_or_create_user for telegram_user_id {telegram_user_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             raise # Re-raise the exception after logging and rollback
 
 async def set_user_timezone(telegram_user_id: int, timezone_str: str) -> bool:
     """
     Updates the timezone for a user. Returns True on success, False otherwise.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             result = await session.execute(
                 update(User)
                 .where(User.telegram_user_id == telegram_user_id)
-                .values(timezone=timezone_str, updated_at=func.now()) # Ensure updated_at is set
+                .values(timezone=timezone_str) # updated_at is stamped by the model's onupdate
                 .returning(User.id) # Use returning to check if a row was updated
             )
             updated_id = result.scalar_one_or_none()
-            await session.commit()
+            await _commit(session)
+            _tz_cache.pop(telegram_user_id, None) # Invalidate cached timezone
             if updated_id:
                  logger.info(f"Timezone updated for user {telegram_user_id} to {timezone_str}")
             else:
                  logger.warning(f"Could not update timezone for user {telegram_user_id}: user not found.")
             return updated_id is not None
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in set_user_timezone for telegram_user_id {telegram_user_id}, timezone {timezone_str}: {e}", exc_info=True)
+            await _rollback(session, e)
             return False # Indicate failure
 
 async def get_user_timezone(telegram_user_id: int) -> str:
     """
     Retrieves the timezone for a user. Returns default 'Europe/Berlin' if user not found.
+    Results are cached in-process for USER_TIMEZONE_CACHE_TTL_SECONDS.
     """
-    async with async_session_maker() as session:
+    cached = _tz_cache.get(telegram_user_id)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    async with _session_scope() as session:
         try:
-            result = await session.execute(
-                select(User.timezone)
+            # COALESCE applies the default in SQL; no row at all (unknown user) yields None
+            # lambda_stmt: statement construction/compilation is cached by the lambda's code location,
+            # only telegram_user_id is re-bound per call
+            result = await session.execute(lambda_stmt(
+                lambda: select(func.coalesce(User.timezone, literal('Europe/Berlin')))
                 .where(User.telegram_user_id == telegram_user_id)
-            )
-            timezone = result.scalar_one_or_none()
-            # Return stored timezone or default if user/timezone not found
-            return timezone if timezone is not None else 'Europe/Berlin'
+                .limit(1)
+            ))
+            timezone = result.scalar()
+            if timezone is not None:
+                _tz_cache[telegram_user_id] = (timezone, time.monotonic() + USER_TIMEZONE_CACHE_TTL_SECONDS)
+            return timezone or 'Europe/Berlin' # Default if user not found
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_timezone for telegram_user_id {telegram_user_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             # Return default in case of error as well
             return 'Europe/Berlin'
 
@@ -145,16 +446,41 @@ async def add_user_channel(user_id: int, chat_id: int, chat_username: Optional[s
     Adds a channel association for a user. user_id is the PK from the users table.
     Returns the created/reactivated UserChannel object or None on error/duplicate.
     Checks if the channel already exists for the user (active or inactive) and reactivates it if inactive.
+    On PostgreSQL/SQLite this is a single INSERT ... ON CONFLICT (user_id, chat_id) DO UPDATE ... RETURNING
+    (backed by the unique ix_userchannel_user_chat index).
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
+            insert_stmt = _upsert_insert(UserChannel)
+            if insert_stmt is not None:
+                insert_stmt = insert_stmt.values(
+                    user_id=user_id,
+                    chat_id=chat_id,
+                    chat_username=chat_username,
+                    is_active=True
+                )
+                # On conflict reactivate the existing entry and refresh the username in case it changed
+                stmt = insert_stmt.on_conflict_do_update(
+                    index_elements=[UserChannel.user_id, UserChannel.chat_id],
+                    set_={
+                        'is_active': True,
+                        'removed_at': None,
+                        'chat_username': insert_stmt.excluded.chat_username,
+                    }
+                ).returning(UserChannel).execution_options(populate_existing=True)
+                user_channel = (await session.scalars(stmt)).one()
+                await _commit(session)
+                logger.info(f"User channel added/reactivated: user_id={user_id}, chat_id={chat_id}")
+                return user_channel
+
+            # Fallback for dialects without ON CONFLICT support
             # Check if the combination already exists
             existing_channel_stmt = select(UserChannel).where(
                 UserChannel.user_id == user_id,
                 UserChannel.chat_id == chat_id
-            )
+            ).limit(1)
             existing_channel_result = await session.execute(existing_channel_stmt)
-            existing_channel = existing_channel_result.scalars().first()
+            existing_channel = existing_channel_result.scalar_one_or_none()
 
             if existing_channel:
                 if not existing_channel.is_active:
@@ -163,8 +489,7 @@ async def add_user_channel(user_id: int, chat_id: int, chat_username: Optional[s
                     existing_channel.removed_at = None # Clear removal timestamp
                     # Update username in case it changed
                     existing_channel.chat_username = chat_username
-                    await session.commit()
-                    await session.refresh(existing_channel)
+                    await _commit(session) # No refresh: attributes set above are current (expire_on_commit=False)
                     logger.info(f"Reactivated user channel: user_id={user_id}, chat_id={chat_id}")
                     return existing_channel
                 else:
@@ -173,22 +498,22 @@ async def add_user_channel(user_id: int, chat_id: int, chat_username: Optional[s
                     return existing_channel
             else:
                  # Does not exist, create new
-                new_user_channel = UserChannel(
-                    user_id=user_id,
-                    chat_id=chat_id,
-                    chat_username=chat_username,
-                    is_active=True # Should be active by default on creation
-                )
-                session.add(new_user_channel)
-                await session.commit()
-                await session.refresh(new_user_channel)
+                new_user_channel = (await session.scalars(
+                    insert(UserChannel).values(
+                        user_id=user_id,
+                        chat_id=chat_id,
+                        chat_username=chat_username,
+                        is_active=True # Should be active by default on creation
+                    ).returning(UserChannel) # Populates added_at etc., no refresh needed
+                )).one()
+                await _commit(session)
                 logger.info(f"Created new user channel: user_id={user_id}, chat_id={chat_id}")
                 return new_user_channel
 
         except SQLAlchemyError as e: # Catch IntegrityError as part of general SQLAlchemyError
-            await session.rollback()
             # Use logger instead of print
             logger.error(f"Database error in add_user_channel for user_id {user_id}, chat_id {chat_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             # Consider logging specific IntegrityError if needed, but general handler is often sufficient
             return None # Indicate failure
 
@@ -197,41 +522,71 @@ async def remove_user_channel(user_id: int, chat_id: int) -> bool:
     """
     Deactivates a user-channel association (soft delete). Returns True on success.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             result = await session.execute(
                 update(UserChannel)
                 .where(UserChannel.user_id == user_id, UserChannel.chat_id == chat_id, UserChannel.is_active == True)
-                # Use datetime.datetime.now(timezone.utc) if column is DateTime(timezone=True)
-                # The model uses DateTime (naive) and expects UTC naive or timezone-aware stored as UTC naive depending on dialect/configuration.
-                # Sticking to UTC naive as per original model definition implies database expects naive UTC.
-                .values(is_active=False, removed_at=datetime.utcnow(), updated_at=func.now()) # Ensure updated_at is set
+                # removed_at is DateTime (naive) holding UTC; stamped by the DB clock (see _sql_utc_now)
+                .values(is_active=False, removed_at=_sql_utc_now())
                 .returning(UserChannel.id) # Use returning to check if a row was updated
             )
             updated_id = result.scalar_one_or_none()
-            await session.commit()
+            await _commit(session)
             if updated_id:
                 logger.info(f"User channel removed (deactivated): user_id={user_id}, chat_id={chat_id}")
             else:
                 logger.warning(f"Could not remove user channel: user_id={user_id}, chat_id={chat_id} not found or already inactive.")
             return updated_id is not None
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in remove_user_channel for user_id {user_id}, chat_id {chat_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return False # Indicate failure
 
+async def migrate_user_channels_chat_id(old_chat_id: int, new_chat_id: int) -> int:
+    """
+    Moves user_channels rows to the new ID of a group upgraded to a supergroup (Telegram's migrate_to_chat_id).
+    Users that already have a row for the new ID keep it; their row for the old ID is deactivated.
+    Returns the number of moved rows.
+    """
+    async with _session_scope() as session:
+        try:
+            # Users with a row for the new ID (the unique (user_id, chat_id) index forbids a second one)
+            new_rows = select(UserChannel.user_id).where(UserChannel.chat_id == new_chat_id).scalar_subquery()
+            await session.execute(
+                update(UserChannel)
+                .where(UserChannel.chat_id == old_chat_id, UserChannel.user_id.in_(new_rows), UserChannel.is_active == True)
+                .values(is_active=False, removed_at=_sql_utc_now())
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(
+                update(UserChannel)
+                .where(UserChannel.chat_id == old_chat_id, UserChannel.user_id.not_in(new_rows))
+                .values(chat_id=new_chat_id)
+                .execution_options(synchronize_session=False)
+            )
+            await _commit(session)
+            logger.info("Chat %s migrated to %s: %s user channel rows updated.", old_chat_id, new_chat_id, result.rowcount)
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in migrate_user_channels_chat_id ({old_chat_id} -> {new_chat_id}): {e}", exc_info=True)
+            await _rollback(session, e)
+            return 0
+
+
 async def get_user_channel_by_db_id(user_id: int, channel_db_id: int) -> Optional[UserChannel]:
     """
     Retrieves a user channel entry by its primary key (UserChannel.id) for a specific user.
     Ensures the channel belongs to the user.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            stmt = select(UserChannel).where(UserChannel.id == channel_db_id, UserChannel.user_id == user_id)
+            stmt = select(UserChannel).where(UserChannel.id == channel_db_id, UserChannel.user_id == user_id).limit(1)
             result = await session.execute(stmt)
-            return result.scalars().first()
+            return result.scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_channel_by_db_id for user {user_id}, db_id {channel_db_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             return None
 
 
@@ -239,19 +594,28 @@ async def get_user_channels(user_id: int, active_only: bool = True) -> list[User
     """
     Retrieves channels associated with a user. user_id is PK from users table.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            stmt = select(UserChannel).where(UserChannel.user_id == user_id)
+            # Cached lambda statement; the optional filter is a separate cached lambda step
+            stmt = lambda_stmt(lambda: select(UserChannel).where(UserChannel.user_id == user_id))
             if active_only:
-                stmt = stmt.where(UserChannel.is_active == True)
+                stmt += lambda s: s.where(UserChannel.is_active == True)
             result = await session.execute(stmt)
             channels = result.scalars().all()
-            logger.debug(f"Retrieved {len(channels)} channels for user_id {user_id} (active_only={active_only}).")
+            logger.debug("Retrieved %s channels for user_id %s (active_only=%s).", len(channels), user_id, active_only)
             return channels
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_channels for user_id {user_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             return [] # Return empty list on error
 
+def _to_naive_utc(dt: datetime | None) -> datetime | None:
+    """Converts a datetime to UTC naive for DateTime (naive) columns. Naive input is assumed to be UTC already."""
+    if isinstance(dt, datetime) and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
 async def add_scheduled_post(
     user_id: int,
     chat_ids: list[int],
@@ -268,74 +632,113 @@ async def add_scheduled_post(
     Adds a new scheduled post entry to the database.
     Note: Ensure run_date_utc and delete_at_utc are timezone-aware UTC datetime objects
     if the column type is DateTime(timezone=True). Based on the Post model,
-    it's DateTime (naive), so pass UTC naive datetime objects created with datetime.utcnow().
+    it's DateTime (naive), so pass UTC naive datetime objects (aware values are converted to UTC naive).
+    Thin wrapper over add_scheduled_posts for a single post.
     """
-    async with async_session_maker() as session:
+    posts = await add_scheduled_posts([{
+        'user_id': user_id,
+        'chat_ids': chat_ids,
+        'text': text,
+        'media_paths': media_paths,
+        'schedule_type': schedule_type,
+        'schedule_params': schedule_params,
+        'run_date_utc': run_date_utc,
+        'delete_after_seconds': delete_after_seconds,
+        'delete_at_utc': delete_at_utc,
+        'status': status,
+    }])
+    return posts[0]
+
+
+async def add_scheduled_posts(posts_data: list[dict[str, Any]]) -> list[Post]:
+    """
+    Adds many scheduled posts in one transaction with a single multi-row INSERT ... RETURNING.
+    Each dict takes the same keys as the add_scheduled_post arguments; 'status' defaults to 'scheduled'.
+    Returns the created Post objects in input order.
+    """
+    if not posts_data:
+        return []
+
+    rows = []
+    for data in posts_data:
+        row = dict(data)
+        row.setdefault('status', PostStatusEnum.SCHEDULED.value)
+        # Convert timezone-aware UTC to naive UTC since columns are DateTime (naive)
+        row['run_date_utc'] = _to_naive_utc(row.get('run_date_utc'))
+        row['delete_at_utc'] = _to_naive_utc(row.get('delete_at_utc'))
+        rows.append(row)
+
+    async with _session_scope() as session:
         try:
-            new_post = Post(
-                user_id=user_id,
-                chat_ids=chat_ids, # Stored as JSON
-                text=text,
-                media_paths=media_paths, # Stored as JSON
-                schedule_type=schedule_type, # Stored as string Enum value
-                schedule_params=schedule_params, # Stored as JSON
-                # Convert timezone-aware UTC to naive UTC if column is DateTime (naive)
-                run_date_utc=run_date_utc.replace(tzinfo=None) if run_date_utc and run_date_utc.tzinfo is not None else run_date_utc,
-                delete_after_seconds=delete_after_seconds,
-                 # Convert timezone-aware UTC to naive UTC if column is DateTime (naive)
-                delete_at_utc=delete_at_utc.replace(tzinfo=None) if delete_at_utc and delete_at_utc.tzinfo is not None else delete_at_utc,
-                status=status # Stored as string Enum value
+            # ORM bulk INSERT with RETURNING: one round-trip, server defaults (created_at, ...) come back too,
+            # so no per-post refresh is needed.
+            result = await session.scalars(
+                insert(Post).returning(Post, sort_by_parameter_order=True),
+                rows
             )
-            session.add(new_post)
-            await session.commit()
-            await session.refresh(new_post)
-            logger.info(f"Added new scheduled post with ID: {new_post.id} for user {user_id}")
-            return new_post
+            new_posts = result.all()
+            await _commit(session)
+            logger.info(f"Added {len(new_posts)} new scheduled post(s) with IDs: {[post.id for post in new_posts]}")
+            return list(new_posts)
         except SQLAlchemyError as e:
-            await session.rollback()
-            logger.error(f"Database error in add_scheduled_post for user {user_id}: {e}", exc_info=True)
+            user_ids = sorted({row.get('user_id') for row in rows})
+            logger.error(f"Database error in add_scheduled_posts for users {user_ids}: {e}", exc_info=True)
+            await _rollback(session, e)
             raise # Re-raise the exception
 
 async def get_post_by_id(post_id: int) -> Post | None:
     """
     Retrieves a post by its ID.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            result = await session.execute(select(Post).where(Post.id == post_id))
-            post = result.scalars().first()
+            # session.get hits the identity map first (no query if already loaded in this session),
+            # otherwise issues a primary-key SELECT
+            post = await session.get(Post, post_id)
             if post:
-                logger.debug(f"Retrieved post with ID: {post_id}")
+                logger.debug("Retrieved post with ID: %s", post_id)
             else:
-                 logger.debug(f"Post with ID: {post_id} not found.")
+                 logger.debug("Post with ID: %s not found.", post_id)
             return post
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_post_by_id for post ID {post_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             return None # Return None on error
 
-async def get_all_scheduled_posts_for_reload(session: AsyncSession) -> list[Post]:
+async def get_all_scheduled_posts_for_reload(session: AsyncSession) -> AsyncIterator[Post]:
     """
-    Retrieves all posts with status 'scheduled'.
-    This function is designed to be called with an existing session, e.g., during startup.
+    Streams all posts with status 'scheduled' (async generator).
+    This function is designed to be called with an existing session, e.g., during startup:
+        async for post in get_all_scheduled_posts_for_reload(session): ...
+    Rows are fetched and hydrated in batches of 500, so memory stays O(batch) instead of O(N).
     """
+    count = 0
     try:
         # Use the string value as per how it's stored by default in the model
-        stmt = select(Post).where(Post.status == PostStatusEnum.SCHEDULED.value)
-        result = await session.execute(stmt)
-        posts = result.scalars().all()
-        logger.info(f"Retrieved {len(posts)} scheduled posts for reload.")
-        return posts
+        # selectinload(Post.user): authors for each batch come in one extra SELECT ... IN (...),
+        # so reading post.user (e.g. the user's timezone) doesn't trigger a lazy load per post
+        stmt = lambda_stmt(
+            lambda: select(Post)
+            .options(selectinload(Post.user))
+            .where(Post.status == PostStatusEnum.SCHEDULED.value)
+        )
+        result = await session.stream_scalars(stmt, execution_options={'yield_per': 500})
+        async for post in result:
+            count += 1
+            yield post
+        logger.info(f"Streamed {count} scheduled posts for reload.")
     except SQLAlchemyError as e:
-        logger.error(f"Database error in get_all_scheduled_posts_for_reload: {e}", exc_info=True)
-        # Note: No rollback here as the session is managed by the caller
-        return [] # Return empty list on error
+        logger.error(f"Database error in get_all_scheduled_posts_for_reload after {count} posts: {e}", exc_info=True)
+        # Note: No rollback here as the session is managed by the caller.
+        # Re-raised: a truncated stream must not look like the complete set of scheduled posts
+        raise
 
 async def get_user_posts(user_id: int, statuses: list[str] | None = None) -> list[Post]:
     """
     Retrieves posts for a specific user. user_id is PK from users table.
     Optionally filtered by statuses. Defaults to 'scheduled' status if statuses is None.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             stmt = select(Post).where(Post.user_id == user_id)
             # Use string values for filtering as they are stored as strings
@@ -347,72 +750,99 @@ async def get_user_posts(user_id: int, statuses: list[str] | None = None) -> lis
                 stmt = stmt.where(Post.status.in_(statuses))
             else:
                  # If statuses is an empty list, return no posts
-                 logger.debug(f"get_user_posts for user {user_id} called with empty statuses list, returning empty.")
+                 logger.debug("get_user_posts for user %s called with empty statuses list, returning empty.", user_id)
                  return []
 
             result = await session.execute(stmt)
             posts = result.scalars().all()
-            logger.debug(f"Retrieved {len(posts)} posts for user {user_id} with statuses {statuses}.")
+            logger.debug("Retrieved %s posts for user %s with statuses %s.", len(posts), user_id, statuses)
             return posts
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_posts for user_id {user_id}, statuses {statuses}: {e}", exc_info=True)
+            _read_failed(session, e)
             return [] # Return empty list on error
 
-async def update_post_details(post_id: int, **kwargs: Any) -> Post | None:
+async def get_user_posts_summary(user_id: int, statuses: list[str] | None = None) -> list[Row]:
     """
-    Updates specific fields of a post. Returns the updated Post object or None.
-    Handles potential conversion for datetime fields.
+    Lightweight variant of get_user_posts for list views: returns Row tuples with only
+    (id, status, run_date_utc, text) instead of full Post objects, skipping ORM hydration.
+    Use get_user_posts / get_post_by_id where the full object is needed (e.g. editing).
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            # Filter kwargs to only include valid updateable fields
-            valid_keys = Post.__table__.columns.keys()
-            update_values = {}
-            for k, v in kwargs.items():
-                if k in valid_keys:
-                    # Handle specific conversions if needed, e.g., datetime timezone
-                    # Assuming Post model has DateTime (naive) for these columns
-                    if k in ['run_date_utc', 'delete_at_utc'] and isinstance(v, datetime):
-                        if v.tzinfo is not None:
-                             # If input is timezone-aware, convert to UTC naive for naive column
-                             update_values[k] = v.astimezone(timezone.utc).replace(tzinfo=None)
-                        else:
-                             # If input is naive, use as is (assuming it's intended as UTC naive)
-                             update_values[k] = v
-                    elif k == 'schedule_type' and isinstance(v, ScheduleTypeEnum):
-                         update_values[k] = v.value # Ensure storing string value of Enum
-                    elif k == 'status' and isinstance(v, PostStatusEnum):
-                         update_values[k] = v.value # Ensure storing string value of Enum
-                    # Handle JSON fields - assume input is already list/dict
-                    # Handle int/str/bool fields - assume input is already correct type
-                    else:
-                         update_values[k] = v
-                else:
-                    logger.warning(f"Attempted to update unknown field '{k}' for Post ID {post_id}.")
+            stmt = select(Post.id, Post.status, Post.run_date_utc, Post.text).where(Post.user_id == user_id)
+            if statuses is None:
+                stmt = stmt.where(Post.status == PostStatusEnum.SCHEDULED.value)
+            elif statuses:
+                stmt = stmt.where(Post.status.in_(statuses))
+            else:
+                 return []
 
+            rows = (await session.execute(stmt)).all()
+            logger.debug("Retrieved %s post summaries for user %s with statuses %s.", len(rows), user_id, statuses)
+            return rows
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in get_user_posts_summary for user_id {user_id}, statuses {statuses}: {e}", exc_info=True)
+            _read_failed(session, e)
+            return [] # Return empty list on error
 
-            if not update_values:
-                logger.warning(f"No valid fields provided for update_post_details for post ID {post_id}.")
-                # Fetch the existing post to return
-                return await get_post_by_id(post_id)
+def _normalize_utc(dt: datetime | None) -> datetime | None:
+    """Converts a datetime to UTC-aware for DateTime(timezone=True) columns. Naive input is assumed to be UTC."""
+    if dt is None:
+        return None
+    return dt.astimezone(_UTC) if dt.tzinfo is not None else dt.replace(tzinfo=_UTC)
 
-            # Always update updated_at
-            update_values['updated_at'] = func.now()
 
-            stmt = update(Post).where(Post.id == post_id).values(**update_values)
-            await session.execute(stmt)
-            await session.commit()
+def _identity(value: Any) -> Any:
+    return value
+
+
+# Per-column value converters for update_post_details (columns not listed are passed through as is):
+# aware datetimes -> UTC naive for the DateTime (naive) columns, Enum members -> stored string value
+_POST_COERCERS: Dict[str, Any] = {
+    'run_date_utc': _to_naive_utc,
+    'delete_at_utc': _to_naive_utc,
+    'schedule_type': lambda v: v.value if isinstance(v, ScheduleTypeEnum) else v,
+    'status': lambda v: v.value if isinstance(v, PostStatusEnum) else v,
+}
+
+
+async def update_post_details(post_id: int, **kwargs: Any) -> Post | None:
+    """
+    Updates specific fields of a post. Returns the updated Post object or None.
+    Handles potential conversion for datetime fields.
+    """
+    # Filter kwargs to only include valid updateable fields and coerce them in one pass,
+    # before a session is opened
+    unknown = kwargs.keys() - _POST_COLS
+    if unknown:
+        logger.warning(f"Attempted to update unknown field(s) {sorted(unknown)} for Post ID {post_id}.")
+    update_values = {k: _POST_COERCERS.get(k, _identity)(v) for k, v in kwargs.items() if k in _POST_COLS}
+    if not update_values:
+        logger.warning(f"No valid fields provided for update_post_details for post ID {post_id}.")
+        # Fetch the existing post to return
+        return await get_post_by_id(post_id)
+
+    async with _session_scope() as session:
+        try:
+            # updated_at is stamped by the model's onupdate=func.now()
+            # UPDATE ... RETURNING hydrates the Post in the same round-trip (no follow-up SELECT)
+            stmt = (
+                update(Post).where(Post.id == post_id).values(**update_values)
+                .returning(Post)
+                .execution_options(populate_existing=True)
+            )
+            updated_post = (await session.scalars(stmt)).one_or_none()
+            await _commit(session)
 
-            # Fetch the updated post to return
-            updated_post = await get_post_by_id(post_id)
             if updated_post:
                  logger.info(f"Post ID {post_id} details updated.")
             else:
-                 logger.warning(f"Post ID {post_id} updated but not found after update?") # Should not happen normally
+                 logger.warning(f"Post ID {post_id} not found for update.")
             return updated_post
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in update_post_details for post ID {post_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return None # Return None on error
 
 # Alias update_post_details for clarity in task handlers
@@ -428,26 +858,192 @@ async def update_post_status(post_id: int, status: str) -> Post | None:
          return None # Indicate failure due to invalid status
 
 
+async def bulk_update_post_status(post_ids: list[int], status: str) -> int:
+    """
+    Sets the same status on many posts with a single UPDATE ... WHERE id IN (...).
+    Returns the number of updated rows (0 on an invalid status or a database error).
+    """
+    if not post_ids:
+        return 0
+    try:
+        status_enum = PostStatusEnum(status)
+    except ValueError:
+        logger.error(f"Attempted to bulk update {len(post_ids)} posts with invalid status string: {status}")
+        return 0
+
+    async with _session_scope() as session:
+        try:
+            # updated_at is stamped by the model's onupdate=func.now(); no in-session objects to reconcile
+            result = await session.execute(
+                update(Post).where(Post.id.in_(post_ids)).values(status=status_enum.value)
+                .execution_options(synchronize_session=False)
+            )
+            await _commit(session)
+            logger.info("Updated status of %s posts to '%s'.", result.rowcount, status_enum.value)
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in bulk_update_post_status ({len(post_ids)} posts, status={status}): {e}", exc_info=True)
+            await _rollback(session, e)
+            return 0
+
+
 async def delete_post_by_id(post_id: int) -> bool:
     """
     Deletes a post by its ID. Returns True on success.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             stmt = delete(Post).where(Post.id == post_id).returning(Post.id)
             result = await session.execute(stmt)
             deleted_id = result.scalar_one_or_none()
-            await session.commit()
+            await _commit(session)
             if deleted_id:
                  logger.info(f"Post ID {post_id} successfully deleted.")
             else:
                  logger.warning(f"Post with ID {post_id} not found for deletion.")
             return deleted_id is not None # True if a row was actually deleted
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in delete_post_by_id for post ID {post_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return False # Indicate failure
 
+async def delete_scheduler_jobs(delete_stmt: Delete) -> int:
+    """
+    Executes a DELETE of APScheduler job rows built by the scheduler from its job store table
+    (e.g. every MESSAGE_DELETE_{post_id}_ job of a post, see scheduler.cancel_all_jobs_for_post).
+    Returns the number of deleted jobs.
+    """
+    async with _session_scope() as session:
+        try:
+            result = await session.execute(delete_stmt)
+            await _commit(session)
+            logger.debug("Deleted %d scheduler jobs", result.rowcount)
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in delete_scheduler_jobs: {e}", exc_info=True)
+            await _rollback(session, e)
+            return 0
+
+async def insert_scheduler_job_rows(rows: list[dict], delete_stmt: Delete, insert_stmt: Insert) -> int:
+    """
+    Writes prepared APScheduler job rows ({'id', 'next_run_time', 'job_state'}) with the statements
+    built by scheduler.job_rows_replace_statements(): delete_stmt removes rows with the same IDs,
+    insert_stmt is executed with rows. Inside session_scope() this joins the caller's transaction,
+    so e.g. a post status update and its message deletion jobs are committed together.
+    Returns the number of inserted rows.
+    """
+    if not rows:
+        return 0
+    async with _session_scope() as session:
+        try:
+            await session.execute(delete_stmt)
+            await session.execute(insert_stmt, rows)
+            await _commit(session)
+            logger.debug("Inserted %d scheduler job rows", len(rows))
+            return len(rows)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in insert_scheduler_job_rows for {len(rows)} rows: {e}", exc_info=True)
+            await _rollback(session, e)
+            return 0
+
+async def get_telegram_file_ids(content_hashes: list[str]) -> Dict[tuple[str, str], tuple[str, datetime]]:
+    """
+    Returns unexpired cached Telegram file_ids for the given file content hashes in one query:
+    (content_hash, media_type) -> (file_id, expires_at as aware UTC datetime).
+    """
+    if not content_hashes:
+        return {}
+    async with _session_scope() as session:
+        try:
+            result = await session.execute(
+                select(TelegramFile.content_hash, TelegramFile.media_type, TelegramFile.file_id, TelegramFile.expires_at)
+                .where(TelegramFile.content_hash.in_(set(content_hashes)), TelegramFile.expires_at > datetime.now(timezone.utc))
+            )
+            return {
+                (content_hash, media_type): (file_id, _normalize_utc(expires_at))
+                for content_hash, media_type, file_id, expires_at in result.tuples()
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in get_telegram_file_ids for {len(content_hashes)} hashes: {e}", exc_info=True)
+            _read_failed(session, e)
+            return {}
+
+async def save_telegram_file_id(content_hash: str, media_type: str, file_id: str, expires_at: datetime) -> bool:
+    """Stores (or replaces) the cached Telegram file_id of a local file. expires_at is an aware UTC datetime."""
+    values = {'content_hash': content_hash, 'media_type': media_type, 'file_id': file_id, 'expires_at': _normalize_utc(expires_at)}
+    async with _session_scope() as session:
+        try:
+            insert_stmt = _upsert_insert(TelegramFile)
+            if insert_stmt is not None:
+                await session.execute(
+                    insert_stmt.values(values).on_conflict_do_update(
+                        index_elements=[TelegramFile.content_hash, TelegramFile.media_type],
+                        set_={'file_id': file_id, 'expires_at': values['expires_at']}
+                    )
+                )
+            else:
+                await session.merge(TelegramFile(**values))
+            await _commit(session)
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in save_telegram_file_id for {content_hash}/{media_type}: {e}", exc_info=True)
+            await _rollback(session, e)
+            return False
+
+async def delete_telegram_file_id(content_hash: str, media_type: str) -> bool:
+    """Deletes a cached Telegram file_id (e.g. after Telegram rejected it as a wrong file identifier)."""
+    async with _session_scope() as session:
+        try:
+            result = await session.execute(
+                delete(TelegramFile).where(TelegramFile.content_hash == content_hash, TelegramFile.media_type == media_type)
+            )
+            await _commit(session)
+            return result.rowcount > 0
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in delete_telegram_file_id for {content_hash}/{media_type}: {e}", exc_info=True)
+            await _rollback(session, e)
+            return False
+
+async def get_dead_chat_ids() -> set[int]:
+    """Returns the IDs of all chats marked as dead (see services/dead_chats.py)."""
+    async with _session_scope() as session:
+        try:
+            result = await session.execute(select(DeadChat.chat_id))
+            return set(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in get_dead_chat_ids: {e}", exc_info=True)
+            _read_failed(session, e)
+            return set()
+
+async def add_dead_chat(chat_id: int, reason: Optional[str]) -> bool:
+    """Marks a chat as dead; a chat that is already marked keeps its first reason."""
+    values = {'chat_id': chat_id, 'reason': reason[:255] if reason else None}
+    async with _session_scope() as session:
+        try:
+            insert_stmt = _upsert_insert(DeadChat)
+            if insert_stmt is not None:
+                await session.execute(insert_stmt.values(values).on_conflict_do_nothing(index_elements=[DeadChat.chat_id]))
+            elif await session.get(DeadChat, chat_id) is None:
+                session.add(DeadChat(**values))
+            await _commit(session)
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in add_dead_chat for chat {chat_id}: {e}", exc_info=True)
+            await _rollback(session, e)
+            return False
+
+async def delete_dead_chat(chat_id: int) -> bool:
+    """Removes the dead mark of a chat. Returns True if the chat was marked."""
+    async with _session_scope() as session:
+        try:
+            result = await session.execute(delete(DeadChat).where(DeadChat.chat_id == chat_id))
+            await _commit(session)
+            return result.rowcount > 0
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in delete_dead_chat for chat {chat_id}: {e}", exc_info=True)
+            await _rollback(session, e)
+            return False
+
 async def add_rss_feed(
     user_id: int, # PK from users table
     feed_url: str,
@@ -458,80 +1054,100 @@ async def add_rss_feed(
     """
     Adds a new RSS feed subscription for a user.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            new_feed = RssFeed(
-                user_id=user_id,
-                feed_url=feed_url,
-                channels=channel_ids, # Stored as JSON
-                filter_keywords=filter_keywords, # Stored as JSON
-                frequency_minutes=frequency_minutes,
-                # next_check_utc will be set by the scheduler logic upon first check or manually after adding
-                # For simplicity, we can set it to now() UTC on creation, so scheduler picks it up soon
-                next_check_utc=datetime.now(timezone.utc)
-            )
-            session.add(new_feed)
-            await session.commit()
-            await session.refresh(new_feed)
+            # INSERT ... RETURNING: id and server defaults come back in the same round-trip, no refresh needed
+            new_feed = (await session.scalars(
+                insert(RssFeed).values(
+                    user_id=user_id,
+                    feed_url=feed_url,
+                    channels=channel_ids, # Stored as JSON
+                    filter_keywords=filter_keywords, # Stored as JSON
+                    frequency_minutes=frequency_minutes,
+                    # next_check_utc will be set by the scheduler logic upon first check or manually after adding
+                    # For simplicity, we can set it to now() UTC on creation, so scheduler picks it up soon
+                    next_check_utc=datetime.now(timezone.utc)
+                ).returning(RssFeed)
+            )).one()
+            await _commit(session)
             logger.info(f"Added new RSS feed with ID: {new_feed.id} for user {user_id}, URL: {feed_url}")
             return new_feed
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in add_rss_feed for user {user_id}, URL {feed_url}: {e}", exc_info=True)
+            await _rollback(session, e)
             raise # Re-raise the exception
 
 async def get_rss_feed_by_id(feed_id: int) -> RssFeed | None:
     """
     Retrieves an RSS feed by its ID.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            result = await session.execute(select(RssFeed).where(RssFeed.id == feed_id))
-            feed = result.scalars().first()
+            # Identity map first, primary-key SELECT otherwise
+            feed = await session.get(RssFeed, feed_id)
             if feed:
-                 logger.debug(f"Retrieved RSS feed with ID: {feed_id}")
+                 logger.debug("Retrieved RSS feed with ID: %s", feed_id)
             else:
-                 logger.debug(f"RSS feed with ID: {feed_id} not found.")
+                 logger.debug("RSS feed with ID: %s not found.", feed_id)
             return feed
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_rss_feed_by_id for feed ID {feed_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             return None # Return None on error
 
-async def get_all_active_rss_feeds() -> list[RssFeed]:
+async def get_all_active_rss_feeds() -> AsyncIterator[RssFeed]:
     """
-    Retrieves all RSS feeds considered active for the scheduler.
+    Streams all RSS feeds considered active for the scheduler (async generator).
     Assumes all entries are 'active' unless marked otherwise in a future column.
-    Used for initial sync/reload.
+    Used for initial sync/reload: async for feed in get_all_active_rss_feeds(): ...
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
+        count = 0
         try:
             # Add a filter if an 'is_active' column is added to RssFeed later
-            stmt = select(RssFeed)
-            result = await session.execute(stmt)
-            feeds = result.scalars().all()
-            logger.info(f"Retrieved {len(feeds)} active RSS feeds for reload.")
-            return feeds
+            stmt = select(RssFeed).execution_options(yield_per=500)
+            result = await session.stream_scalars(stmt)
+            async for feed in result:
+                count += 1
+                yield feed
+            logger.info(f"Streamed {count} active RSS feeds for reload.")
         except SQLAlchemyError as e:
-            logger.error(f"Database error in get_all_active_rss_feeds: {e}", exc_info=True)
-            return [] # Return empty list on error
+            logger.error(f"Database error in get_all_active_rss_feeds after {count} feeds: {e}", exc_info=True)
+            _read_failed(session, e)
 
-async def get_active_rss_feeds_due_for_check() -> list[RssFeed]:
+async def get_active_rss_feeds_due_for_check(batch_size: int = 100) -> list[RssFeed]:
     """
-    Retrieves RSS feeds that are active and whose next_check_utc is now or in the past.
+    Claims up to batch_size RSS feeds whose next_check_utc is now or in the past and returns them.
+    Works as a queue: rows are locked with FOR UPDATE SKIP LOCKED (PostgreSQL) so concurrent
+    workers never pick the same feed, and next_check_utc of the claimed feeds is advanced by their
+    frequency in one batched UPDATE within the same transaction.
     Used by the periodic RSS checking task.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             # Ensure comparison is timezone-aware as next_check_utc is stored as timezone-aware
             now_utc = datetime.now(timezone.utc)
-            stmt = select(RssFeed).where(RssFeed.next_check_utc <= now_utc)
+            stmt = (
+                select(RssFeed)
+                .where(RssFeed.next_check_utc <= now_utc)
+                .order_by(RssFeed.next_check_utc)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
             # Add filter for is_active if that column is added later
             result = await session.execute(stmt)
             feeds = result.scalars().all()
-            logger.debug(f"Retrieved {len(feeds)} RSS feeds due for check.")
+
+            if feeds:
+                # Advance next_check_utc for the whole batch in one statement
+                await _advance_next_check(session, [(feed.id, feed.frequency_minutes or 30) for feed in feeds])
+                await _commit(session)
+
+            logger.debug("Claimed %s RSS feeds due for check.", len(feeds))
             return feeds
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_active_rss_feeds_due_for_check: {e}", exc_info=True)
+            await _rollback(session, e)
             return [] # Return empty list on error
 
 
@@ -539,15 +1155,16 @@ async def get_user_rss_feeds(user_id: int) -> list[RssFeed]:
     """
     Retrieves RSS feeds subscribed to by a specific user. user_id is PK from users table.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             stmt = select(RssFeed).where(RssFeed.user_id == user_id)
             result = await session.execute(stmt)
             feeds = result.scalars().all()
-            logger.debug(f"Retrieved {len(feeds)} RSS feeds for user {user_id}.")
+            logger.debug("Retrieved %s RSS feeds for user %s.", len(feeds), user_id)
             return feeds
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_rss_feeds for user_id {user_id}: {e}", exc_info=True)
+            _read_failed(session, e)
             return [] # Return empty list on error
 
 async def update_rss_feed_details(feed_id: int, **kwargs: Any) -> RssFeed | None:
@@ -555,49 +1172,45 @@ async def update_rss_feed_details(feed_id: int, **kwargs: Any) -> RssFeed | None
     Updates specific fields of an RSS feed configuration. Returns the updated RssFeed object or None.
     Handles potential conversion for datetime fields like next_check_utc.
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
-            valid_keys = RssFeed.__table__.columns.keys()
+            unknown = kwargs.keys() - _RSSFEED_COLS
+            if unknown:
+                logger.warning(f"Attempted to update unknown field(s) {sorted(unknown)} for RSS Feed ID {feed_id}.")
             update_values = {}
             for k, v in kwargs.items():
-                 if k in valid_keys:
+                 if k in _RSSFEED_COLS:
                     # Handle specific conversions for DateTime(timezone=True) column
                     if k == 'next_check_utc' and isinstance(v, datetime):
-                         if v.tzinfo is None:
-                             # If input is naive, assume UTC and make it aware
-                             update_values[k] = pytz.utc.localize(v)
-                         else:
-                             # If input is aware, convert to UTC
-                             update_values[k] = v.astimezone(pytz.utc)
+                         update_values[k] = _normalize_utc(v) # Naive input is assumed UTC
                     # Handle JSON fields - assume input is already list/dict
                     # Handle int/str fields - assume input is already correct type
                     else:
                          update_values[k] = v
-                 else:
-                     logger.warning(f"Attempted to update unknown field '{k}' for RSS Feed ID {feed_id}.")
 
 
             if not update_values:
                 logger.warning(f"No valid fields provided for update_rss_feed_details for feed ID {feed_id}.")
                 return await get_rss_feed_by_id(feed_id) # Return the existing feed
 
-            # Always update updated_at
-            update_values['updated_at'] = func.now()
-
-            stmt = update(RssFeed).where(RssFeed.id == feed_id).values(**update_values)
-            await session.execute(stmt)
-            await session.commit()
+            # updated_at is stamped by the model's onupdate=func.now()
+            # UPDATE ... RETURNING hydrates the RssFeed in the same round-trip (no follow-up SELECT)
+            stmt = (
+                update(RssFeed).where(RssFeed.id == feed_id).values(**update_values)
+                .returning(RssFeed)
+                .execution_options(populate_existing=True)
+            )
+            updated_feed = (await session.scalars(stmt)).one_or_none()
+            await _commit(session)
 
-            # Fetch the updated feed to return
-            updated_feed = await get_rss_feed_by_id(feed_id)
             if updated_feed:
                 logger.info(f"RSS Feed ID {feed_id} details updated.")
             else:
-                 logger.warning(f"RSS Feed ID {feed_id} updated but not found after update?") # Should not happen
+                 logger.warning(f"RSS Feed ID {feed_id} not found for update.")
             return updated_feed
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in update_rss_feed_details for feed ID {feed_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return None # Return None on error
 
 async def update_rss_feed_next_check_utc(feed_id: int, frequency_minutes: int):
@@ -605,7 +1218,7 @@ async def update_rss_feed_next_check_utc(feed_id: int, frequency_minutes: int):
     Updates the next check time for a feed based on its frequency.
     Schedules the next check `frequency_minutes` from now (UTC).
     """
-    async with async_session_maker() as session:
+    async with _session_scope() as session:
         try:
             if frequency_minutes is None or frequency_minutes <= 0:
                  logger.warning(f"Cannot update next_check_utc for feed {feed_id} with non-positive frequency: {frequency_minutes}")
@@ -617,114 +1230,282 @@ async def update_rss_feed_next_check_utc(feed_id: int, frequency_minutes: int):
             result = await session.execute(
                 update(RssFeed)
                 .where(RssFeed.id == feed_id)
-                .values(next_check_utc=next_check, updated_at=func.now()) # Ensure updated_at is set
+                .values(next_check_utc=next_check) # updated_at is stamped by the model's onupdate
                 .returning(RssFeed.id)
             )
             updated_id = result.scalar_one_or_none()
-            await session.commit()
+            await _commit(session)
             if updated_id:
                  logger.info(f"Updated next_check_utc for RSS feed {feed_id} to {next_check}.")
             else:
                  logger.warning(f"Could not update next_check_utc for RSS feed {feed_id}: feed not found.")
             return updated_id is not None
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in update_rss_feed_next_check_utc for feed {feed_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return False
 
 
-async def delete_rss_feed_by_id(feed_id: int) -> bool:
+async def _advance_next_check(session: AsyncSession, items: list[tuple[int, int]]) -> None:
+    """
+    Sets next_check_utc = now + frequency minutes for many feeds at once; items are (feed_id, frequency_minutes).
+    PostgreSQL: one correlated UPDATE ... FROM (VALUES ...) AS v(id, freq) using the DB clock.
+    Other dialects: ORM bulk UPDATE by primary key (executemany) with Python-computed times.
+    """
+    if engine.dialect.name == 'postgresql':
+        v = values(column('id', Integer), column('freq', Integer), name='v').data(items)
+        await session.execute(
+            update(RssFeed)
+            .where(RssFeed.id == v.c.id)
+            .values(
+                next_check_utc=func.now() + func.make_interval(0, 0, 0, 0, 0, v.c.freq) # make_interval(mins => freq)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        now_utc = datetime.now(_UTC)
+        await session.execute(
+            update(RssFeed),
+            [
+                {'id': feed_id, 'next_check_utc': now_utc + timedelta(minutes=freq)}
+                for feed_id, freq in items
+            ]
+        )
+
+
+async def delete_rss_feed_by_id(feed_id: int, session: AsyncSession | None = None) -> bool:
     """
     Deletes an RSS feed configuration and associated rss_items. Returns True on success.
-    Assumes ON DELETE CASCADE is NOT set in DB, performs manual deletion of items.
+    Associated rss_items are removed by the database via ON DELETE CASCADE on rss_items.feed_id,
+    so this is a single DELETE statement.
     """
-    async with async_session_maker() as session:
+    async with _session_scope(session) as session:
         try:
-            # Delete associated RssItems first
-            delete_items_stmt = delete(RssItem).where(RssItem.feed_id == feed_id)
-            items_deleted = await session.execute(delete_items_stmt)
-            logger.debug(f"Deleted {items_deleted.rowcount} RSS items for feed ID {feed_id}.")
-
-            # Then delete the feed itself
-            delete_feed_stmt = delete(RssFeed).where(RssFeed.id == feed_id).returning(RssFeed.id)
+            if not _rss_items_cascade: # Legacy SQLite table without the cascade (see _upgrade_schema)
+                await session.execute(delete(RssItem).where(RssItem.feed_id == feed_id).execution_options(synchronize_session=False))
+            # synchronize_session=False: no reconciliation of in-session instances for this fire-and-forget delete;
+            # rowcount tells whether the feed existed, no RETURNING needed
+            delete_feed_stmt = (
+                delete(RssFeed).where(RssFeed.id == feed_id)
+                .execution_options(synchronize_session=False)
+            )
             result = await session.execute(delete_feed_stmt)
-            deleted_id = result.scalar_one_or_none()
-            await session.commit()
+            deleted = result.rowcount > 0
+            await _commit(session)
 
-            if deleted_id:
-                 logger.info(f"RSS Feed ID {feed_id} successfully deleted.")
-            else:
-                 logger.warning(f"RSS Feed with ID {feed_id} not found for deletion.")
-            return deleted_id is not None # True if a row was actually deleted
+            if not deleted:
+                 logger.warning("RSS Feed with ID %s not found for deletion.", feed_id)
+            elif logger.isEnabledFor(logging.INFO): # Skip message formatting when INFO is off
+                 logger.info("RSS Feed ID %s successfully deleted (rss_items removed by ON DELETE CASCADE).", feed_id)
+            return deleted # True if a row was actually deleted
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Database error in delete_rss_feed_by_id for feed ID {feed_id}: {e}", exc_info=True)
+            await _rollback(session, e)
             return False # Indicate failure
 
-async def mark_rss_item_posted(feed_id: int, item_guid: str, published_at: datetime | None) -> RssItem:
+@dataclass(slots=True, frozen=True)
+class RssItemView:
+    """Read-only snapshot of an rss_items row, built straight from RETURNING columns (no ORM instance)."""
+    id: int
+    feed_id: int
+    item_guid: str
+    is_posted: bool
+    published_at: datetime | None
+    created_at: datetime
+
+
+# Column order matches RssItemView fields, so rows map positionally: RssItemView(*row)
+_RSS_ITEM_VIEW_COLS = (RssItem.id, RssItem.feed_id, RssItem.item_guid, RssItem.is_posted, RssItem.published_at, RssItem.created_at)
+
+
+async def mark_rss_item_posted(feed_id: int, item_guid: str, published_at: datetime | None, session: AsyncSession | None = None) -> RssItemView:
     """
     Marks an RSS item as posted. Creates the item entry if it doesn't exist.
     Assumes published_at is timezone-aware UTC datetime object if column is DateTime(timezone=True).
+    Single-item wrapper over mark_rss_items_posted.
     """
-    async with async_session_maker() as session:
+    items = await mark_rss_items_posted(feed_id, [(item_guid, published_at)], session=session)
+    return items[0]
+
+
+async def mark_rss_items_posted(feed_id: int, items: list[tuple[str, datetime | None]], session: AsyncSession | None = None) -> list[RssItemView]:
+    """
+    Marks many RSS items of one feed as posted in a single transaction; items are (item_guid, published_at).
+    On PostgreSQL/SQLite this is one INSERT ... ON CONFLICT (feed_id, item_guid) DO UPDATE SET is_posted = true
+    RETURNING statement; other dialects fall back to SELECT existing + INSERT new + UPDATE unposted.
+    Returns RssItemView snapshots of the rows (new and existing). Naive published_at values are assumed to be UTC.
+    Pass session to run inside the caller's transaction (e.g. one session per feed batch); the caller commits.
+    """
+    if not items:
+        return []
+
+    # Deduplicate by guid (last published_at wins), keeping input order; UTC normalization happens
+    # here, before a session/connection is taken
+    published_by_guid: dict[str, datetime | None] = {
+        item_guid: _normalize_utc(published_at) for item_guid, published_at in items
+    }
+    rows = [
+        {'feed_id': feed_id, 'item_guid': item_guid, 'published_at': published_at, 'is_posted': True}
+        for item_guid, published_at in published_by_guid.items()
+    ]
+
+    async with _session_scope(session) as session:
         try:
-            # Check if item exists
+            insert_stmt = _upsert_insert(RssItem)
+            if insert_stmt is not None:
+                insert_stmt = insert_stmt.values(rows)
+                stmt = insert_stmt.on_conflict_do_update(
+                    index_elements=[RssItem.feed_id, RssItem.item_guid],
+                    set_={'is_posted': True}
+                ).returning(*_RSS_ITEM_VIEW_COLS)
+                marked = [RssItemView(*row) for row in await session.execute(stmt)]
+                await _commit(session)
+                _remember_posted(feed_id, published_by_guid.keys())
+                logger.debug("Upserted %s RSS items as posted for feed %s.", len(marked), feed_id)
+                return marked
+
+            # Fallback for dialects without ON CONFLICT support.
+            # Existence check fetches only (item_guid, id): no RssItem hydration / identity-map entries
             result = await session.execute(
-                select(RssItem).where(RssItem.feed_id == feed_id, RssItem.item_guid == item_guid)
+                select(RssItem.item_guid, RssItem.id)
+                .where(RssItem.feed_id == feed_id, RssItem.item_guid.in_(published_by_guid.keys()))
             )
-            rss_item = result.scalars().first()
-
-            if rss_item:
-                # Item exists, mark as posted if not already
-                if not rss_item.is_posted:
-                    rss_item.is_posted = True
-                    # Optional: update created_at/published_at if logic requires re-marking
-                    # rss_item.created_at = datetime.now(timezone.utc)
-                    # if published_at and published_at.tzinfo is not None:
-                    #      rss_item.published_at = published_at.astimezone(timezone.utc)
-                    # else: # Assume naive input is UTC if column expects aware
-                    #      rss_item.published_at = published_at.replace(tzinfo=timezone.utc) if published_at else None
-                    await session.commit()
-                    await session.refresh(rss_item)
-                    logger.debug(f"Marked existing RSS item as posted: feed={feed_id}, guid={item_guid}")
-                else:
-                     logger.debug(f"RSS item already marked as posted: feed={feed_id}, guid={item_guid}")
-                return rss_item
-            else:
-                # Create new item and mark as posted
-                new_rss_item = RssItem(
-                    feed_id=feed_id,
-                    item_guid=item_guid,
-                     # Ensure published_at is timezone-aware UTC if column is DateTime(timezone=True)
-                    published_at=published_at.astimezone(timezone.utc) if published_at and published_at.tzinfo is not None else (pytz.utc.localize(published_at) if published_at else None), # Localize naive to UTC
-                    is_posted=True,
-                    created_at=datetime.now(timezone.utc) # Ensure created_at is timezone-aware UTC
+            existing_ids = dict(result.tuples().all())
+
+            marked = []
+            new_rows = [row for row in rows if row['item_guid'] not in existing_ids]
+            if new_rows:
+                # Multi-row INSERT ... RETURNING: ids and server defaults come back without a refresh
+                inserted = await session.execute(insert(RssItem).returning(*_RSS_ITEM_VIEW_COLS, sort_by_parameter_order=True), new_rows)
+                marked.extend(RssItemView(*row) for row in inserted)
+
+            if existing_ids:
+                # Targeted UPDATE by PK ... RETURNING yields the existing rows already marked as posted
+                updated = await session.execute(
+                    update(RssItem).where(RssItem.id.in_(existing_ids.values())).values(is_posted=True)
+                    .returning(*_RSS_ITEM_VIEW_COLS)
+                    .execution_options(synchronize_session=False)
                 )
-                session.add(new_rss_item)
-                await session.commit()
-                await session.refresh(new_rss_item)
-                logger.debug(f"Created and marked new RSS item as posted: feed={feed_id}, guid={item_guid}")
-                return new_rss_item
+                marked.extend(RssItemView(*row) for row in updated)
+
+            await _commit(session)
+            _remember_posted(feed_id, published_by_guid.keys())
+            logger.debug("Marked %s RSS items as posted for feed %s (%s new, %s existing).", len(marked), feed_id, len(new_rows), len(existing_ids))
+            return marked
         except SQLAlchemyError as e:
-            await session.rollback()
-            logger.error(f"Database error in mark_rss_item_posted (feed={feed_id}, guid={item_guid}): {e}", exc_info=True)
+            logger.error(f"Database error in mark_rss_items_posted (feed={feed_id}, {len(items)} items): {e}", exc_info=True)
+            await _rollback(session, e)
             raise # Re-raise the exception
 
-async def is_rss_item_posted(feed_id: int, item_guid: str) -> bool:
+
+async def mark_rss_items_posted_many(items_by_feed: Dict[int, list[tuple[str, datetime | None]]]) -> Dict[int, list[RssItemView]]:
+    """
+    Marks RSS items of several feeds as posted in one transaction on one pooled connection;
+    items_by_feed maps feed_id -> [(item_guid, published_at), ...].
+    Feeds are processed one after another: an AsyncSession cannot run statements concurrently,
+    so gather() over a shared session would not overlap I/O anyway. Each feed is still one statement.
+    Returns feed_id -> RssItemView snapshots of the marked rows. All-or-nothing: an error rolls back every feed.
+    """
+    marked_by_feed: Dict[int, list[RssItemView]] = {}
+    if not items_by_feed:
+        return marked_by_feed
+    async with session_scope() as session:
+        for feed_id, items in items_by_feed.items():
+            marked_by_feed[feed_id] = await mark_rss_items_posted(feed_id, items, session=session)
+    logger.debug("Marked RSS items as posted for %s feeds in one transaction.", len(marked_by_feed))
+    return marked_by_feed
+
+
+# Per-task cache of (feed_id, item_guid) -> posted, active inside posted_cache_scope() (e.g. one RSS poll).
+# Repeated checks of the same item within the scope skip the DB entirely.
+_posted_cache: contextvars.ContextVar[Optional[dict[tuple[int, str], bool]]] = contextvars.ContextVar('rss_posted_cache', default=None)
+
+
+@contextmanager
+def posted_cache_scope():
+    """Enables the is_rss_item_posted result cache for the current task/context (e.g. one RSS poll cycle)."""
+    token = _posted_cache.set({})
+    try:
+        yield
+    finally:
+        _posted_cache.reset(token)
+
+
+def _remember_posted(feed_id: int, guids) -> None:
+    """Records guids as posted in the active posted cache, if any."""
+    cache = _posted_cache.get()
+    if cache is not None:
+        for item_guid in guids:
+            cache[(feed_id, item_guid)] = True
+
+
+# Errors of the asyncpg fast path are raised by the driver itself, not wrapped into SQLAlchemyError
+try:
+    from asyncpg import PostgresError as _AsyncpgError
+    _DB_ERRORS: tuple[type[BaseException], ...] = (SQLAlchemyError, _AsyncpgError)
+except ImportError:
+    _DB_ERRORS = (SQLAlchemyError,)
+
+# Raw SQL for the asyncpg fast path of is_rss_item_posted ($n placeholders are asyncpg's native style)
+_IS_POSTED_SQL = "SELECT 1 FROM rss_items WHERE feed_id = $1 AND item_guid = $2 AND is_posted = true LIMIT 1"
+# Built once at import: repeated calls hit the compiled-SQL cache without rebuilding the statement
+_stmt_is_posted = select(exists().where(
+    RssItem.feed_id == bindparam('fid'),
+    RssItem.item_guid == bindparam('guid'),
+    RssItem.is_posted.is_(True)
+))
+
+
+async def is_rss_item_posted(feed_id: int, item_guid: str, session: AsyncSession | None = None) -> bool:
     """
     Checks if an RSS item has already been marked as posted for a given feed.
+    Inside posted_cache_scope() results are cached per (feed_id, item_guid).
     """
-    async with async_session_maker() as session:
+    cache = _posted_cache.get()
+    if cache is not None:
+        cached = cache.get((feed_id, item_guid))
+        if cached is not None:
+            return cached
+
+    async with _session_scope(session) as session:
         try:
-            exists_stmt = select(exists().where(
-                RssItem.feed_id == feed_id,
-                RssItem.item_guid == item_guid,
-                RssItem.is_posted == True # Explicitly check for is_posted True
-            ))
-            result = await session.scalar(exists_stmt)
-            logger.debug(f"Checked if RSS item is posted (feed={feed_id}, guid={item_guid}): {result}")
+            if engine.dialect.driver == 'asyncpg':
+                # Hot path: query the asyncpg connection directly (same connection/transaction as the session),
+                # skipping statement construction, compilation and ORM result processing
+                conn = await session.connection()
+                raw_conn = await conn.get_raw_connection()
+                result = await raw_conn.driver_connection.fetchval(_IS_POSTED_SQL, feed_id, item_guid)
+            else:
+                result = await session.scalar(_stmt_is_posted, {'fid': feed_id, 'guid': item_guid})
+            logger.debug("Checked if RSS item is posted (feed=%s, guid=%s): %s", feed_id, item_guid, result)
+            if cache is not None:
+                cache[(feed_id, item_guid)] = bool(result)
             return bool(result) # Ensure boolean return
-        except SQLAlchemyError as e:
+        except _DB_ERRORS as e: # SQLAlchemyError, or a driver error from the raw asyncpg path
             logger.error(f"Database error in is_rss_item_posted (feed={feed_id}, guid={item_guid}): {e}", exc_info=True)
-            return False # Return False on error (safer not to post again)
+            raise # Like filter_posted_guids: False would mean "post it again"
+
 
+async def filter_posted_guids(feed_id: int, guids: list[str], session: AsyncSession | None = None) -> set[str]:
+    """
+    Bulk variant of is_rss_item_posted: returns the subset of guids already marked as posted
+    for the feed, using one SELECT ... IN query instead of one EXISTS per item.
+    Feed pollers should call this once per cycle and test membership in memory.
+    """
+    if not guids:
+        return set()
+    async with _session_scope(session) as session:
+        try:
+            result = await session.execute(
+                select(RssItem.item_guid).where(
+                    RssItem.feed_id == feed_id,
+                    RssItem.item_guid.in_(guids),
+                    RssItem.is_posted.is_(True)
+                )
+            )
+            posted = set(result.scalars())
+            logger.debug("Checked %s RSS items for feed %s: %s already posted.", len(guids), feed_id, len(posted))
+            return posted
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in filter_posted_guids (feed={feed_id}, {len(guids)} guids): {e}", exc_info=True)
+            raise # Unlike is_rss_item_posted, let the caller decide: an empty set would mean "post everything again"
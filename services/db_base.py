@@ -1,6 +1,9 @@
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import DeclarativeBase
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    pass
 
 # Этот файл определяет базовый декларативный класс для всех моделей SQLAlchemy в проекте.
 # Другие модели должны импортировать Base из этого файла.
+# DeclarativeBase (SQLAlchemy 2.0) заменяет устаревший sqlalchemy.ext.declarative.declarative_base().
@@ -0,0 +1,52 @@
+# services/dead_chats.py
+
+import logging
+from typing import Optional, Union
+
+import services.db as db_service
+
+logger = logging.getLogger(__name__)
+
+# Чаты, отправка в которые гарантированно завершается ошибкой (бот заблокирован/удален, чат не найден,
+# группа стала супергруппой). Отметки хранятся в памяти процесса и в таблице dead_chats;
+# send_post_bulk пропускает такие чаты, снять отметку можно командой /reset_chat или повторным
+# добавлением бота в чат (см. bot.py).
+_dead_chats: set[int] = set()
+_loaded = False
+
+
+async def ensure_loaded() -> None:
+    """Loads the dead chat IDs from the database once per process."""
+    global _loaded
+    if _loaded:
+        return
+    _dead_chats.update(await db_service.get_dead_chat_ids())
+    _loaded = True
+    if _dead_chats:
+        logger.info("Loaded %s dead chats; broadcasts will skip them.", len(_dead_chats))
+
+
+def is_dead(chat_id: Union[int, str]) -> bool:
+    """True if chat_id is marked as dead. Only numeric chat IDs are marked ('@username' chats never are)."""
+    return chat_id in _dead_chats
+
+
+async def mark_dead(chat_id: Union[int, str], reason: Optional[str]) -> None:
+    """Marks a chat as dead after a send failed with a permanent error (see telegram_api._dead_chat_reason)."""
+    if not isinstance(chat_id, int) or chat_id in _dead_chats:
+        return
+    _dead_chats.add(chat_id)
+    logger.warning("Chat %s marked as dead, broadcasts will skip it: %s", chat_id, reason)
+    await db_service.add_dead_chat(chat_id, reason)
+
+
+async def reset(chat_id: int) -> bool:
+    """Removes the dead mark of a chat so that it receives posts again. Returns True if the chat was marked."""
+    await ensure_loaded()
+    was_dead = chat_id in _dead_chats
+    _dead_chats.discard(chat_id)
+    if await db_service.delete_dead_chat(chat_id):
+        was_dead = True
+    if was_dead:
+        logger.info("Dead mark of chat %s removed.", chat_id)
+    return was_dead
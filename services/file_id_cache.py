@@ -0,0 +1,150 @@
+# services/file_id_cache.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import stat
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+import services.db as db_service
+
+logger = logging.getLogger(__name__)
+
+# Кэш file_id загруженных в Telegram локальных файлов: (хэш содержимого, тип медиа) -> file_id.
+# Хранится в памяти процесса и в таблице telegram_files, поэтому переживает перезапуск бота.
+# Ключ по содержимому: один и тот же файл под разными путями загружается один раз,
+# а измененный файл по тому же пути получает новый ключ.
+FILE_ID_TTL_SECONDS = 180 * 24 * 3600 # Telegram keeps file_ids of uploaded files valid for a long time
+# Files up to this size are hashed in full (as telegram_api.SHARED_UPLOAD_MAX_BYTES: they are read in full for
+# upload anyway); larger ones by their first and last HASH_CHUNK_SIZE bytes and the size
+FULL_HASH_MAX_BYTES = 20 * 1024 * 1024
+HASH_CHUNK_SIZE = 64 * 1024
+_MAX_ENTRIES = 4096 # Per in-memory dict; the oldest entries are dropped beyond this
+
+CacheKey = tuple[str, str] # (content_hash, media_type)
+
+# (абсолютный путь, размер, mtime_ns) -> хэш содержимого; хэш не пересчитывается, пока файл не изменился
+_content_hashes: dict[tuple[str, int, int], str] = {}
+# (content_hash, media_type) -> (file_id, срок годности по time.time())
+_file_ids: dict[CacheKey, tuple[str, float]] = {}
+# Хэши, для которых таблица уже прочитана (чтобы не ходить в БД за отсутствующими записями на каждой отправке)
+_loaded_hashes: dict[str, None] = {}
+
+
+def _remember(cache: dict, key: Any, value: Any) -> None:
+    cache[key] = value
+    if len(cache) > _MAX_ENTRIES:
+        del cache[next(iter(cache))] # Dicts keep insertion order: drop the oldest entry
+
+
+def _file_stat_key(path: Any) -> Optional[tuple[str, int, int]]:
+    """Returns (abspath, size, mtime_ns) for an existing regular file, or None if path is not a local file."""
+    if not isinstance(path, str):
+        return None
+    try:
+        stat_result = os.stat(path)
+    except (OSError, ValueError): # Not a path (file_id / URL) or not accessible
+        return None
+    if not stat.S_ISREG(stat_result.st_mode):
+        return None
+    return os.path.abspath(path), stat_result.st_size, stat_result.st_mtime_ns
+
+
+def _hash_file(path: str, size: int) -> str:
+    """
+    SHA-256 of the whole file up to FULL_HASH_MAX_BYTES, so same-size files differing anywhere get different keys.
+    Larger files (videos): SHA-256 of the first and last HASH_CHUNK_SIZE bytes and the size.
+    """
+    digest = hashlib.sha256()
+    if size <= FULL_HASH_MAX_BYTES:
+        with open(path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_CHUNK_SIZE))
+        digest.update(size.to_bytes(8, 'little'))
+        if size > HASH_CHUNK_SIZE:
+            f.seek(max(HASH_CHUNK_SIZE, size - HASH_CHUNK_SIZE))
+            digest.update(f.read(HASH_CHUNK_SIZE))
+    return digest.hexdigest()
+
+
+def cache_key(path: Any, media_type: Optional[str]) -> Optional[CacheKey]:
+    """
+    Returns the cache key of a local file sent as media_type, or None if path is not a local file.
+    The content hash is computed here only if preload() hasn't done it already.
+    """
+    stat_key = _file_stat_key(path)
+    if stat_key is None or not media_type:
+        return None
+    content_hash = _content_hashes.get(stat_key)
+    if content_hash is None:
+        try:
+            content_hash = _hash_file(stat_key[0], stat_key[1])
+        except OSError:
+            return None
+        _remember(_content_hashes, stat_key, content_hash)
+    return content_hash, media_type
+
+
+def get_cached(key: Optional[CacheKey]) -> Optional[str]:
+    """Returns the unexpired file_id for key from memory (see preload() for loading it from the database)."""
+    if key is None:
+        return None
+    cached = _file_ids.get(key)
+    if cached is None:
+        return None
+    if cached[1] <= time.time():
+        _file_ids.pop(key, None) # Expired
+        return None
+    return cached[0]
+
+
+async def preload(media_files: Optional[Iterable[dict[str, Any]]]) -> None:
+    """
+    Hashes the local files of a post (in a worker thread) and loads their cached file_ids from the database
+    with one query, so that the following get_cached()/cache_key() calls are memory-only.
+    """
+    paths = [item.get('media') for item in media_files or () if isinstance(item.get('media'), str)]
+    if not paths:
+        return
+    stat_keys = [stat_key for stat_key in map(_file_stat_key, paths) if stat_key is not None]
+    missing = [stat_key for stat_key in stat_keys if stat_key not in _content_hashes]
+    if missing:
+        try:
+            hashes = await asyncio.to_thread(lambda: [_hash_file(path, size) for path, size, _ in missing])
+        except OSError as e:
+            logger.warning("Failed to hash media files for the file_id cache: %s", e)
+            return
+        for stat_key, content_hash in zip(missing, hashes):
+            _remember(_content_hashes, stat_key, content_hash)
+
+    to_load = [_content_hashes[stat_key] for stat_key in stat_keys if _content_hashes.get(stat_key) not in _loaded_hashes]
+    if not to_load:
+        return
+    rows = await db_service.get_telegram_file_ids(to_load)
+    for key, (file_id, expires_at) in rows.items():
+        _remember(_file_ids, key, (file_id, expires_at.timestamp()))
+    for content_hash in to_load:
+        _remember(_loaded_hashes, content_hash, None)
+
+
+async def put(key: Optional[CacheKey], file_id: str, ttl: float = FILE_ID_TTL_SECONDS) -> None:
+    """Remembers the file_id Telegram assigned to an uploaded file, in memory and in the database."""
+    if key is None or not file_id:
+        return
+    expires_at = time.time() + ttl
+    _remember(_file_ids, key, (file_id, expires_at))
+    await db_service.save_telegram_file_id(key[0], key[1], file_id, datetime.now(timezone.utc) + timedelta(seconds=ttl))
+
+
+async def invalidate(key: Optional[CacheKey]) -> None:
+    """Forgets a file_id Telegram no longer accepts ("wrong file identifier"); the file is uploaded again."""
+    if key is None:
+        return
+    _file_ids.pop(key, None)
+    await db_service.delete_telegram_file_id(key[0], key[1])
@@ -0,0 +1,214 @@
+# services/jobstore.py
+
+import json
+import logging
+import pickle
+from datetime import datetime
+from typing import Any, Iterable
+
+from apscheduler.events import JobEvent, EVENT_JOB_ADDED
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+from sqlalchemy.exc import IntegrityError
+
+# orjson (optional) is noticeably faster than the stdlib json for small dicts; both produce the same rows
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    _json_loads = json.loads
+
+
+logger = logging.getLogger(__name__)
+
+# Версия формата JSON-состояния задачи (поле "v")
+JOB_STATE_VERSION = 1
+
+def _encode_trigger(trigger: Any) -> dict:
+    """Returns a dict of primitives for the trigger. Raises TypeError for trigger types without a JSON form."""
+    if isinstance(trigger, DateTrigger):
+        return {'type': 'date', 'run_date': datetime_to_utc_timestamp(trigger.run_date)}
+    if isinstance(trigger, CronTrigger):
+        return {
+            'type': 'cron',
+            'fields': {field.name: str(field) for field in trigger.fields if not field.is_default}, # Defaults are re-derived
+            'start_date': datetime_to_utc_timestamp(trigger.start_date),
+            'end_date': datetime_to_utc_timestamp(trigger.end_date),
+            'timezone': str(trigger.timezone),
+            'jitter': trigger.jitter,
+        }
+    if isinstance(trigger, IntervalTrigger):
+        return {
+            'type': 'interval',
+            'seconds': trigger.interval_length,
+            'start_date': datetime_to_utc_timestamp(trigger.start_date),
+            'end_date': datetime_to_utc_timestamp(trigger.end_date),
+            'timezone': str(trigger.timezone),
+            'jitter': trigger.jitter,
+        }
+    raise TypeError(f"No JSON form for trigger type {type(trigger).__name__}")
+
+
+def _decode_trigger(state: dict) -> Any:
+    """Rebuilds a trigger from the dict produced by _encode_trigger."""
+    trigger_type = state['type']
+    if trigger_type == 'date':
+        return DateTrigger(run_date=utc_timestamp_to_datetime(state['run_date']))
+    if trigger_type == 'cron':
+        return CronTrigger(
+            **state['fields'],
+            start_date=utc_timestamp_to_datetime(state['start_date']),
+            end_date=utc_timestamp_to_datetime(state['end_date']),
+            timezone=state['timezone'],
+            jitter=state['jitter'],
+        )
+    if trigger_type == 'interval':
+        return IntervalTrigger(
+            seconds=state['seconds'],
+            start_date=utc_timestamp_to_datetime(state['start_date']),
+            end_date=utc_timestamp_to_datetime(state['end_date']),
+            timezone=state['timezone'],
+            jitter=state['jitter'],
+        )
+    raise ValueError(f"Unknown trigger type in job state: {trigger_type}")
+
+
+class JsonSQLAlchemyJobStore(SQLAlchemyJobStore):
+    """
+    SQLAlchemyJobStore, хранящий состояние задачи (job_state) в виде JSON вместо pickle.
+    Задачи бота содержат только примитивы (ID поста, чата, сообщения), поэтому JSON-строки меньше
+    и разбираются быстрее на каждом пробуждении планировщика (get_due_jobs).
+    Задачи, которые нельзя представить в JSON (другие триггеры, непримитивные аргументы),
+    а также строки, записанные ранее через pickle, по-прежнему сохраняются/читаются через pickle.
+    """
+
+    def serialize_job(self, job: Job) -> bytes:
+        """Returns the job_state column value for the job (JSON, or pickle if the job has no JSON form)."""
+        state = job.__getstate__()
+        try:
+            return _json_dumps({
+                'v': JOB_STATE_VERSION,
+                'id': state['id'],
+                'func': state['func'],
+                'trigger': _encode_trigger(state['trigger']),
+                'executor': state['executor'],
+                'args': list(state['args']),
+                'kwargs': state['kwargs'],
+                'name': state['name'],
+                'misfire_grace_time': state['misfire_grace_time'],
+                'coalesce': state['coalesce'],
+                'max_instances': state['max_instances'],
+                'next_run_time': datetime_to_utc_timestamp(state['next_run_time']),
+            })
+        except TypeError: # orjson.JSONEncodeError is a TypeError subclass as well
+            logger.debug("Job %s has no JSON form, storing it with pickle", job.id)
+            return pickle.dumps(state, self.pickle_protocol)
+
+    def add_job(self, job: Job) -> None:
+        # Same as SQLAlchemyJobStore.add_job(), with job_state produced by serialize_job()
+        insert = self.jobs_t.insert().values(
+            id=job.id,
+            next_run_time=datetime_to_utc_timestamp(job.next_run_time),
+            job_state=self.serialize_job(job),
+        )
+        with self.engine.begin() as connection:
+            try:
+                connection.execute(insert)
+            except IntegrityError:
+                raise ConflictingIdError(job.id)
+
+    def update_job(self, job: Job) -> None:
+        update = (
+            self.jobs_t.update()
+            .values(
+                next_run_time=datetime_to_utc_timestamp(job.next_run_time),
+                job_state=self.serialize_job(job),
+            )
+            .where(self.jobs_t.c.id == job.id)
+        )
+        with self.engine.begin() as connection:
+            result = connection.execute(update)
+            if result.rowcount == 0:
+                raise JobLookupError(job.id)
+
+    # Пакетная запись задач в обход BaseScheduler.add_job() (восстановление задач при старте, задачи
+    # удаления сообщений). Повторяет шаги add_job()/_real_add_job() и поэтому опирается на внутренние
+    # детали APScheduler 3.11 (версия закреплена в requirements.txt); больше нигде они не используются.
+
+    def create_job(self, now: datetime, **job_kwargs: Any) -> Job:
+        """
+        Builds the Job that scheduler.add_job(**job_kwargs) would store, without storing it
+        (same defaults and first run time). The store must already be started by its scheduler.
+        """
+        job_kwargs.pop('replace_existing', None)
+        job_kwargs.pop('jobstore', None)
+        job_kwargs['args'] = tuple(job_kwargs.get('args') or ())
+        job_kwargs['kwargs'] = dict(job_kwargs.get('kwargs') or {})
+        job_kwargs.setdefault('executor', 'default')
+        for key, value in self._scheduler._job_defaults.items():
+            job_kwargs.setdefault(key, value)
+        job = Job(self._scheduler, **job_kwargs)
+        job._modify(next_run_time=job.trigger.get_next_fire_time(None, now))
+        return job
+
+    def job_row(self, job: Job) -> dict:
+        """Returns the table row (id, next_run_time, job_state) for the job."""
+        return {
+            'id': job.id,
+            'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+            'job_state': self.serialize_job(job),
+        }
+
+    def add_jobs(self, jobs: list[Job]) -> None:
+        """
+        Stores the jobs in one transaction, replacing stored jobs with the same IDs: one DELETE and one
+        executemany INSERT instead of a transaction per add_job(). Blocking like the other store methods;
+        the scheduler learns about the jobs from notify_added().
+        """
+        rows = [self.job_row(job) for job in jobs]
+        with self.engine.begin() as connection:
+            connection.execute(self.jobs_t.delete().where(self.jobs_t.c.id.in_([row['id'] for row in rows])))
+            connection.execute(self.jobs_t.insert(), rows)
+        for job in jobs:
+            job._jobstore_alias = self._alias
+
+    def notify_added(self, job_ids: Iterable[str]) -> None:
+        """Dispatches EVENT_JOB_ADDED for jobs stored by add_jobs() (or written to the table directly) and wakes the scheduler once."""
+        for job_id in job_ids:
+            self._scheduler._dispatch_event(JobEvent(EVENT_JOB_ADDED, job_id, self._alias))
+        self._scheduler.wakeup()
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        if job_state[:1] != b'{': # Pickle rows (written before the switch to JSON, or fallbacks)
+            return super()._reconstitute_job(job_state)
+        state = _json_loads(job_state)
+        if state.get('v', 1) > JOB_STATE_VERSION:
+            raise ValueError(f"Job state has version {state['v']}, but only version {JOB_STATE_VERSION} can be handled")
+        job = Job.__new__(Job)
+        job.__setstate__({
+            'version': 1,
+            'id': state['id'],
+            'func': state['func'],
+            'trigger': _decode_trigger(state['trigger']),
+            'executor': state['executor'],
+            'args': tuple(state['args']),
+            'kwargs': state['kwargs'],
+            'name': state['name'],
+            'misfire_grace_time': state['misfire_grace_time'],
+            'coalesce': state['coalesce'],
+            'max_instances': state['max_instances'],
+            'next_run_time': utc_timestamp_to_datetime(state['next_run_time']),
+        })
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
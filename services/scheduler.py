@@ -1,34 +1,72 @@
 # services/scheduler.py
 
+import asyncio
+import contextvars
+import functools
 import logging
-from datetime import datetime, timedelta # Import timedelta
+from datetime import datetime, timedelta, timezone # Import timedelta
 import pytz
 from enum import Enum
 from typing import Any, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.schedulers.base import STATE_RUNNING, STATE_STOPPED
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.job_stores.base import JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.job import Job
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.dml import Delete, Insert
 
 # Import necessary components for job execution and reconstruction
 # We will pass necessary services/bot instance to the task functions via args
 # Import models for type hinting in reconstruct_and_sync_jobs
-from models.post import Post, ScheduleTypeEnum, PostStatusEnum
-from models.rss_feed import RssFeed
+from models.post import ScheduleTypeEnum, PostStatusEnum
 
-# Import the helper for ensuring UTC timezone
-from utils.datetime_utils import _ensure_utc_aware
+# Task executors and their process-wide service registry
+import bot_tasks
+
+# Job store keeping job_state as JSON instead of pickle
+from services.jobstore import JsonSQLAlchemyJobStore
+
+# Datetimes are normalized to aware UTC once, at the boundary of the scheduling API
+from utils.datetime_utils import to_utc_aware
 
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 # Note: Actual handler configuration is in utils.logger.py
 
-# Глобальная переменная для экземпляра планировщика
-scheduler: Optional[AsyncIOScheduler] = None # Allow None initially
+# Экземпляр планировщика хранится в ContextVar, а не в глобальной переменной модуля: init_scheduler
+# устанавливает его в текущем контексте, и его видят все задачи, созданные из этого контекста.
+# Так в одном процессе можно держать несколько планировщиков (тесты, разбиение по циклам событий).
+_scheduler_ctx: contextvars.ContextVar[Optional[AsyncIOScheduler]] = contextvars.ContextVar("scheduler", default=None)
+
+
+def get_scheduler() -> Optional[AsyncIOScheduler]:
+    """Возвращает экземпляр планировщика текущего контекста (None, если он не инициализирован)."""
+    return _scheduler_ctx.get()
+
+# Разовые публикации, которые должны выполниться раньше чем через столько секунд ("опубликовать сейчас"),
+# запускаются напрямую в цикле событий (call_later), минуя запись в хранилище задач
+DIRECT_DISPATCH_THRESHOLD_SECONDS = 30
+
+# Напрямую запущенные публикации: post_id -> отложенный вызов (TimerHandle) или уже выполняющаяся задача.
+# Ссылка держит задачу от GC до завершения и позволяет отменить публикацию при отмене/переносе поста.
+_direct_dispatches: dict[int, asyncio.TimerHandle | asyncio.Task] = {}
+
+# Пул соединений хранилища задач (синхронный движок SQLAlchemyJobStore)
+JOBSTORE_POOL_SIZE = 10
+JOBSTORE_MAX_OVERFLOW = 5
+JOBSTORE_POOL_RECYCLE = 1800 # Seconds; recycle before server-side idle timeouts drop the connection
+# Размер пачки строк задач при массовой записи в хранилище (_bulk_add_jobs)
+JOBSTORE_WRITE_CHUNK_SIZE = 500
 
 # Строковые константы для путей к функциям-исполнителям задач
 # Эти пути должны быть доступны для импорта в среде выполнения APScheduler
@@ -38,6 +76,12 @@ TASK_MODULE_PATH = "bot_tasks" # Assuming bot_tasks.py is at the top level and f
 POST_PUBLISH_TASK_PATH = f"{TASK_MODULE_PATH}.execute_scheduled_post"
 MESSAGE_DELETE_TASK_PATH = f"{TASK_MODULE_PATH}.execute_message_deletion"
 RSS_CHECK_TASK_PATH = f"{TASK_MODULE_PATH}.execute_rss_feed_check" # This tasks checks *one* feed
+RSS_MASTER_TICK_TASK_PATH = f"{TASK_MODULE_PATH}.execute_rss_master_tick" # Checks all feeds that are due
+
+# Одна общая задача-"тик" для всех RSS-лент вместо отдельной IntervalTrigger-задачи на каждую ленту:
+# каждую минуту выбираются ленты с next_check_utc <= now и проверяются параллельно.
+RSS_MASTER_TICK_JOB_ID = "rss_master_tick"
+RSS_MASTER_TICK_INTERVAL_MINUTES = 1
 
 
 # Enum для типизации задач планировщика
@@ -45,10 +89,15 @@ class JobType(Enum):
     """Перечисление типов задач для стандартизации ID."""
     POST_PUBLISH = "POST_PUBLISH"
     MESSAGE_DELETE = "MESSAGE_DELETE" # Задача на удаление конкретного сообщения
-    RSS_CHECK = "RSS_CHECK" # Task for checking a specific RSS feed
+    RSS_CHECK = "RSS_CHECK" # Task for checking a specific RSS feed (legacy; superseded by the RSS master tick)
+
+
+# Таблица замены символов в sub_identifier (один проход str.translate вместо цепочки replace)
+_SANITIZE = str.maketrans({':': '_', '-': '_', '.': '_'})
 
 
 # Вспомогательная функция для генерации стандартизированных ID задач
+@functools.lru_cache(maxsize=4096) # Arguments are hashable primitives; repeated schedule/cancel of an entity hits the cache
 def _generate_job_id(job_type: JobType, entity_id: int, sub_identifier: str | int | None = None) -> str:
     """
     Генерирует стандартизированный строковый ID задачи.
@@ -56,44 +105,57 @@ def _generate_job_id(job_type: JobType, entity_id: int, sub_identifier: str | in
     """
     base_id = f"{job_type.value}_{entity_id}"
     if sub_identifier is not None:
-        # Convert sub_identifier to string safely, replace chars that might cause issues
-        sub_id_str = str(sub_identifier).replace(':', '_').replace('-', '_').replace('.', '_') # Sanitize for ID
-        # Truncate long identifiers if necessary to avoid hitting DB limits for job ID
-        if len(sub_id_str) > 50: # Example limit
-             sub_id_str = sub_id_str[:50]
+        # Sanitize chars that might cause issues and truncate long identifiers
+        # to avoid hitting DB limits for job ID (example limit: 50)
+        sub_id_str = str(sub_identifier).translate(_SANITIZE)[:50]
         return f"{base_id}_{sub_id_str}"
     return base_id
 
-# --- Functions to manage the global scheduler instance ---
+# --- Functions to manage the scheduler instance ---
 
 def init_scheduler(database_url: str): # Removed bot_instance from init, pass via services_container instead
     """
-    Инициализирует глобальный экземпляр APScheduler с SQLAlchemyJobStore.
+    Инициализирует экземпляр APScheduler с SQLAlchemyJobStore для текущего контекста.
 
     Args:
         database_url: Строка URL для подключения к базе данных.
     """
-    global scheduler
-    if scheduler is not None:
+    if _scheduler_ctx.get() is not None:
         # Use logger instead of print
         logger.warning("Scheduler уже инициализирован.")
         return
 
     try:
         # Настройка хранилища задач
+        # Own engine instead of url=: pool_pre_ping checks connections before use, so the scheduler keeps
+        # firing jobs after idle periods / DB restarts; pool_recycle retires old connections
+        engine_options: dict[str, Any] = {'pool_pre_ping': True, 'pool_recycle': JOBSTORE_POOL_RECYCLE}
+        if make_url(database_url).get_backend_name() != 'sqlite': # SQLite pools don't take size/overflow
+            engine_options.update(pool_size=JOBSTORE_POOL_SIZE, max_overflow=JOBSTORE_MAX_OVERFLOW)
+        jobstore_engine = create_engine(database_url, **engine_options)
+        # 'volatile' (в памяти) — для задач, которые полностью восстанавливаются из БД при старте
+        # (общий тик RSS): их не нужно сериализовать в apscheduler_jobs и читать оттуда на каждом пробуждении
         jobstores = {
-            'default': SQLAlchemyJobStore(url=database_url)
+            'default': JsonSQLAlchemyJobStore(engine=jobstore_engine), # job_state as JSON (see services/jobstore.py)
+            'volatile': MemoryJobStore()
+        }
+        # Исполнители: задачи — корутины, выполняются в цикле событий (без пулов потоков/процессов).
+        # 'default' — публикация и удаление сообщений, 'rss' — проверки RSS-лент.
+        executors = {
+            'default': AsyncIOExecutor(),
+            'rss': AsyncIOExecutor()
         }
         # Настройка параметров задач по умолчанию
+        # max_instances переопределяется по типу задачи: публикация поста — строго 1 (без двойной публикации)
         job_defaults = {
             'coalesce': True,       # Объединять пропущенные запуски в один
             'max_instances': 5,     # Максимальное количество одновременно запущенных экземпляров одной задачи
-            # Services/bot instance will be passed explicitly via job args/kwargs
         }
 
         # Создание экземпляра планировщика
         # Устанавливаем часовой пояс на UTC для согласованности
-        scheduler = AsyncIOScheduler(jobstores=jobstores, job_defaults=job_defaults, timezone=pytz.utc)
+        scheduler = AsyncIOScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults, timezone=pytz.utc)
+        _scheduler_ctx.set(scheduler)
         logger.info("Планировщик инициализирован с SQLAlchemyJobStore.")
 
     except Exception as e:
@@ -101,17 +163,23 @@ def init_scheduler(database_url: str): # Removed bot_instance from init, pass vi
         # In main.py, this exception should be caught and handled.
 
 
-async def start_scheduler_process():
-    """Запускает процесс планировщика."""
-    global scheduler
+async def start_scheduler_process(paused: bool = False):
+    """
+    Запускает процесс планировщика.
+
+    Args:
+        paused: Если True, планировщик запускается приостановленным (хранилища задач доступны,
+            но задачи не выполняются и не проверяются до resume()).
+    """
+    scheduler = _scheduler_ctx.get()
     if scheduler is None:
         logger.error("Планировщик не инициализирован. Невозможно запустить.")
         # Should not happen if init_scheduler is called first, but defensive check
         return
     if not scheduler.running:
         try:
-            scheduler.start()
-            logger.info("Планировщик запущен.")
+            scheduler.start(paused=paused)
+            logger.info("Планировщик запущен (приостановлен)." if paused else "Планировщик запущен.")
         except Exception as e:
              logger.critical(f"Ошибка при запуске планировщика: {e}", exc_info=True)
     else:
@@ -125,7 +193,7 @@ async def shutdown_scheduler_process(wait: bool = True):
     Args:
         wait: Если True, дожидается завершения всех текущих задач.
     """
-    global scheduler
+    scheduler = _scheduler_ctx.get()
     if scheduler is None:
         logger.warning("Планировщик не инициализирован. Нечего останавливать.")
         return
@@ -141,81 +209,272 @@ async def shutdown_scheduler_process(wait: bool = True):
         logger.info("Планировщик не запущен.")
 
 
-# --- Helper function to get services for job args ---
-def _get_job_services(services_container: Any) -> dict:
-    """
-    Retrieves necessary services from a container object to pass as job arguments.
-    The container should have attributes like bot, db_service, telegram_api_service, etc.
-    This helps standardize passing dependencies to task executors.
-    """
-    # List the services required by tasks in bot_tasks.py
-    # These names must match attributes in the services_container object passed from bot.py
-    required_services = {
-        'bot',
-        'db_service',
-        'telegram_api_service',
-        'content_manager_service',
-        'scheduler_service', # Pass scheduler_service itself for tasks that need to schedule other tasks (like post publish schedules deletion)
-        'rss_service', # Pass rss_service itself for RSS check task (it calls functions within rss_service)
-    }
-    job_services = {}
-    for service_name in required_services:
-        service = getattr(services_container, service_name, None)
-        if service is None:
-            # Log a warning if a required service is missing
-             logger.warning(f"Required service '{service_name}' not found in services_container for job arguments.")
-        job_services[service_name] = service
-    return job_services
+# --- Functions for adding APScheduler tasks ---
 
+# Job specs: keyword arguments for scheduler.add_job(). Building them is separated from adding,
+# so reconstruct_and_sync_jobs can collect all specs first and store them in one batch (_bulk_add_jobs).
+# Jobs carry only primitive ids: services (bot, db_service, ...) are not pickled into job rows,
+# task executors take them from the bot_tasks service registry (bot_tasks.register_services).
 
-# --- Functions for adding APScheduler tasks ---
+# Spec builders take already validated timezone-aware UTC datetimes (see to_utc_aware).
+
+# Разовая публикация, пропущенная не более чем на столько секунд (простой бота, перезапуск), еще выполняется
+POST_PUBLISH_MISFIRE_GRACE_SECONDS = 600
+
+def _one_time_post_job_spec(post_id: int, run_date_utc: datetime) -> dict:
+    """Returns the add_job() kwargs for a one-time post publication (run_date_utc: aware UTC)."""
+    return dict(
+        func=POST_PUBLISH_TASK_PATH,
+        trigger=DateTrigger(run_date=run_date_utc),
+        args=[post_id], # First argument is the post_id
+        id=_generate_job_id(JobType.POST_PUBLISH, post_id),
+        executor='default',
+        max_instances=1, # Publications of one post never overlap (no double posting)
+        replace_existing=True, # Replaces existing job with the same ID
+        misfire_grace_time=POST_PUBLISH_MISFIRE_GRACE_SECONDS
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _build_cron_trigger(cron_items: tuple, start_date_utc: datetime | None, end_date_utc: datetime | None) -> CronTrigger:
+    """
+    Строит CronTrigger один раз для каждой комбинации параметров.
+    Триггер не меняет состояние между срабатываниями, поэтому один экземпляр безопасно делят несколько задач.
+    """
+    return CronTrigger(start_date=start_date_utc, end_date=end_date_utc, timezone=pytz.utc, **dict(cron_items))
 
-async def schedule_one_time_post_publication(post_id: int, run_date_utc: datetime, services_container: Any):
+
+def _get_cron_trigger(cron_params: dict, start_date_utc: datetime | None, end_date_utc: datetime | None) -> CronTrigger:
+    """Returns a (cached) CronTrigger for cron_params; falls back to a fresh trigger for unhashable values."""
+    try:
+        return _build_cron_trigger(tuple(sorted(cron_params.items())), start_date_utc, end_date_utc)
+    except TypeError: # Unhashable/unsortable cron values (e.g. lists from JSON) are not cached
+        return CronTrigger(start_date=start_date_utc, end_date=end_date_utc, timezone=pytz.utc, **cron_params)
+
+
+def _recurring_post_job_spec(
+    post_id: int,
+    cron_params: dict,
+    start_date_utc: datetime | None = None,
+    end_date_utc: datetime | None = None
+) -> Optional[dict]:
+    """
+    Returns the add_job() kwargs for a recurring (Cron) post publication, or None if its end date has passed.
+    start_date_utc/end_date_utc: aware UTC or None.
+    """
+    # Check if end_date is in the past relative to now (UTC); "now" is only taken when there is an end date
+    if end_date_utc is not None and end_date_utc <= datetime.now(timezone.utc):
+        logger.warning(f"Пост {post_id} (циклический) имеет время окончания {end_date_utc} в прошлом. Пропускаю планирование.")
+        # Consider marking the post as INVALID in DB here or let reconstruct handle it
+        return None
+
+    return dict(
+        func=POST_PUBLISH_TASK_PATH,
+        trigger=_get_cron_trigger(cron_params, start_date_utc, end_date_utc),
+        args=[post_id], # First argument is the post_id
+        id=_generate_job_id(JobType.POST_PUBLISH, post_id), # Use the same ID for recurring tasks
+        executor='default',
+        max_instances=1, # Publications of one post never overlap (no double posting)
+        replace_existing=True, # Replaces existing job with the same ID
+        misfire_grace_time=600 # 10 minutes grace time
+    )
+
+
+def _message_deletion_job_spec(post_id: int, chat_id: int, message_ids: list[int], delete_at_utc: datetime) -> dict:
+    """Returns the add_job() kwargs for deleting the sent messages of a post in one chat (delete_at_utc: aware UTC)."""
+    return dict(
+        func=MESSAGE_DELETE_TASK_PATH,
+        trigger=DateTrigger(run_date=delete_at_utc),
+        # The task function execute_message_deletion expects chat_id, message_ids; services come from the bot_tasks registry
+        args=[chat_id, list(message_ids)],
+        # ID задачи уникален для сообщений поста в чате (по первому сообщению); префикс MESSAGE_DELETE_{post_id}_ общий
+        id=_generate_job_id(JobType.MESSAGE_DELETE, post_id, f"{chat_id}_{message_ids[0]}"),
+        replace_existing=True,
+        misfire_grace_time=60 # Small grace time for deletion (1 minute)
+    )
+
+
+def _rss_master_tick_job_spec() -> dict:
+    """Returns the add_job() kwargs for the single periodic job that checks all due RSS feeds."""
+    return dict(
+        func=RSS_MASTER_TICK_TASK_PATH,
+        trigger=IntervalTrigger(minutes=RSS_MASTER_TICK_INTERVAL_MINUTES, timezone=pytz.utc),
+        id=RSS_MASTER_TICK_JOB_ID,
+        jobstore='volatile', # Re-added by reconstruct_and_sync_jobs on every startup, no need to persist
+        executor='rss',
+        replace_existing=True,
+        max_instances=1, # A slow tick is never overlapped by the next one
+        misfire_grace_time=60
+    )
+
+
+def _is_db_connection_error(exc: BaseException | None) -> bool:
+    """True if exc (or an exception it was raised from) is a SQLAlchemy OperationalError (DB unreachable / connection lost)."""
+    while exc is not None:
+        if isinstance(exc, OperationalError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _job_fingerprint(func_ref: str, args, trigger) -> tuple:
+    """What makes a stored job equivalent to a new spec: task, arguments and trigger (type and parameters)."""
+    return (func_ref, tuple(args or ()), type(trigger), repr(trigger))
+
+
+async def _bulk_add_jobs(job_specs: list[dict]) -> int:
+    """
+    Adds many jobs at once. On a started scheduler with the JsonSQLAlchemyJobStore jobs are
+    written in chunks of JOBSTORE_WRITE_CHUNK_SIZE by JsonSQLAlchemyJobStore.add_jobs() (DELETE of
+    replaced ids + one executemany INSERT per chunk) instead of one INSERT round-trip per job. Chunks are written in worker threads,
+    up to JOBSTORE_POOL_SIZE at a time, so the sync job store does not block the event loop.
+    Otherwise falls back to add_job() per spec; a running scheduler is
+    paused meanwhile so it does not wake up between inserts.
+    Specs for other job stores (e.g. 'volatile') are always added with add_job().
+    Returns the number of jobs added. If a chunk fails, the jobs of the other chunks are still
+    added and the first error is re-raised.
+    """
+    scheduler = _scheduler_ctx.get()
+    if not job_specs:
+        return 0
+
+    other_store_specs = [spec for spec in job_specs if spec.get('jobstore', 'default') != 'default']
+    if other_store_specs:
+        for spec in other_store_specs:
+            scheduler.add_job(**spec)
+        job_specs = [spec for spec in job_specs if spec.get('jobstore', 'default') == 'default']
+        if not job_specs:
+            return len(other_store_specs)
+
+    jobstore = _default_jobstore(scheduler)
+    if scheduler.state == STATE_STOPPED or jobstore is None:
+        # Before start() add_job() only queues jobs in memory, so there is nothing to pause
+        paused = scheduler.state == STATE_RUNNING
+        if paused:
+            scheduler.pause()
+        try:
+            for spec in job_specs:
+                scheduler.add_job(**spec)
+        finally:
+            if paused:
+                scheduler.resume()
+        return len(job_specs) + len(other_store_specs)
+
+    now = datetime.now(scheduler.timezone)
+    jobs = [jobstore.create_job(now, **spec) for spec in job_specs]
+    chunks = [jobs[i:i + JOBSTORE_WRITE_CHUNK_SIZE] for i in range(0, len(jobs), JOBSTORE_WRITE_CHUNK_SIZE)]
+    # SQLite allows a single writer: parallel chunks would only wait on the database lock
+    semaphore = asyncio.Semaphore(1 if jobstore.engine.dialect.name == 'sqlite' else JOBSTORE_POOL_SIZE)
+
+    async def _write_chunk(chunk_jobs: list[Job]) -> None:
+        async with semaphore:
+            await asyncio.to_thread(jobstore.add_jobs, chunk_jobs)
+
+    results = await asyncio.gather(*(_write_chunk(chunk_jobs) for chunk_jobs in chunks), return_exceptions=True)
+
+    added_job_ids: list[str] = []
+    first_error: BaseException | None = None
+    for chunk_jobs, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            first_error = first_error or result
+            continue
+        added_job_ids.extend(job.id for job in chunk_jobs)
+    if added_job_ids:
+        jobstore.notify_added(added_job_ids) # One wakeup for the whole batch
+    if first_error is not None:
+        raise first_error
+    return len(added_job_ids) + len(other_store_specs)
+
+
+def _default_jobstore(scheduler: AsyncIOScheduler) -> Optional[JsonSQLAlchemyJobStore]:
+    """The 'default' job store if it supports batch writes (JsonSQLAlchemyJobStore), otherwise None."""
+    jobstore = scheduler._jobstores.get('default')
+    return jobstore if isinstance(jobstore, JsonSQLAlchemyJobStore) else None
+
+
+async def schedule_one_time_post_publication(post_id: int, run_date_utc: datetime, services_container: Any = None):
     """
     Планирует разовую задачу на публикацию поста.
 
     Args:
         post_id: ID поста из БД.
         run_date_utc: Время запланированной публикации в UTC (timezone-aware).
-        services_container: Объект, содержащий ссылки на необходимые сервисы (bot, db_service и т.д.).
+        services_container: Не используется: сервисы не сохраняются в задаче, исполнители берут их из реестра bot_tasks.
     """
-    global scheduler
+    scheduler = _scheduler_ctx.get()
     if scheduler is None:
         logger.error(f"Планировщик не инициализирован. Невозможно запланировать публикацию поста {post_id}.")
         return
 
     # Ensure the run_date is timezone-aware UTC
-    run_date_utc_aware = _ensure_utc_aware(run_date_utc)
+    run_date_utc_aware = to_utc_aware(run_date_utc)
     if run_date_utc_aware is None:
          logger.error(f"Некорректное время выполнения ({run_date_utc}) для публикации поста {post_id}. Пропускаю планирование.")
          return
 
-    job_id = _generate_job_id(JobType.POST_PUBLISH, post_id)
+    job_spec = _one_time_post_job_spec(post_id, run_date_utc_aware)
+    job_id = job_spec['id']
+    _cancel_direct_dispatch(post_id) # Rescheduling replaces a pending direct publication
 
-    # Prepare arguments to be passed to execute_scheduled_post
-    job_args = [post_id] # First argument is the post_id
-    job_kwargs = _get_job_services(services_container) # Services as keyword arguments
+    delay_seconds = (run_date_utc_aware - datetime.now(timezone.utc)).total_seconds()
+    if delay_seconds < DIRECT_DISPATCH_THRESHOLD_SECONDS:
+        # Publication is due within seconds: run it from the event loop directly, no jobstore INSERT/wakeup.
+        # A job stored earlier for this post (e.g. rescheduled to "now") is removed so it doesn't fire again.
+        try:
+            scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
+        # Fresh context: the caller's context vars (e.g. the handler's DB session scope) must not leak into
+        # the publication; only the scheduler is carried over for scheduling message deletions.
+        dispatch_context = contextvars.Context()
+        dispatch_context.run(_scheduler_ctx.set, scheduler)
+        loop = asyncio.get_running_loop()
+
+        def _start_dispatch() -> None:
+            delay = max((run_date_utc_aware - datetime.now(timezone.utc)).total_seconds(), 0)
+            _direct_dispatches[post_id] = loop.call_later(delay, _dispatch_post_publication, post_id, context=dispatch_context)
+            logger.info(f"Публикация поста {post_id} запущена напрямую через {delay:.1f} с (без сохранения задачи).")
+
+        # The publication reads the post in its own session: inside a handler's session_scope() the post
+        # is only visible after the scope commits (and must not be published if it rolls back)
+        db_service = bot_tasks._SERVICES.get('db_service')
+        if db_service is None:
+            _start_dispatch()
+        else:
+            db_service.call_after_commit(_start_dispatch)
+        return
 
     try:
-        scheduler.add_job(
-            func=POST_PUBLISH_TASK_PATH,
-            trigger=DateTrigger(run_date=run_date_utc_aware),
-            args=job_args,
-            kwargs=job_kwargs, # Pass services as keyword arguments
-            id=job_id,
-            replace_existing=True, # Replaces existing job with the same ID
-            misfire_grace_time=600 # 10 minutes grace time for missed jobs
-        )
-        logger.info(f"Запланирована разовая публикация поста (job_id={job_id}) на {run_date_utc_aware} UTC.")
+        scheduler.add_job(**job_spec)
+        logger.info(f"Запланирована разовая публикация поста (job_id={job_id}) на {job_spec['trigger'].run_date} UTC.")
     except Exception as e:
         logger.error(f"Ошибка при планировании разовой публикации поста (job_id={job_id}): {e}", exc_info=True)
 
+def _dispatch_post_publication(post_id: int) -> None:
+    """call_later callback: starts bot_tasks.execute_scheduled_post as a task and keeps a reference until it finishes."""
+    task = asyncio.create_task(bot_tasks.execute_scheduled_post(post_id))
+    _direct_dispatches[post_id] = task
+
+    def _forget(done_task: asyncio.Task) -> None:
+        if _direct_dispatches.get(post_id) is done_task: # Not replaced by a newer dispatch of the same post
+            del _direct_dispatches[post_id]
+
+    task.add_done_callback(_forget)
+
+def _cancel_direct_dispatch(post_id: int) -> None:
+    """Cancels a direct publication of the post (pending call_later or running task), if any."""
+    dispatch = _direct_dispatches.pop(post_id, None)
+    if dispatch is not None:
+        dispatch.cancel()
+        logger.info(f"Прямая публикация поста {post_id} отменена.")
+
+
 async def schedule_recurring_post_publication(
     post_id: int,
     cron_params: dict,
+    services_container: Any = None,
     start_date_utc: datetime | None = None,
-    end_date_utc: datetime | None = None,
-    services_container: Any
+    end_date_utc: datetime | None = None
 ):
     """
     Планирует циклическую задачу на публикацию поста по расписанию Cron.
@@ -226,135 +485,164 @@ async def schedule_recurring_post_publication(
                      Can also include 'day', 'month', 'day_of_week' etc.
         start_date_utc: Дата и время начала действия расписания в UTC (timezone-aware).
         end_date_utc: Дата и время окончания действия расписания в UTC (timezone-aware).
-        services_container: Объект, содержащий ссылки на необходимые сервисы.
+        services_container: Не используется: сервисы не сохраняются в задаче, исполнители берут их из реестра bot_tasks.
     """
-    global scheduler
+    scheduler = _scheduler_ctx.get()
     if scheduler is None:
         logger.error(f"Планировщик не инициализирован. Невозможно запланировать циклическую публикацию поста {post_id}.")
         return
 
-    # Ensure start/end dates are timezone-aware UTC if provided
-    start_date_utc_aware = _ensure_utc_aware(start_date_utc)
-    end_date_utc_aware = _ensure_utc_aware(end_date_utc)
-
-    # Check if end_date is in the past relative to now (UTC)
-    now_utc_aware = datetime.now(pytz.utc)
-    if end_date_utc_aware is not None and end_date_utc_aware <= now_utc_aware:
-        logger.warning(f"Пост {post_id} (циклический) имеет время окончания {end_date_utc_aware} в прошлом. Пропускаю планирование.")
-        # Consider marking the post as INVALID in DB here or let reconstruct handle it
-        return
-
     job_id = _generate_job_id(JobType.POST_PUBLISH, post_id) # Use the same ID for recurring tasks
-
-    job_args = [post_id] # First argument is the post_id
-    job_kwargs = _get_job_services(services_container) # Services as keyword arguments
+    _cancel_direct_dispatch(post_id) # Rescheduling replaces a pending direct publication
 
     try:
-        scheduler.add_job(
-            func=POST_PUBLISH_TASK_PATH,
-            trigger=CronTrigger(start_date=start_date_utc_aware, end_date=end_date_utc_aware, timezone=pytz.utc, **cron_params),
-            args=job_args,
-            kwargs=job_kwargs, # Pass services as keyword arguments
-            id=job_id,
-            replace_existing=True, # Replaces existing job with the same ID
-            misfire_grace_time=600 # 10 minutes grace time
-        )
-        logger.info(f"Запланирована циклическая публикация поста (job_id={job_id}) с параметрами Cron: {cron_params} (start={start_date_utc_aware}, end={end_date_utc_aware}).")
+        job_spec = _recurring_post_job_spec(post_id, cron_params, to_utc_aware(start_date_utc), to_utc_aware(end_date_utc))
+        if job_spec is None:
+            return
+        scheduler.add_job(**job_spec)
+        logger.info(f"Запланирована циклическая публикация поста (job_id={job_id}) с параметрами Cron: {cron_params} (start={start_date_utc}, end={end_date_utc}).")
     except Exception as e:
         logger.error(f"Ошибка при планировании циклической публикации поста (job_id={job_id}) с параметрами {cron_params}: {e}", exc_info=True)
 
-async def schedule_message_deletion(post_id: int, chat_id: int, message_id: int, delete_at_utc: datetime, services_container: Any):
+async def schedule_message_deletion(post_id: int, chat_id: int, message_ids: list[int], delete_at_utc: datetime, services_container: Any = None):
     """
-    Планирует разовую задачу на удаление конкретного сообщения в Telegram.
+    Планирует разовую задачу на удаление сообщений поста в одном чате Telegram
+    (одним запросом deleteMessages при выполнении).
 
     Args:
-        post_id: ID поста, к которому относится сообщение (для контекста ID задачи).
-        chat_id: ID чата/канала, где было опубликовано сообщение.
-        message_id: ID сообщения для удаления.
+        post_id: ID поста, к которому относятся сообщения (для контекста ID задачи).
+        chat_id: ID чата/канала, где были опубликованы сообщения.
+        message_ids: ID сообщений для удаления.
         delete_at_utc: Время запланированного удаления в UTC (timezone-aware).
-        services_container: Объект, содержащий ссылки на необходимые сервисы (bot, db_service, telegram_api_service).
+        services_container: Не используется: сервисы не сохраняются в задаче, исполнители берут их из реестра bot_tasks.
     """
-    global scheduler
+    scheduler = _scheduler_ctx.get()
+    if not message_ids:
+        return
     if scheduler is None:
-        logger.error(f"Планировщик не инициализирован. Невозможно запланировать удаление сообщения {message_id} в чате {chat_id}.")
+        logger.error(f"Планировщик не инициализирован. Невозможно запланировать удаление сообщений {message_ids} в чате {chat_id}.")
         return
 
     # Ensure delete_at_utc is timezone-aware UTC
-    delete_at_utc_aware = _ensure_utc_aware(delete_at_utc)
+    delete_at_utc_aware = to_utc_aware(delete_at_utc)
     if delete_at_utc_aware is None:
-         logger.error(f"Некорректное время удаления ({delete_at_utc}) для сообщения {message_id} в чате {chat_id}. Пропускаю планирование.")
+         logger.error(f"Некорректное время удаления ({delete_at_utc}) для сообщений {message_ids} в чате {chat_id}. Пропускаю планирование.")
          return
 
     # Check if deletion time is in the past
-    now_utc_aware = datetime.now(pytz.utc)
+    now_utc_aware = datetime.now(timezone.utc)
     if delete_at_utc_aware <= now_utc_aware:
-        logger.warning(f"Время удаления ({delete_at_utc_aware}) для сообщения {message_id} в чате {chat_id} уже в прошлом. Пропускаю планирование.")
+        logger.warning(f"Время удаления ({delete_at_utc_aware}) для сообщений {message_ids} в чате {chat_id} уже в прошлом. Пропускаю планирование.")
         return # No need to schedule for the past
 
-    # ID задачи на удаление сообщения должен быть уникальным для конкретного сообщения в контексте поста
-    # Including chat_id and message_id in the ID makes it unique per message
-    job_id = _generate_job_id(JobType.MESSAGE_DELETE, post_id, f"{chat_id}_{message_id}")
-
-    # Prepare arguments to be passed to execute_message_deletion
-    # The task function execute_message_deletion expects chat_id, message_id first, then services as kwargs
-    job_args = [chat_id, message_id] # Arguments the task function expects first
-    job_kwargs = _get_job_services(services_container) # Services as keyword arguments
+    job_spec = _message_deletion_job_spec(post_id, chat_id, message_ids, delete_at_utc_aware)
+    job_id = job_spec['id']
 
     try:
-        scheduler.add_job(
-            func=MESSAGE_DELETE_TASK_PATH,
-            trigger=DateTrigger(run_date=delete_at_utc_aware),
-            args=job_args,
-            kwargs=job_kwargs, # Pass services as keyword arguments
-            id=job_id,
-            replace_existing=True,
-            misfire_grace_time=60 # Small grace time for deletion (1 minute)
-        )
-        logger.info(f"Запланировано удаление сообщения (job_id={job_id}) на {delete_at_utc_aware} UTC.")
+        scheduler.add_job(**job_spec)
+        logger.info(f"Запланировано удаление сообщений (job_id={job_id}) на {delete_at_utc_aware} UTC.")
     except Exception as e:
-        logger.error(f"Ошибка при планировании удаления сообщения (job_id={job_id}): {e}", exc_info=True)
+        logger.error(f"Ошибка при планировании удаления сообщений (job_id={job_id}): {e}", exc_info=True)
 
 
-async def schedule_rss_feed_check(feed_id: int, interval_minutes: int, services_container: Any):
+def build_message_deletion_job_rows(post_id: int, deletions: list[tuple[int, list[int], datetime]]) -> Optional[list[dict]]:
     """
-    Планирует циклическую задачу на проверку RSS-ленты.
-    Note: In this model, a periodic job per feed is scheduled.
-    The master check_all_feeds in rss.py (if used) would need a different scheduler approach.
-    Sticking to the per-feed task as implied by the initial structure.
+    Готовит строки apscheduler_jobs для задач удаления отправленных сообщений поста, чтобы
+    исполнитель публикации записал их в той же транзакции БД, что и статус поста
+    (db_service.insert_scheduler_job_rows), вместо отдельного add_job() на каждое сообщение.
+    После коммита нужно вызвать notify_jobs_added().
 
     Args:
-        feed_id: ID RSS-ленты из БД.
-        interval_minutes: Интервал проверки в минутах.
-        services_container: Объект, содержащий ссылки на необходимые сервисы (bot, db_service, rss_service).
+        post_id: ID поста.
+        deletions: Список (chat_id, message_ids, delete_at_utc): одна задача на сообщения поста в чате.
+
+    Returns:
+        Список строк; None, если строки нельзя записать напрямую (планировщик не запущен или
+        хранилище не SQLAlchemy) - тогда нужно использовать schedule_message_deletion().
     """
-    global scheduler
-    if scheduler is None:
-        logger.error(f"Планировщик не инициализирован. Невозможно запланировать проверку RSS-ленты {feed_id}.")
-        return
+    scheduler = _scheduler_ctx.get()
+    if scheduler is None or scheduler.state == STATE_STOPPED:
+        return None
+    jobstore = _default_jobstore(scheduler)
+    if jobstore is None:
+        return None
+
+    now = datetime.now(scheduler.timezone)
+    rows = []
+    for chat_id, message_ids, delete_at_utc in deletions:
+        if not message_ids:
+            continue
+        delete_at_utc_aware = to_utc_aware(delete_at_utc)
+        if delete_at_utc_aware is None or delete_at_utc_aware <= now:
+            logger.warning(f"Время удаления ({delete_at_utc}) для сообщений {message_ids} в чате {chat_id} уже в прошлом или не задано. Пропускаю планирование.")
+            continue
+        job = jobstore.create_job(now, **_message_deletion_job_spec(post_id, chat_id, message_ids, delete_at_utc_aware))
+        rows.append(jobstore.job_row(job))
+    return rows
+
+
+def job_rows_replace_statements(job_ids: list[str]) -> tuple[Delete, Insert]:
+    """
+    Возвращает DELETE строк с этими ID и INSERT для новых строк (семантика replace_existing),
+    построенные по таблице хранилища задач, для db_service.insert_scheduler_job_rows.
+    Вызывается после build_message_deletion_job_rows (она проверяет, что хранилище - SQLAlchemyJobStore).
+    """
+    jobs_t = _scheduler_ctx.get()._jobstores['default'].jobs_t
+    return jobs_t.delete().where(jobs_t.c.id.in_(job_ids)), jobs_t.insert()
 
-    if interval_minutes is None or interval_minutes <= 0:
-        logger.error(f"Некорректный интервал проверки для RSS-ленты {feed_id}: {interval_minutes} минут. Пропускаем планирование.")
+
+def notify_jobs_added(job_ids: list[str]) -> None:
+    """
+    Сообщает планировщику о задачах, записанных в хранилище в обход add_job()
+    (см. build_message_deletion_job_rows): события EVENT_JOB_ADDED и одно пробуждение.
+    """
+    scheduler = _scheduler_ctx.get()
+    if scheduler is None or not job_ids:
         return
+    jobstore = _default_jobstore(scheduler)
+    if jobstore is not None: # Rows are only prepared for this store (build_message_deletion_job_rows)
+        jobstore.notify_added(job_ids)
 
-    job_id = _generate_job_id(JobType.RSS_CHECK, feed_id)
 
-    # Prepare arguments to be passed to execute_rss_feed_check
-    job_args = [feed_id] # First argument is the feed_id
-    job_kwargs = _get_job_services(services_container) # Services as keyword arguments
+async def schedule_rss_master_tick(services_container: Any = None):
+    """
+    Планирует (если еще не запланирована) общую задачу проверки RSS-лент.
+
+    Args:
+        services_container: Не используется: сервисы не сохраняются в задаче, исполнители берут их из реестра bot_tasks.
+    """
+    scheduler = _scheduler_ctx.get()
+    if scheduler is None:
+        logger.error("Планировщик не инициализирован. Невозможно запланировать проверку RSS-лент.")
+        return
 
     try:
-        scheduler.add_job(
-            func=RSS_CHECK_TASK_PATH,
-            trigger=IntervalTrigger(minutes=interval_minutes, timezone=pytz.utc), # Interval is often timezone-agnostic, but setting UTC for consistency
-            args=job_args,
-            kwargs=job_kwargs, # Pass services as keyword arguments
-            id=job_id,
-            replace_existing=True,
-            misfire_grace_time=300 # 5 minutes grace time
-        )
-        logger.info(f"Запланирована проверка RSS-ленты (job_id={job_id}) каждые {interval_minutes} минут.")
+        if scheduler.get_job(RSS_MASTER_TICK_JOB_ID) is not None:
+            return # Already scheduled; re-adding would only rewrite the job row
+        scheduler.add_job(**_rss_master_tick_job_spec())
+        logger.info(f"Запланирована общая проверка RSS-лент (job_id={RSS_MASTER_TICK_JOB_ID}) каждые {RSS_MASTER_TICK_INTERVAL_MINUTES} мин.")
     except Exception as e:
-        logger.error(f"Ошибка при планировании проверки RSS-ленты (job_id={job_id}): {e}", exc_info=True)
+        logger.error(f"Ошибка при планировании общей проверки RSS-лент (job_id={RSS_MASTER_TICK_JOB_ID}): {e}", exc_info=True)
+
+
+async def schedule_rss_feed_check(feed_id: int, interval_minutes: int, services_container: Any = None):
+    """
+    Ставит RSS-ленту на периодическую проверку.
+    Отдельная задача на ленту больше не создается: лента проверяется общей задачей-тиком
+    (execute_rss_master_tick), когда наступает ее next_check_utc; после проверки next_check_utc
+    сдвигается на frequency_minutes. Здесь лишь гарантируется, что тик запланирован.
+
+    Args:
+        feed_id: ID RSS-ленты из БД.
+        interval_minutes: Интервал проверки в минутах.
+        services_container: Не используется: сервисы не сохраняются в задаче, исполнители берут их из реестра bot_tasks.
+    """
+    if interval_minutes is None or interval_minutes <= 0:
+        logger.error(f"Некорректный интервал проверки для RSS-ленты {feed_id}: {interval_minutes} минут. Пропускаем планирование.")
+        return
+
+    await schedule_rss_master_tick(services_container)
+    logger.info(f"RSS-лента {feed_id} будет проверяться общей задачей каждые {interval_minutes} минут.")
 
 # --- Functions for cancelling tasks ---
 
@@ -368,7 +656,7 @@ async def cancel_job_by_id(job_id: str):
     Returns:
         True, если задача успешно отменена или не найдена; False в случае другой ошибки.
     """
-    global scheduler
+    scheduler = _scheduler_ctx.get()
     if scheduler is None:
         logger.error(f"Планировщик не инициализирован. Невозможно отменить задачу {job_id}.")
         return False
@@ -383,30 +671,43 @@ async def cancel_job_by_id(job_id: str):
         logger.error(f"Ошибка при отмене задачи {job_id}: {e}", exc_info=True)
         return False
 
-async def cancel_all_jobs_for_post(post_id: int):
+async def cancel_all_jobs_for_post(post_id: int, db_service: Any = None):
     """
-    Отменяет все известные задачи планировщика, связанные с конкретным постом.
-    Отменяет основную задачу публикации. Tasks for deleting *sent messages* for this post
-    are not cancelled here as their IDs depend on chat_id and message_id.
+    Отменяет все задачи планировщика, связанные с конкретным постом:
+    основную задачу публикации и все задачи удаления отправленных сообщений поста
+    (MESSAGE_DELETE_{post_id}_*), последние - одним DELETE по префиксу ID.
 
     Args:
         post_id: ID поста из БД.
+        db_service: Сервис БД; по умолчанию берется из реестра сервисов bot_tasks.
     """
     logger.info(f"Попытка отменить задачи публикации для поста {post_id}.")
     # Cancel the main publication task (one-time or recurring uses the same ID format)
     pub_job_id = _generate_job_id(JobType.POST_PUBLISH, post_id)
     await cancel_job_by_id(pub_job_id)
-    logger.info(f"Завершено действие по отмене задачи публикации для поста {post_id}.")
-
-    # Note: Cancelling deletion jobs would require querying the DB for all sent messages
-    # related to this post and generating deletion job IDs, which is more complex
-    # and might not be necessary if messages are deleted anyway or if the post is just marked deleted.
-    # Leaving deletion jobs might be fine; they will attempt to delete but might fail if message is gone.
+    _cancel_direct_dispatch(post_id)
+
+    # Deletion job IDs depend on chat_id/message_id, so remove them all by prefix instead of per-ID lookups
+    if db_service is None:
+        db_service = bot_tasks._SERVICES.get('db_service')
+    scheduler = _scheduler_ctx.get()
+    jobstore = scheduler._jobstores.get('default') if scheduler is not None else None
+    if db_service is None or not isinstance(jobstore, SQLAlchemyJobStore):
+        logger.warning(f"db_service или SQL-хранилище задач недоступны: задачи удаления сообщений поста {post_id} не отменены.")
+    else:
+        deletion_prefix = f"{JobType.MESSAGE_DELETE.value}_{post_id}_"
+        # One DELETE ... WHERE id LIKE 'prefix%' (autoescape: MESSAGE_DELETE_5_ must not match MESSAGE_DELETE_50...)
+        delete_stmt = jobstore.jobs_t.delete().where(jobstore.jobs_t.c.id.startswith(deletion_prefix, autoescape=True))
+        deleted_count = await db_service.delete_scheduler_jobs(delete_stmt)
+        logger.info(f"Отменено задач удаления сообщений для поста {post_id}: {deleted_count}.")
+    logger.info(f"Завершено действие по отмене задач для поста {post_id}.")
 
 
 async def cancel_all_jobs_for_rss_feed(feed_id: int):
     """
     Отменяет все задачи планировщика, связанные с конкретной RSS-лентой.
+    Новые ленты проверяются общим тиком (достаточно удалить ленту из БД); здесь удаляется
+    отдельная задача ленты, если она осталась от прежней схемы планирования.
 
     Args:
         feed_id: ID RSS-ленты из БД.
@@ -420,65 +721,50 @@ async def cancel_all_jobs_for_rss_feed(feed_id: int):
 
 # --- Function for reconstructing/syncing jobs on startup ---
 
-async def reconstruct_and_sync_jobs(db_service: Any, services_container: Any):
+async def _load_post_job_specs(db_service: Any, services_container: Any) -> list[dict]:
     """
-    Восстанавливает и синхронизирует задачи планировщика на основе текущего состояния базы данных.
-    Планирует задачи для всех постов со статусом 'scheduled' и всех активных RSS-лент.
-
-    Args:
-        db_service: Объект/модуль, предоставляющий доступ к БД (must have methods like get_all_scheduled_posts_for_reload, get_all_active_rss_feeds, update_post_status).
-        services_container: Объект, содержащий ссылки на необходимые сервисы для передачи в задачи (must contain bot, db_service, scheduler_service, etc.).
+    Streams posts with status 'scheduled' and returns job specs for those that still have to run.
+    Posts that can no longer run are marked INVALID with one bulk UPDATE after the loop.
     """
-    global scheduler
-    if scheduler is None:
-        logger.error("Планировщик не инициализирован. Невозможно восстановить задачи.")
-        return
-
-    logger.info("Начат процесс восстановления и синхронизации задач из базы данных.")
-
-    # 1. Восстановление задач для запланированных постов
-    try:
-        # Use async_session_maker from db_service to get a session
-        async with db_service.async_session_maker() as session:
-            # db_service.get_all_scheduled_posts_for_reload expects a session
-            # It should retrieve posts with status PostStatusEnum.SCHEDULED.value
-            scheduled_posts: list[Post] = await db_service.get_all_scheduled_posts_for_reload(session)
-            logger.info(f"Найдено {len(scheduled_posts)} постов со статусом '{PostStatusEnum.SCHEDULED.value}' для восстановления расписания.")
-
-        for post in scheduled_posts:
+    job_specs: list[dict] = []
+    invalid_post_ids: list[int] = [] # Posts to mark INVALID in one UPDATE after the loop
+    # Use async_session_maker from db_service to get a session
+    # db_service.get_all_scheduled_posts_for_reload streams posts (status 'scheduled') in batches
+    # from this session, so posts are processed while the cursor is open instead of loading all first
+    reloaded_posts = 0
+    # One "now" for the whole pass: reconstruction doesn't need per-post precision
+    now_utc_aware = datetime.now(timezone.utc)
+    async with db_service.async_session_maker() as session:
+        async for post in db_service.get_all_scheduled_posts_for_reload(session):
+            reloaded_posts += 1
             try:
                 logger.debug(f"Восстановление задачи для поста {post.id}, тип: {post.schedule_type}")
-                # Ensure times are timezone-aware UTC for comparison
-                now_utc_aware = datetime.now(pytz.utc)
 
                 if post.schedule_type == ScheduleTypeEnum.ONE_TIME.value:
                     # For one-time posts, schedule if the run_date is in the future
                     # Post.run_date_utc is DateTime (naive), assuming it stores UTC naive. Convert to aware for comparison.
-                    run_date_utc_aware = pytz.utc.localize(post.run_date_utc) if post.run_date_utc and post.run_date_utc.tzinfo is None else post.run_date_utc # Ensure it's aware UTC if not already
+                    run_date_utc_aware = to_utc_aware(post.run_date_utc) # Validated once here; spec builders take aware UTC
 
-                    if run_date_utc_aware is not None and run_date_utc_aware > now_utc_aware:
-                        await schedule_one_time_post_publication(
+                    # Overdue by less than the misfire grace time (e.g. a direct publication lost on restart):
+                    # still scheduled, the job fires right after the scheduler resumes
+                    if run_date_utc_aware is not None and run_date_utc_aware > now_utc_aware - timedelta(seconds=POST_PUBLISH_MISFIRE_GRACE_SECONDS):
+                        job_specs.append(_one_time_post_job_spec(
                             post_id=post.id,
-                            run_date_utc=run_date_utc_aware, # Pass the aware datetime
-                            services_container=services_container
-                        )
+                            run_date_utc=run_date_utc_aware # Pass the aware datetime
+                        ))
                     else:
                         # If run_date is in the past or not set, mark the post as INVALID
-                        logger.warning(f"Пост {post.id} (разовый) пропущен при восстановлении: время публикации {run_date_utc_aware} уже в прошлом или не задано. Обновляю статус на '{PostStatusEnum.INVALID.value}'.")
+                        logger.warning(f"Пост {post.id} (разовый) пропущен при восстановлении: время публикации {run_date_utc_aware} пропущено более {POST_PUBLISH_MISFIRE_GRACE_SECONDS} с назад или не задано. Обновляю статус на '{PostStatusEnum.INVALID.value}'.")
                         if post.status == PostStatusEnum.SCHEDULED.value: # Only change status if it was scheduled
-                            try:
-                                # Use db_service from services_container for updates outside the loop's potential session
-                                await services_container.db_service.update_post_status(post.id, PostStatusEnum.INVALID.value)
-                            except Exception as update_ex:
-                                logger.error(f"Error updating post {post.id} status to INVALID after missing schedule: {update_ex}", exc_info=True)
+                            invalid_post_ids.append(post.id)
 
 
                 elif post.schedule_type == ScheduleTypeEnum.RECURRING.value:
                     # For recurring posts, schedule if parameters are valid and end date is not in the past
                     if post.schedule_params:
                         # Post start/end dates are DateTime (naive), assuming UTC naive. Convert to aware.
-                        start_date_utc_aware = pytz.utc.localize(post.start_date_utc) if post.start_date_utc and post.start_date_utc.tzinfo is None else post.start_date_utc
-                        end_date_utc_aware = pytz.utc.localize(post.end_date_utc) if post.end_date_utc and post.end_date_utc.tzinfo is None else post.end_date_utc
+                        start_date_utc_aware = to_utc_aware(post.start_date_utc)
+                        end_date_utc_aware = to_utc_aware(post.end_date_utc)
 
                         # CronTrigger handles start/end dates. Schedule if end_date is not explicitly in the past.
                         # An end_date in the past means the job won't trigger again, but APScheduler should clean it up.
@@ -486,27 +772,22 @@ async def reconstruct_and_sync_jobs(db_service: Any, services_container: Any):
                         if end_date_utc_aware is not None and end_date_utc_aware <= now_utc_aware:
                              logger.warning(f"Пост {post.id} (циклический) пропущен при восстановлении: время окончания {end_date_utc_aware} уже в прошлом. Обновляю статус на '{PostStatusEnum.INVALID.value}'.")
                              if post.status == PostStatusEnum.SCHEDULED.value:
-                                 try:
-                                      await services_container.db_service.update_post_status(post.id, PostStatusEnum.INVALID.value)
-                                 except Exception as update_ex:
-                                      logger.error(f"Error updating post {post.id} status to INVALID after past end date: {update_ex}", exc_info=True)
+                                 invalid_post_ids.append(post.id)
                              continue # Skip scheduling
 
-                        await schedule_recurring_post_publication(
+                        job_spec = _recurring_post_job_spec(
                             post_id=post.id,
                             cron_params=post.schedule_params,
                             start_date_utc=start_date_utc_aware,
-                            end_date_utc=end_date_utc_aware,
-                            services_container=services_container
+                            end_date_utc=end_date_utc_aware
                         )
+                        if job_spec is not None:
+                            job_specs.append(job_spec)
 
                     else:
                         logger.warning(f"Post {post.id} (циклический) пропущен при восстановлении: не заданы параметры Cron. Обновляю статус на '{PostStatusEnum.INVALID.value}'.")
                         if post.status == PostStatusEnum.SCHEDULED.value:
-                            try:
-                                 await services_container.db_service.update_post_status(post.id, PostStatusEnum.INVALID.value)
-                            except Exception as update_ex:
-                                 logger.error(f"Error updating post {post.id} status to INVALID after missing cron params: {update_ex}", exc_info=True)
+                            invalid_post_ids.append(post.id)
 
                 # Handle other schedule types if added later
                 # elif post.schedule_type == 'other_type': ...
@@ -515,38 +796,96 @@ async def reconstruct_and_sync_jobs(db_service: Any, services_container: Any):
                 # by the post publication task executor AFTER sending the message.
 
             except Exception as e:
+                if _is_db_connection_error(e):
+                    raise # Systemic DB failure: abort the whole pass instead of logging it once per post
                 logger.error(f"Ошибка при обработке поста {post.id} во время восстановления задач: {e}", exc_info=True)
+    logger.info(f"Обработано {reloaded_posts} постов со статусом '{PostStatusEnum.SCHEDULED.value}' при восстановлении расписания.")
 
-    except Exception as e:
-         logger.error(f"Ошибка при получении запланированных постов для восстановления: {e}", exc_info=True)
+    if invalid_post_ids:
+        # Use db_service from services_container; the streaming session above is already closed
+        try:
+            await services_container.db_service.bulk_update_post_status(invalid_post_ids, PostStatusEnum.INVALID.value)
+        except Exception as update_ex:
+            logger.error(f"Error updating {len(invalid_post_ids)} posts status to INVALID during reconstruction: {update_ex}", exc_info=True)
+    return job_specs
 
 
-    # 2. Восстановление задач для активных RSS-лент
-    try:
-        # Assuming db_service.get_all_active_rss_feeds manages its own session
-        active_rss_feeds: list[RssFeed] = await db_service.get_all_active_rss_feeds()
-        logger.info(f"Найдено {len(active_rss_feeds)} активных RSS-лент для восстановления расписания.")
+async def reconstruct_and_sync_jobs(db_service: Any, services_container: Any):
+    """
+    Восстанавливает и синхронизирует задачи планировщика на основе текущего состояния базы данных.
+    Планирует задачи для всех постов со статусом 'scheduled' и общую задачу проверки RSS-лент.
 
-        for feed in active_rss_feeds:
-            try:
-                logger.debug(f"Восстановление задачи для RSS-ленты {feed.id}")
-                if feed.frequency_minutes is not None and feed.frequency_minutes > 0:
-                    await schedule_rss_feed_check(
-                        feed_id=feed.id,
-                        interval_minutes=feed.frequency_minutes,
-                        services_container=services_container
-                    )
-                else:
-                    logger.warning(f"RSS-лента {feed.id} пропущена при восстановлении: некорректная частота проверки ({feed.frequency_minutes} минут).")
-                    # TODO: Optionally update feed status to invalid
-            except Exception as e:
-                logger.error(f"Ошибка при обработке RSS-ленты {feed.id} во время восстановления задач: {e}", exc_info=True)
+    Args:
+        db_service: Объект/модуль, предоставляющий доступ к БД (must have methods like get_all_scheduled_posts_for_reload, bulk_update_post_status).
+        services_container: Объект, содержащий ссылки на сервисы (используется db_service для обновления статусов постов).
+    """
+    scheduler = _scheduler_ctx.get()
+    if scheduler is None:
+        logger.error("Планировщик не инициализирован. Невозможно восстановить задачи.")
+        return
+
+    logger.info("Начат процесс восстановления и синхронизации задач из базы данных.")
 
+    # 1. Восстановление задач для запланированных постов
+    posts_loaded = False
+    try:
+        job_specs = await _load_post_job_specs(db_service, services_container)
+        posts_loaded = True
     except Exception as e:
-         logger.error(f"Ошибка при получении активных RSS-лент для восстановления: {e}", exc_info=True)
+        logger.error(f"Ошибка при получении запланированных постов для восстановления: {e}", exc_info=True)
+        if _is_db_connection_error(e):
+            raise # БД недоступна: без постов восстановление не имеет смысла
+        job_specs = []
 
+    # 2. RSS-ленты: одна общая задача-тик вместо задачи на каждую ленту. Ленты из БД здесь не
+    # загружаются: тик сам выбирает ленты с наступившим next_check_utc.
+    job_specs.append(_rss_master_tick_job_spec())
 
-    # 3. APScheduler automatically handles removing outdated jobs from the job store.
+
+    # 3-4. Сверка с хранилищем и пакетное добавление. Первая ошибка соединения с хранилищем задач
+    # прерывает восстановление целиком (один раз в логе вместо трассировки на каждую задачу).
+    try:
+        # 3. Сверка с уже сохраненными задачами: неизмененные не перезаписываются, задачи постов,
+        # которых больше нет среди запланированных, удаляются. Задачи хранилища видны только у
+        # запущенного планировщика (при старте он запущен приостановленным); до start() список пуст
+        # и все задачи просто добавляются. Удаление выполняется только если посты загружены
+        # полностью: после ошибки загрузки список неполон, и живые задачи постов сочлись бы лишними.
+        existing_jobs = {job.id: job for job in scheduler.get_jobs()}
+        if existing_jobs:
+            spec_ids = {spec['id'] for spec in job_specs}
+            job_specs = [
+                spec for spec in job_specs
+                if spec['id'] not in existing_jobs
+                or _job_fingerprint(existing_jobs[spec['id']].func_ref, existing_jobs[spec['id']].args, existing_jobs[spec['id']].trigger)
+                != _job_fingerprint(spec['func'], spec.get('args'), spec['trigger'])
+            ]
+            # Message deletion jobs are not reconstructed from the DB, so only publication
+            # (and legacy per-feed RSS) jobs can be orphans
+            orphan_prefixes = (f"{JobType.POST_PUBLISH.value}_", f"{JobType.RSS_CHECK.value}_")
+            if not posts_loaded:
+                logger.warning("Запланированные посты загружены не полностью, удаление лишних задач пропущено.")
+            else:
+                for job_id in existing_jobs.keys() - spec_ids:
+                    if job_id.startswith(orphan_prefixes):
+                        try:
+                            scheduler.remove_job(job_id)
+                        except JobLookupError:
+                            pass # Already gone
+            logger.info(f"Задач без изменений (перезапись пропущена): {len(spec_ids) - len(job_specs)}.")
+
+        # 4. Добавление всех восстановленных задач одним пакетом
+        added_jobs = await _bulk_add_jobs(job_specs)
+        logger.info(f"Восстановлено задач планировщика: {added_jobs}.")
+    except Exception as e:
+        if _is_db_connection_error(e):
+            logger.critical(f"Хранилище задач недоступно, восстановление задач прервано: {e}", exc_info=True)
+            jobstore = scheduler._jobstores.get('default')
+            if isinstance(jobstore, SQLAlchemyJobStore):
+                jobstore.engine.dispose() # Drop stale pooled connections; the next use reconnects
+            raise
+        logger.error(f"Ошибка при пакетном добавлении восстановленных задач: {e}", exc_info=True)
+
+    # 5. APScheduler automatically handles removing outdated jobs from the job store.
     # (e.g., one-time jobs after execution, recurring jobs after end_date).
     # Explicit cleanup logic might be needed for jobs in ERROR state or similar,
     # but is not typically required for basic startup sync.
@@ -575,9 +914,15 @@ async def initialize_and_start_scheduler(database_url: str, bot_instance: Any, s
         logger.error("DB Service not found in services_container. Scheduler reconstruction will fail.")
         # Potentially raise an error or exit here if DB service is critical
 
+    # Services are registered once per process; jobs store only ids and resolve services at run time
+    bot_tasks.register_services(services_container)
+
     init_scheduler(database_url) # Initialize scheduler with job store
 
-    # Reconstruct jobs from DB *before* starting, so they are ready when scheduler starts
+    # Start paused: job stores are usable (existing jobs can be compared, rows written in bulk),
+    # but no wakeup/get_due_jobs() scan runs while reconstruction inserts jobs
+    await start_scheduler_process(paused=True)
+
     try:
         await reconstruct_and_sync_jobs(services_container.db_service, services_container)
         logger.info("Initial job reconstruction from DB completed.")
@@ -585,11 +930,12 @@ async def initialize_and_start_scheduler(database_url: str, bot_instance: Any, s
         logger.critical(f"Critical error during scheduler job reconstruction: {e}", exc_info=True)
         # Decide if this is a fatal error for the application
 
-    # Start the scheduler process
-    await start_scheduler_process()
+    scheduler = _scheduler_ctx.get()
+    if scheduler is not None and scheduler.running:
+        scheduler.resume() # A single due-jobs scan for everything reconstructed
+        logger.info("Планировщик возобновлен после восстановления задач.")
 
-    global scheduler
-    # Return the global scheduler instance
+    # Return the scheduler instance of the current context
     if scheduler is None:
          logger.error("Scheduler is None after initialization and start process.")
          # This indicates a failure in init_scheduler or start_scheduler_process
@@ -601,13 +947,13 @@ async def shutdown_scheduler(scheduler_instance: AsyncIOScheduler, wait: bool =
     """
     Calls the internal shutdown process.
     Args:
-        scheduler_instance: The scheduler instance to shut down (should be the global one obtained from initialize_and_start_scheduler).
+        scheduler_instance: The scheduler instance to shut down (should be the one obtained from initialize_and_start_scheduler).
         wait: If True, waits for currently running jobs to finish.
     """
-    # Ensure the instance passed is the global one if needed, or just rely on it being correct
-    global scheduler
+    # Ensure the instance passed is the one of the current context, or just rely on it being correct
+    scheduler = _scheduler_ctx.get()
     if scheduler is None or scheduler_instance != scheduler:
-         logger.warning("Attempted to shut down a scheduler instance that does not match the global one.")
+         logger.warning("Attempted to shut down a scheduler instance that does not match the current one.")
          # Proceed with shutting down the provided instance anyway? Or error?
          # Let's assume the caller passes the correct instance.
          pass # Allow shutdown of provided instance
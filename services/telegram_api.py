@@ -1,18 +1,35 @@
+import asyncio
 import logging
-from typing import Any, Optional, List, Union, Tuple
-
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional, List, Union, Tuple
+
+from aiohttp import ClientConnectorError
 from aiogram import Bot
 from aiogram.types import (
     Message, ChatMember, InputMediaPhoto, InputMediaVideo,
-    InputMediaDocument, InputMediaAudio, InputMediaAnimation,
+    InputMediaDocument,
     BufferedInputFile # Assuming BufferInputFile is used for bytes, or FSInputFile for paths
 )
 from aiogram.types import FSInputFile # Need this for sending local files by path
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE
+from aiogram.methods import (
+    TelegramMethod, SendPhoto, SendVideo, SendDocument, SendAudio, SendAnimation, SendMediaGroup
+)
+# aiogram 3 has no per-case exception classes (MessageToDeleteNotFound, ...): such cases arrive as
+# TelegramBadRequest and are told apart by the error description
 from aiogram.exceptions import (
-    TelegramAPIError, MessageToDeleteNotFound, MessageCantBeDeleted,
-    UserNotFoundError, TelegramBadRequest
+    TelegramAPIError, TelegramBadRequest, TelegramRetryAfter, TelegramNetworkError,
+    TelegramForbiddenError, TelegramMigrateToChat
 )
 
+from services import dead_chats, file_id_cache
+import services.db as db_service
+
 # Assuming ContentManagerService is available and has a prepare_content method
 # from services.content_manager import ContentManagerService # Import if needed for type hinting prepare_content input
 
@@ -23,6 +40,597 @@ logger = logging.getLogger(__name__)
 MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP = 1024
 MAX_CAPTION_LENGTH_DOCUMENT = 4096 # Although not explicitly used for post text here, good to know
 
+# Повторы и ограничение частоты запросов к Bot API (_call / _send)
+TELEGRAM_MAX_ATTEMPTS = 5 # Attempts per call on flood control (429) and network errors
+NETWORK_BACKOFF_BASE_SECONDS = 1.0 # Exponential backoff (+ up to 1 s jitter) for network errors
+NETWORK_BACKOFF_CAP_SECONDS = 30.0
+GLOBAL_MAX_REQUESTS_PER_SECOND = 30 # Telegram: ~30 messages per second overall
+PER_CHAT_MIN_INTERVAL_SECONDS = 1.0 # Telegram: ~1 message per second per chat
+PER_CHAT_MAX_INTERVAL_SECONDS = 60.0
+# Adaptive per-chat interval: doubled on flood control (429) in the chat, divided by this after each successful send
+PER_CHAT_INTERVAL_RECOVERY = 1.1
+_CHAT_THROTTLE_PRUNE_SIZE = 1024 # Prune idle per-chat entries once there are more than this
+
+# Each permit is held for at least one second, so at most GLOBAL_MAX_REQUESTS_PER_SECOND calls start per second
+_global_rate_limit = asyncio.Semaphore(GLOBAL_MAX_REQUESTS_PER_SECOND)
+
+
+class _ChatThrottle:
+    """
+    Per-chat lock (sends to one chat go one at a time, in order), the time of the last send and the current
+    interval between sends. The interval backs off on flood control in the chat and recovers on success.
+    """
+    __slots__ = ('lock', 'last_sent', 'interval')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.last_sent = 0.0
+        self.interval = PER_CHAT_MIN_INTERVAL_SECONDS
+
+    def slow_down(self) -> None:
+        self.interval = min(PER_CHAT_MAX_INTERVAL_SECONDS, self.interval * 2)
+
+    def recover(self) -> None:
+        if self.interval > PER_CHAT_MIN_INTERVAL_SECONDS:
+            self.interval = max(PER_CHAT_MIN_INTERVAL_SECONDS, self.interval / PER_CHAT_INTERVAL_RECOVERY)
+
+
+_chat_throttles: dict[Union[int, str], _ChatThrottle] = {}
+
+
+# Методы, которые безопасно повторять после любой сетевой ошибки: запрос мог дойти до Telegram, но повтор
+# чтения или удаления не создает дубликатов. Отправки после таймаута/обрыва не повторяются (решает вызывающий).
+_NETWORK_RETRY_METHODS = frozenset({'get_chat_member', 'get_chat_administrators', 'delete_message', 'delete_messages'})
+
+
+def _network_retry_safe(method, e: TelegramNetworkError) -> bool:
+    """True if the call can be repeated after e: an idempotent method, or the connection was never established."""
+    return method.__name__ in _NETWORK_RETRY_METHODS or isinstance(e.__cause__, ClientConnectorError)
+
+
+async def _call(method, **kwargs):
+    """
+    Вызывает метод Bot API с учетом глобального лимита запросов.
+    На 429 (TelegramRetryAfter) ждет ровно retry_after и повторяет; на сетевых ошибках повторяет
+    с экспоненциальной задержкой и джиттером, если повтор не опубликует сообщение дважды (см. _network_retry_safe).
+    После TELEGRAM_MAX_ATTEMPTS попыток ошибка пробрасывается.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        await _global_rate_limit.acquire()
+        started = time.monotonic()
+        try:
+            return await method(**kwargs)
+        except TelegramRetryAfter as e:
+            if attempt >= TELEGRAM_MAX_ATTEMPTS:
+                raise
+            delay = e.retry_after
+            throttle = _chat_throttles.get(kwargs.get('chat_id'))
+            if throttle is not None: # A send to this chat (see _send): space the following sends further apart
+                throttle.slow_down()
+            logger.warning("Flood control on %s (chat %s): retrying in %s s (attempt %s).", method.__name__, kwargs.get('chat_id'), delay, attempt)
+        except TelegramNetworkError as e:
+            if attempt >= TELEGRAM_MAX_ATTEMPTS or not _network_retry_safe(method, e):
+                raise
+            delay = min(NETWORK_BACKOFF_CAP_SECONDS, NETWORK_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)) + random.random()
+            logger.warning("Network error on %s (chat %s): %s: %s. Retrying in %.1f s (attempt %s).", method.__name__, kwargs.get('chat_id'), type(e).__name__, e, delay, attempt)
+        finally:
+            remaining = started + 1.0 - time.monotonic()
+            if remaining > 0:
+                asyncio.get_running_loop().call_later(remaining, _global_rate_limit.release)
+            else:
+                _global_rate_limit.release()
+        await asyncio.sleep(delay)
+
+
+# Описания ошибок TelegramBadRequest, после которых отправка в чат бессмысленна (чат отмечается как мертвый)
+_DEAD_CHAT_BAD_REQUESTS = ("chat not found", "user not found", "peer_id_invalid")
+
+
+def _dead_chat_reason(e: TelegramAPIError) -> Optional[str]:
+    """
+    Returns the error description if e means that no send to the chat can succeed: the bot was blocked,
+    kicked or the user deactivated (TelegramForbiddenError), or the chat doesn't exist. Returns None for
+    other errors. A group upgraded to a supergroup (TelegramMigrateToChat) is not dead, see _send.
+    """
+    if isinstance(e, TelegramForbiddenError):
+        return e.message
+    if isinstance(e, TelegramBadRequest):
+        description = e.message.lower()
+        if any(marker in description for marker in _DEAD_CHAT_BAD_REQUESTS):
+            return e.message
+    return None
+
+
+# '@username' -> числовой ID чата, узнанный из ответов на отправку (без отдельных запросов getChat).
+# Отправки по username после первой идут по числовому ID: у них общий с ним throttle и отметка dead_chats.
+_chat_ids_by_username: dict[str, int] = {}
+# ID группы -> ID супергруппы, в которую она преобразована (TelegramMigrateToChat). Строки user_channels
+# обновляются при первой такой ошибке, а посты, запланированные со старым ID, сразу идут по новому.
+_migrated_chat_ids: dict[int, int] = {}
+
+
+def resolve_chat_id(chat_id: Union[int, str]) -> Union[int, str]:
+    """
+    Returns the numeric chat ID for a '@username' seen in an earlier send, the supergroup ID for a migrated
+    group, otherwise chat_id unchanged.
+    """
+    if isinstance(chat_id, str):
+        return _chat_ids_by_username.get(chat_id, chat_id)
+    return _migrated_chat_ids.get(chat_id, chat_id)
+
+
+def _learn_chat_id(username: str, result: Any) -> None:
+    """Remembers the numeric chat ID from the response (Message or list of Messages) to a send by '@username'."""
+    message = result[0] if isinstance(result, list) and result else result
+    chat = getattr(message, 'chat', None)
+    if chat is not None and isinstance(chat.id, int):
+        if len(_chat_ids_by_username) >= _CHAT_THROTTLE_PRUNE_SIZE:
+            _chat_ids_by_username.clear() # Relearned on the next send to each username
+        _chat_ids_by_username[username] = chat.id
+
+
+async def _send(method, chat_id: Union[int, str], **kwargs):
+    """_call for methods that post into a chat: sends to one chat are serialized and spaced by PER_CHAT_MIN_INTERVAL_SECONDS."""
+    username = chat_id if isinstance(chat_id, str) and chat_id.startswith('@') else None
+    chat_id = resolve_chat_id(chat_id)
+    throttle = _chat_throttles.get(chat_id)
+    if throttle is None:
+        if len(_chat_throttles) > _CHAT_THROTTLE_PRUNE_SIZE:
+            now = time.monotonic()
+            for idle_chat_id in [cid for cid, t in _chat_throttles.items() if not t.lock.locked() and t.last_sent + t.interval < now]:
+                del _chat_throttles[idle_chat_id]
+        throttle = _chat_throttles[chat_id] = _ChatThrottle()
+    async with throttle.lock:
+        wait = throttle.last_sent + throttle.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            result = await _call(method, chat_id=chat_id, **kwargs)
+        except TelegramMigrateToChat as e:
+            migrated = True
+            new_chat_id = e.migrate_to_chat_id
+        except TelegramAPIError as e:
+            reason = _dead_chat_reason(e)
+            if reason is not None:
+                if username is not None and _chat_ids_by_username.pop(username, None) is not None:
+                    return await _send(method, username, **kwargs) # The username may belong to another chat now
+                await dead_chats.mark_dead(chat_id, reason)
+            raise
+        else:
+            migrated = False
+        finally:
+            throttle.last_sent = time.monotonic()
+        if not migrated:
+            throttle.recover()
+    if migrated:
+        # The group was upgraded to a supergroup with a new ID: send there and move the stored channels
+        logger.warning("Chat %s was migrated to supergroup %s, resending there.", chat_id, new_chat_id)
+        _migrated_chat_ids[chat_id] = new_chat_id
+        await db_service.migrate_user_channels_chat_id(chat_id, new_chat_id)
+        return await _send(method, new_chat_id, **kwargs)
+    if username is not None:
+        _learn_chat_id(username, result)
+    return result
+
+
+SHARED_UPLOAD_MAX_BYTES = 20 * 1024 * 1024 # Larger files are streamed from disk on every upload
+
+
+class SharedBytesInputFile(FSInputFile):
+    """
+    FSInputFile, читающий файл с диска один раз: все загрузки одного подготовленного поста
+    (несколько чатов рассылки, повтор после отклоненного file_id) используют одни и те же байты.
+    Файлы больше SHARED_UPLOAD_MAX_BYTES читаются потоково, как обычный FSInputFile.
+    """
+
+    def __init__(self, path: str, filename: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(path, filename=filename, chunk_size=chunk_size)
+        self._data: Optional[bytes] = None
+        self._read_lock = asyncio.Lock()
+
+    async def _load(self) -> Optional[bytes]:
+        async with self._read_lock: # Concurrent uploads wait for the first read instead of reading again
+            if self._data is None and await asyncio.to_thread(os.path.getsize, self.path) <= SHARED_UPLOAD_MAX_BYTES:
+                self._data = await asyncio.to_thread(Path(self.path).read_bytes)
+        return self._data
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        data = self._data if self._data is not None else await self._load()
+        if data is None:
+            async for chunk in super().read(bot):
+                yield chunk
+            return
+        for offset in range(0, len(data), self.chunk_size):
+            yield data[offset:offset + self.chunk_size]
+
+
+@dataclass(slots=True)
+class _MediaRef:
+    """
+    Медиа одного элемента поста: source - что передается в Telegram (file_id из кэша, FSInputFile для загрузки
+    локального файла или исходное значение), path и cache_key - локальный файл и его ключ в file_id_cache.
+    """
+    source: Any
+    path: Optional[str] = None
+    cache_key: Optional[file_id_cache.CacheKey] = None
+
+
+def resolve_media(media_data: Any, media_type: Optional[str]) -> _MediaRef:
+    """
+    Resolves media_data once per prepared post: an already uploaded local file becomes its cached file_id,
+    a local file that has to be uploaded becomes FSInputFile, anything else (file_id, URL, InputFile) is kept as is.
+    """
+    key = file_id_cache.cache_key(media_data, media_type)
+    if key is None:
+        return _MediaRef(source=media_data)
+    file_id = file_id_cache.get_cached(key)
+    return _MediaRef(source=file_id or SharedBytesInputFile(media_data), path=media_data, cache_key=key)
+
+
+def _message_file_id(message: Message) -> Optional[str]:
+    """Returns the file_id of the media in a sent message (largest photo size for photos)."""
+    if message.photo:
+        return message.photo[-1].file_id
+    for media in (message.video, message.document, message.audio, message.animation):
+        if media is not None:
+            return media.file_id
+    return None
+
+
+async def _remember_file_id(ref: _MediaRef, message: Optional[Message]) -> None:
+    """Stores the file_id Telegram assigned to an uploaded local file, so later sends (and restarts) reuse it."""
+    if message is None or ref.cache_key is None or file_id_cache.get_cached(ref.cache_key) is not None:
+        return
+    file_id = _message_file_id(message)
+    if file_id:
+        await file_id_cache.put(ref.cache_key, file_id)
+
+
+def _is_wrong_file_id_error(e: TelegramBadRequest) -> bool:
+    # "wrong file identifier/HTTP URL specified", "wrong remote file identifier specified: ..."
+    return "file identifier" in e.message.lower()
+
+
+async def _drop_stale_file_ids(refs: List[_MediaRef], sent_sources: List[Any]) -> bool:
+    """
+    Called after Telegram rejected a file_id: forgets the cached file_ids that were sent and switches
+    their items back to uploading the local file. Returns True if the send is worth retrying.
+    """
+    retry = False
+    for ref, sent_source in zip(refs, sent_sources):
+        if ref.cache_key is None or isinstance(sent_source, FSInputFile):
+            continue
+        retry = True
+        if ref.source is sent_source: # Not yet switched by a concurrent send of the same broadcast
+            await file_id_cache.invalidate(ref.cache_key)
+            ref.source = SharedBytesInputFile(ref.path)
+    return retry
+
+
+def _request_for_chat(bot: Bot, request: TelegramMethod):
+    """
+    Adapts a prepared request to _send()/_call(): the returned coroutine function sends a copy of request
+    with chat_id patched in. The request is validated once when prepared; model_copy() per chat doesn't re-validate.
+    """
+    async def send(chat_id: Union[int, str]):
+        return await bot(request.model_copy(update={'chat_id': chat_id}))
+    send.__name__ = request.__api_method__ # For _call() log messages
+    return send
+
+
+def _media_request(media_type: str, source: Any, caption: Optional[str], parse_mode: str) -> TelegramMethod:
+    """Builds (and validates) the send request of one media item; chat_id is patched per chat by _request_for_chat()."""
+    request_cls, media_field = _SEND_DISPATCH[media_type]
+    return request_cls(chat_id=0, **{media_field: source}, caption=caption, parse_mode=parse_mode)
+
+
+async def _send_media(
+    bot: Bot,
+    chat_id: Union[int, str],
+    media_type: str,
+    ref: _MediaRef,
+    caption: Optional[str],
+    parse_mode: str,
+    request: Optional[TelegramMethod] = None
+) -> Message:
+    """
+    Sends one media item (see _SEND_DISPATCH), using request if it was prepared for the post.
+    A rejected cached file_id is dropped and the file uploaded again.
+    """
+    media_field = _SEND_DISPATCH[media_type][1]
+    if request is None or getattr(request, media_field) is not ref.source: # Not prepared, or the source was switched since
+        request = _media_request(media_type, ref.source, caption, parse_mode)
+    try:
+        message = await _send(_request_for_chat(bot, request), chat_id=chat_id)
+    except TelegramBadRequest as e:
+        if not _is_wrong_file_id_error(e) or not await _drop_stale_file_ids([ref], [getattr(request, media_field)]):
+            raise
+        logger.warning("Cached file_id for %s was rejected in chat %s, uploading the file again.", ref.path, chat_id)
+        request = request.model_copy(update={media_field: ref.source})
+        message = await _send(_request_for_chat(bot, request), chat_id=chat_id)
+    await _remember_file_id(ref, message)
+    return message
+
+
+async def _send_media_group(bot: Bot, chat_id: Union[int, str], request: SendMediaGroup, refs: List[_MediaRef]) -> List[Message]:
+    """Sends a prepared media group request, with the same handling of rejected cached file_ids as _send_media."""
+    try:
+        messages = await _send(_request_for_chat(bot, request), chat_id=chat_id)
+    except TelegramBadRequest as e:
+        if not _is_wrong_file_id_error(e) or not await _drop_stale_file_ids(refs, [item.media for item in request.media]):
+            raise
+        logger.warning("Cached file_ids of a media group were rejected in chat %s, uploading the files again.", chat_id)
+        request = request.model_copy(update={'media': [item.model_copy(update={'media': ref.source}) for item, ref in zip(request.media, refs)]})
+        messages = await _send(_request_for_chat(bot, request), chat_id=chat_id)
+    for ref, message in zip(refs, messages): # One message per group item, in order
+        await _remember_file_id(ref, message)
+    return messages
+
+
+# Массовая рассылка (send_post_bulk): чаты обрабатываются пачками по BROADCAST_BATCH_SIZE с паузой между пачками;
+# общий семафор ограничивает число одновременных отправок во всех рассылках процесса.
+BROADCAST_BATCH_SIZE = 25
+BROADCAST_BATCH_DELAY_SECONDS = 1.0
+BROADCAST_MAX_CONCURRENCY = 25
+_broadcast_semaphore = asyncio.Semaphore(BROADCAST_MAX_CONCURRENCY)
+
+
+# Тип медиа -> (метод Bot API, имя параметра с медиа) для отправки одиночным сообщением
+_SEND_DISPATCH: dict[str, tuple[type[TelegramMethod], str]] = {
+    'photo': (SendPhoto, 'photo'),
+    'video': (SendVideo, 'video'),
+    'document': (SendDocument, 'document'),
+    'audio': (SendAudio, 'audio'),
+    'animation': (SendAnimation, 'animation'),
+}
+# Типы медиа, которые можно смешивать в одной медиагруппе (audio/animation - нельзя). Caption limit is 1024 in group.
+_INPUT_MEDIA_DISPATCH: dict[str, type] = {
+    'photo': InputMediaPhoto,
+    'video': InputMediaVideo,
+    'document': InputMediaDocument,
+}
+
+
+@dataclass(slots=True)
+class _PreparedPost:
+    """
+    Не зависящая от чата часть отправки поста: подписи, решение об отдельной отправке текста,
+    источники медиа (file_id / FSInputFile) и объекты InputMedia. Готовится один раз (_prepare_post)
+    и отправляется в любое число чатов (_send_prepared).
+    """
+    text: Optional[str]
+    parse_mode: str
+    kind: str # 'empty', 'text', 'single', 'single_missing' (media data missing: text only) or 'multi'
+    send_full_text_separately: bool = False
+    # kind == 'single'
+    single_type: Optional[str] = None
+    single_media: Optional[_MediaRef] = None
+    single_request: Optional[TelegramMethod] = None # Validated once, chat_id patched per chat (None: built at send time)
+    single_caption: Optional[str] = None
+    # kind == 'multi': media group items (with their media refs, for the file_id cache)
+    input_media_items: List[Any] = field(default_factory=list)
+    input_media_refs: List[_MediaRef] = field(default_factory=list)
+    media_group_request: Optional[SendMediaGroup] = None
+    can_form_media_group: bool = False
+    # kind == 'multi': (index, media_type, media ref, caption) for sending items one by one
+    individual_items: List[tuple] = field(default_factory=list)
+    # True if some media still has to be uploaded (FSInputFile): after the first send its file_id is cached
+    has_uploads: bool = False
+
+
+@lru_cache(maxsize=4096)
+def tg_len(s: str) -> int:
+    """Length of s in UTF-16 code units: Telegram counts caption/message limits in these, not in Python chars."""
+    if s.isascii(): # Common case: one code unit per char, no encoding needed
+        return len(s)
+    return len(s.encode('utf-16-le')) // 2 # Astral chars (most emoji) take two code units
+
+
+CAPTION_SEPARATOR = "\n\n" # Between the post text and an item's own caption
+
+
+def _combine_caption(*parts: Optional[str]) -> str:
+    """Joins the non-empty parts with CAPTION_SEPARATOR in one allocation (no intermediate strings)."""
+    return CAPTION_SEPARATOR.join([part for part in parts if part])
+
+
+def _fits(caption: Optional[str], limit: int) -> bool:
+    return bool(caption) and tg_len(caption) <= limit
+
+
+@dataclass(slots=True)
+class CaptionPlan:
+    """
+    Подписи к медиа поста, рассчитанные один раз (plan_captions).
+    per_item_captions[i] - подпись i-го медиа при отправке одиночным файлом или в медиагруппе,
+    individual_captions[i] - подпись i-го медиа при поштучной отправке (только для нескольких медиа),
+    send_text_separately - текст поста не помещается в подпись и отправляется отдельным сообщением.
+    """
+    per_item_captions: List[Optional[str]]
+    individual_captions: List[Optional[str]]
+    send_text_separately: bool
+
+
+def plan_captions(text: Optional[str], media_files: List[dict[str, Any]]) -> CaptionPlan:
+    """
+    Decides which caption each media item is sent with. The post text and the item's own caption are combined
+    (separated by an empty line) for a single item and for the first item of a media group; if that doesn't fit,
+    the post text is sent as a separate message and the item keeps only its own caption (if it fits).
+    """
+    if not media_files:
+        return CaptionPlan(per_item_captions=[], individual_captions=[], send_text_separately=False)
+
+    if len(media_files) == 1:
+        media_item = media_files[0]
+        individual_caption = media_item.get('caption', '') # Individual caption from content_manager
+        combined_caption = _combine_caption(text, individual_caption)
+        # For single items: photo/video 1024, document 4096
+        caption_limit = MAX_CAPTION_LENGTH_DOCUMENT if media_item.get('type') == 'document' else MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP
+        if not combined_caption or _fits(combined_caption, caption_limit):
+            return CaptionPlan(per_item_captions=[combined_caption or None], individual_captions=[], send_text_separately=False)
+        # Combined caption is too long: the post text (if any) goes separately,
+        # the media keeps only its individual caption if that fits
+        return CaptionPlan(
+            per_item_captions=[individual_caption if _fits(individual_caption, caption_limit) else None],
+            individual_captions=[],
+            send_text_separately=bool(text),
+        )
+
+    # Several items: in a media group all captions are limited to 1024 and only the first one is shown by clients
+    # (captions of the other items are passed anyway). When items are sent one by one, each gets only
+    # its individual caption, with the limit of its own type.
+    per_item_captions: List[Optional[str]] = []
+    individual_captions: List[Optional[str]] = []
+    send_text_separately = False
+    for i, media_item in enumerate(media_files):
+        individual_caption = media_item.get('caption', '')
+        caption_limit_individual = MAX_CAPTION_LENGTH_DOCUMENT if media_item.get('type') == 'document' else MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP
+        individual_captions.append(individual_caption if _fits(individual_caption, caption_limit_individual) else None)
+
+        if i == 0:
+            first_item_caption = _combine_caption(text, individual_caption)
+            if _fits(first_item_caption, MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP):
+                per_item_captions.append(first_item_caption)
+                continue
+            send_text_separately = bool(text)
+        per_item_captions.append(individual_caption if _fits(individual_caption, MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP) else None)
+
+    return CaptionPlan(
+        per_item_captions=per_item_captions,
+        individual_captions=individual_captions,
+        send_text_separately=send_text_separately,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _needs_html(s: Optional[str]) -> bool:
+    """True if s may contain HTML tags or entities. Cached: a broadcast prepares the same texts repeatedly."""
+    return bool(s) and ('<' in s or '&' in s)
+
+
+def _effective_parse_mode(parse_mode: Optional[str], texts: List[Optional[str]]) -> Optional[str]:
+    """
+    Returns None instead of 'HTML' if none of the texts of a post contain markup: Telegram then doesn't parse them,
+    and stray characters in plain user text can't fail the send with "can't parse entities".
+    An explicit None also overrides the bot's default parse_mode. Other parse modes are returned unchanged.
+    """
+    if not parse_mode or parse_mode.upper() != 'HTML':
+        return parse_mode
+    return parse_mode if any(map(_needs_html, texts)) else None
+
+
+def _classify(media_files: List[dict[str, Any]]) -> str:
+    """
+    Chooses how several media items are sent, before any InputMedia is built:
+    'group_ok' - one media group (all items have data and are photo/video/document),
+    'individual' - one by one (missing data, audio/animation, which can't be mixed with other types, or unsupported types),
+    'empty' - no items.
+    """
+    if not media_files:
+        return 'empty'
+    media_types = set()
+    for i, media_item in enumerate(media_files):
+        if media_item.get('media') is None:
+            logger.warning("Media item %s has no data. Cannot form media group.", i)
+            return 'individual'
+        media_types.add(media_item.get('type'))
+    unsupported = media_types.difference(_INPUT_MEDIA_DISPATCH)
+    if unsupported:
+        logger.warning("Media types %s can't be sent in a media group with other types. Sending items individually.", sorted(map(str, unsupported)))
+        return 'individual'
+    return 'group_ok'
+
+
+def _prepare_post(
+    text: Optional[str],
+    media_files: Optional[List[dict[str, Any]]],
+    parse_mode: str = 'HTML'
+) -> _PreparedPost:
+    """Builds the chat-independent part of sending a post (see _PreparedPost)."""
+    # If media is present, main text becomes caption for the first media item (see plan_captions).
+    # If text exceeds caption limit for the first media, the full text is sent as a separate message.
+    # If no media, text is sent as a regular message.
+    if not media_files:
+        return _PreparedPost(text=text, parse_mode=_effective_parse_mode(parse_mode, [text]), kind='text' if text else 'empty')
+
+    plan = plan_captions(text, media_files)
+    parse_mode = _effective_parse_mode(parse_mode, [text, *plan.per_item_captions, *plan.individual_captions])
+
+    if len(media_files) == 1:
+        # Одиночный медиафайл
+        media_item = media_files[0]
+        media_type = media_item.get('type')
+        media_data = media_item.get('media') # This should be the file content or file_id
+
+        if media_data is None:
+            logger.error("Media data is missing for single item. Type: %s. Attempting text fallback.", media_type)
+            return _PreparedPost(text=text, parse_mode=parse_mode, kind='single_missing')
+
+        media_ref = resolve_media(media_data, media_type) # Cached file_id, FSInputFile for a local path, or as is
+        single_request = None
+        if media_type in _SEND_DISPATCH:
+            try: # Validated here once for all chats; on failure _send_media() builds it and reports the error per chat
+                single_request = _media_request(media_type, media_ref.source, plan.per_item_captions[0], parse_mode)
+            except Exception as e:
+                logger.debug("Could not prepare the send request for the single %s: %s", media_type, e)
+        return _PreparedPost(
+            text=text,
+            parse_mode=parse_mode,
+            kind='single',
+            send_full_text_separately=plan.send_text_separately,
+            single_type=media_type,
+            single_media=media_ref,
+            single_caption=plan.per_item_captions[0],
+            single_request=single_request,
+            has_uploads=isinstance(media_ref.source, FSInputFile),
+        )
+
+    # len(media_files) > 1: media group, or items one by one if a group can't be formed
+    send_path = _classify(media_files)
+    prepared = _PreparedPost(
+        text=text,
+        parse_mode=parse_mode,
+        kind='multi',
+        send_full_text_separately=plan.send_text_separately,
+        can_form_media_group=send_path == 'group_ok',
+    )
+
+    for i, media_item in enumerate(media_files):
+        media_type = media_item.get('type')
+        media_data = media_item.get('media') # This should be InputFile, bytes, or file_id
+
+        if media_data is None:
+            logger.warning("Skipping media item %s due to missing data.", i)
+            continue
+
+        # Resolved once per item: every chat of a broadcast reuses the source and cache key (no per-chat stat())
+        media_ref = resolve_media(media_data, media_type)
+        if isinstance(media_ref.source, FSInputFile):
+            prepared.has_uploads = True
+        prepared.individual_items.append((i, media_type, media_ref, plan.individual_captions[i]))
+
+    if prepared.can_form_media_group:
+        # Only the first item's caption is shown in a group; the others are passed anyway (limit 1024)
+        try:
+            for i, media_type, media_ref, _ in prepared.individual_items:
+                input_media_cls = _INPUT_MEDIA_DISPATCH[media_type]
+                prepared.input_media_items.append(
+                    input_media_cls(media=media_ref.source, caption=plan.per_item_captions[i], parse_mode=parse_mode)
+                )
+                prepared.input_media_refs.append(media_ref)
+            # Validated once for all chats of a broadcast, see _request_for_chat()
+            prepared.media_group_request = SendMediaGroup(chat_id=0, media=prepared.input_media_items)
+        except Exception as e: # Catch exceptions during InputMedia object creation (e.g., invalid data format)
+            logger.warning("Failed to create InputMedia object for item %s of type %s: %s", i, media_type, e)
+            prepared.can_form_media_group = False # Cannot form group if any item creation fails
+            prepared.input_media_items.clear()
+            prepared.input_media_refs.clear()
+            prepared.media_group_request = None
+
+    return prepared
+
 
 async def send_post(
     bot: Bot,
@@ -37,324 +645,232 @@ async def send_post(
     Возвращает список отправленных сообщений (list of Message objects) или None при критической ошибке.
     Каждый элемент media_files должен быть словарем с ключами 'type' (str, e.g., 'photo', 'video')
     and 'media' (Any, e.g., file_id, bytes, InputFile object), optionally 'caption' (str).
+    Для рассылки одного поста в несколько чатов используйте send_post_bulk.
     """
+    try:
+        await file_id_cache.preload(media_files)
+        prepared = _prepare_post(text, media_files, parse_mode)
+    except Exception as e:
+        logger.critical("An unexpected critical error occurred while preparing post for chat %s: %s", chat_id, e, exc_info=True)
+        return None
+    return await _send_prepared(bot, chat_id, prepared)
+
+
+async def send_post_bulk(
+    bot: Bot,
+    chat_ids: List[Union[int, str]],
+    text: Optional[str],
+    media_files: Optional[List[dict[str, Any]]],
+    parse_mode: str = 'HTML',
+    batch_size: int = BROADCAST_BATCH_SIZE,
+    delay_between_batches: float = BROADCAST_BATCH_DELAY_SECONDS
+) -> dict[Union[int, str], Optional[List[Message]]]:
+    """
+    Рассылает один пост в несколько чатов. Подписи и медиа готовятся один раз (_prepare_post);
+    чаты обрабатываются пачками по batch_size параллельно (asyncio.gather) с паузой delay_between_batches
+    между пачками. Если медиа еще нужно загрузить, сначала отправляется в первый чат: загруженные файлы
+    получают file_id, и остальные чаты получают file_id вместо повторной загрузки.
+    Чаты, отмеченные как мертвые (services/dead_chats.py), пропускаются без запросов к Telegram.
+
+    Returns:
+        Словарь chat_id -> список отправленных сообщений или None (как у send_post) для каждого чата.
+    """
+    results: dict[Union[int, str], Optional[List[Message]]] = {}
+    await dead_chats.ensure_loaded()
+    skipped_chat_ids = [chat_id for chat_id in chat_ids if dead_chats.is_dead(resolve_chat_id(chat_id))]
+    if skipped_chat_ids:
+        logger.info("Skipping %s dead chats in broadcast: %s", len(skipped_chat_ids), skipped_chat_ids)
+        results.update(dict.fromkeys(skipped_chat_ids))
+        chat_ids = [chat_id for chat_id in chat_ids if chat_id not in results]
+    if not chat_ids:
+        return results
+    try:
+        await file_id_cache.preload(media_files)
+        prepared = _prepare_post(text, media_files, parse_mode)
+    except Exception as e:
+        logger.critical("An unexpected critical error occurred while preparing post for broadcast to %s chats: %s", len(chat_ids), e, exc_info=True)
+        results.update(dict.fromkeys(chat_ids))
+        return results
+
+    remaining_chat_ids = list(chat_ids)
+    if prepared.has_uploads:
+        # Upload once to the first chat, then prepare again: sources now resolve to cached file_ids
+        first_chat_id = remaining_chat_ids.pop(0)
+        results[first_chat_id] = await _send_prepared(bot, first_chat_id, prepared)
+        if remaining_chat_ids:
+            prepared = _prepare_post(text, media_files, parse_mode)
+
+    async def _send_one(chat_id: Union[int, str]) -> Optional[List[Message]]:
+        async with _broadcast_semaphore:
+            return await _send_prepared(bot, chat_id, prepared)
+
+    for batch_start in range(0, len(remaining_chat_ids), batch_size):
+        if batch_start:
+            await asyncio.sleep(delay_between_batches)
+        batch = remaining_chat_ids[batch_start:batch_start + batch_size]
+        batch_results = await asyncio.gather(*(_send_one(chat_id) for chat_id in batch), return_exceptions=True)
+        for chat_id, result in zip(batch, batch_results):
+            if isinstance(result, BaseException):
+                logger.error("Unexpected error during broadcast to chat %s: %s", chat_id, result, exc_info=result)
+                result = None
+            results[chat_id] = result
+    return results
+
+
+async def _send_prepared(bot: Bot, chat_id: Union[int, str], prepared: _PreparedPost) -> Optional[List[Message]]:
+    """Sends a prepared post to one chat. Returns the sent messages or None, like send_post."""
     sent_messages: List[Message] = []
     main_text_sent_separately = False
-
-    # Define combined caption and separate text based on media presence
-    # If media is present, main text becomes caption for the first media item.
-    # If text exceeds caption limit for the first media, or if there are multiple media items
-    # (where only the first can have a full caption), the full text is sent as a separate message.
-    # If no media, text is sent as a regular message.
+    text = prepared.text
+    parse_mode = prepared.parse_mode
 
     try:
         # Validate chat_id format if necessary (e.g., ensure it's int for channel IDs)
         # For simplicity, assume chat_id is valid (int or '@username') as passed from handlers/DB.
 
-        if not media_files:
+        if prepared.kind in ('text', 'empty'):
             # Отправка только текста
             if text:
-                logger.info(f"Sending text-only post to chat {chat_id}")
+                logger.info("Sending text-only post to chat %s", chat_id)
                 try:
-                    message = await bot.send_message(
+                    message = await _send(bot.send_message,
                         chat_id=chat_id,
                         text=text,
                         parse_mode=parse_mode
                     )
                     sent_messages.append(message)
-                    logger.info(f"Text-only post sent to chat {chat_id}, message_id: {message.message_id}")
+                    logger.info("Text-only post sent to chat %s, message_id: %s", chat_id, message.message_id)
                 except TelegramAPIError as e:
-                     logger.error(f"Failed to send text-only post to chat {chat_id}: {e}", exc_info=True)
+                     logger.error("Failed to send text-only post to chat %s: %s: %s", chat_id, type(e).__name__, e)
                      return None # Indicate critical failure for this chat_id
 
             else:
                 # Ни текста, ни медиа - нечего отправлять
-                logger.warning(f"Attempted to send empty post to chat {chat_id}")
+                logger.warning("Attempted to send empty post to chat %s", chat_id)
                 return None # Nothing sent
 
-        elif len(media_files) == 1:
-            # Отправка одиночного медиафайла
-            media_item = media_files[0]
-            media_type = media_item.get('type')
-            media_data = media_item.get('media') # This should be the file content or file_id
-            individual_caption = media_item.get('caption', '') # Individual caption from content_manager
-
-            if media_data is None:
-                logger.error(f"Media data is missing for single item in chat {chat_id}. Type: {media_type}. Attempting text fallback.")
-                # Try to send text as a fallback if media is invalid
-                if text:
-                     try:
-                          message = await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
-                          sent_messages.append(message)
-                          main_text_sent_separately = True
-                     except TelegramAPIError as text_e:
-                          logger.error(f"Failed text fallback to chat {chat_id}: {text_e}", exc_info=True)
-                return sent_messages if sent_messages else None # Return text messages if sent, else None
-
-
-            # Combined caption logic: full post text + individual media caption
-            # Post text goes first, then maybe a separator, then individual caption
-            combined_caption = ""
+        elif prepared.kind == 'single_missing':
+            # Try to send text as a fallback if media is invalid
             if text:
-                combined_caption += text
-                if individual_caption:
-                    combined_caption += "\n\n" # Separator
-            if individual_caption:
-                combined_caption += individual_caption
-
-
-            # Determine caption limit based on media type
-            # Note: In media groups, photo/video/document captions are all limited to 1024.
-            # For single items: photo/video 1024, document 4096. Using correct limits here.
-            caption_limit = MAX_CAPTION_LENGTH_DOCUMENT if media_type == 'document' else MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP # This limit is 1024 for photo/video
-
-            # Determine which caption to send with media and if text needs separate message
-            send_caption = None
-            send_full_text_separately = False
+                 try:
+                      message = await _send(bot.send_message, chat_id=chat_id, text=text, parse_mode=parse_mode)
+                      sent_messages.append(message)
+                      main_text_sent_separately = True
+                 except TelegramAPIError as text_e:
+                      logger.error("Failed text fallback to chat %s: %s: %s", chat_id, type(text_e).__name__, text_e)
+            return sent_messages if sent_messages else None # Return text messages if sent, else None
+
+        elif prepared.kind == 'single':
+            # Отправка одиночного медиафайла
+            media_type = prepared.single_type
+            media_ref = prepared.single_media
+            send_caption = prepared.single_caption
 
-            if combined_caption:
-                if len(combined_caption) <= caption_limit:
-                    send_caption = combined_caption
-                else:
-                    # Combined caption is too long for media caption.
-                    # If there is main post text, it must be sent separately.
-                    # The media will be sent with only its individual_caption if it exists and fits.
-                    if text: # If main post text exists
-                         send_full_text_separately = True
-                         # The caption for the media should then only be the individual_caption if it fits the limit
-                         if individual_caption and len(individual_caption) <= caption_limit:
-                             send_caption = individual_caption
-                         else:
-                             send_caption = None # Individual caption also too long or doesn't exist
-                    else:
-                        # Only individual_caption exists and is too long -> send with no caption
-                        send_caption = None # Individual caption too long
-
-
-            logger.info(f"Sending single media item ({media_type}) to chat {chat_id}")
+            logger.info("Sending single media item (%s) to chat %s", media_type, chat_id)
             try:
-                # Send full text separately if it was too long for combined caption and there was main text
-                if send_full_text_separately and text:
+                # Send full text separately if it was too long for combined caption and there was main text.
+                # Text and media are sent one after another on purpose: _send serializes sends to one chat and spaces
+                # them by PER_CHAT_MIN_INTERVAL_SECONDS anyway, and the text has to come before the media.
+                if prepared.send_full_text_separately and text:
                     try:
-                        text_message = await bot.send_message(
+                        text_message = await _send(bot.send_message,
                             chat_id=chat_id,
                             text=text, # Send full original text
                             parse_mode=parse_mode
                         )
                         sent_messages.append(text_message)
                         main_text_sent_separately = True
-                        logger.debug(f"Sent separate text message to chat {chat_id}, message_id: {text_message.message_id}")
+                        logger.debug("Sent separate text message to chat %s, message_id: %s", chat_id, text_message.message_id)
                     except TelegramAPIError as text_e:
-                        logger.error(f"Failed to send separate text message to chat {chat_id}: {text_e}", exc_info=True)
+                        logger.error("Failed to send separate text message to chat %s: %s: %s", chat_id, type(text_e).__name__, text_e)
                         # Decide whether to proceed with media sending or return None.
                         # Let's proceed with media, as text failure shouldn't block media.
 
 
                 # Send the media with the determined caption
-                message = None
-                if media_type == 'photo':
-                    message = await bot.send_photo(
-                        chat_id=chat_id,
-                        photo=media_data, # media_data should be InputFile, bytes, or file_id
-                        caption=send_caption,
-                        parse_mode=parse_mode
-                    )
-                elif media_type == 'video':
-                    message = await bot.send_video(
-                        chat_id=chat_id,
-                        video=media_data,
-                        caption=send_caption,
-                        parse_mode=parse_mode
-                    )
-                elif media_type == 'document':
-                     message = await bot.send_document(
-                        chat_id=chat_id,
-                        document=media_data,
-                        caption=send_caption,
-                        parse_mode=parse_mode
-                    )
-                elif media_type == 'audio':
-                     message = await bot.send_audio(
-                        chat_id=chat_id,
-                        audio=media_data,
-                        caption=send_caption,
-                        parse_mode=parse_mode
-                    )
-                elif media_type == 'animation':
-                     message = await bot.send_animation(
-                        chat_id=chat_id,
-                        animation=media_data,
-                        caption=send_caption,
-                        parse_mode=parse_mode
-                    )
+                if media_type in _SEND_DISPATCH:
+                    message = await _send_media(bot, chat_id, media_type, media_ref, send_caption, parse_mode, prepared.single_request)
                 else:
-                    logger.error(f"Unsupported media type '{media_type}' for single item in chat {chat_id}. Skipping media send.")
+                    logger.error("Unsupported media type '%s' for single item in chat %s. Skipping media send.", media_type, chat_id)
                     # If media sending failed due to unsupported type, but text was sent, return the text message(s).
                     return sent_messages if sent_messages else None # Indicate media failure
 
 
                 if message:
                     sent_messages.append(message)
-                    logger.info(f"Single media item ({media_type}) sent to chat {chat_id}, message_id: {message.message_id}")
+                    logger.info("Single media item (%s) sent to chat %s, message_id: %s", media_type, chat_id, message.message_id)
 
             except TelegramAPIError as e:
-                 logger.error(f"Failed to send single media item of type {media_type} to chat {chat_id}: {e}", exc_info=True)
+                 logger.error("Failed to send single media item of type %s to chat %s: %s: %s", media_type, chat_id, type(e).__name__, e)
                  # If media failed, but text was sent separately, return the text messages.
                  # If text was not sent separately, try to send it now as a fallback.
                  if text and not main_text_sent_separately:
-                      logger.warning(f"Single media failed, attempting text fallback to chat {chat_id}")
+                      logger.warning("Single media failed, attempting text fallback to chat %s", chat_id)
                       try:
-                          text_message = await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                          text_message = await _send(bot.send_message, chat_id=chat_id, text=text, parse_mode=parse_mode)
                           sent_messages.append(text_message)
                       except TelegramAPIError as text_e:
-                          logger.error(f"Failed text fallback to chat {chat_id} after media failure: {text_e}", exc_info=True)
+                          logger.error("Failed text fallback to chat %s after media failure: %s: %s", chat_id, type(text_e).__name__, text_e)
                  # Return whatever was successfully sent (text messages) or None if nothing was sent at all
                  return sent_messages if sent_messages else None
 
 
-        else: # len(media_files) > 1
-            # Attempt to send a media group
-            input_media_items: List[Union[InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAudio, InputMediaAnimation]] = []
-            can_form_media_group = True
-            send_full_text_separately_flag = False # Flag to indicate if full text must be sent separately
-
-            # Determine caption for the first item in the group
-            group_caption_for_first_item = ""
-            if text:
-                 group_caption_for_first_item += text
-                 # No separator needed if individual_caption for the first item is appended below
-
-            for i, media_item in enumerate(media_files):
-                media_type = media_item.get('type')
-                media_data = media_item.get('media') # This should be InputFile, bytes, or file_id
-                individual_caption = media_item.get('caption', '') # Individual caption from content_manager
-
-                if media_data is None:
-                    logger.warning(f"Skipping media item {i} due to missing data in chat {chat_id}. Cannot form media group.")
-                    can_form_media_group = False # Cannot form group with missing data
-                    # No break here, continue checking other items for errors, but the flag is set
-                    continue
-
-                # Only the first item can have a caption for the group
-                item_caption_for_group = None
-                if i == 0:
-                     # For the first item, use the combined post text + its individual caption if they fit
-                     first_item_full_caption_candidate = group_caption_for_first_item
-                     if individual_caption:
-                         first_item_full_caption_candidate += "\n\n" + individual_caption if first_item_full_caption_candidate else individual_caption
-
-                     # Media group caption limit is same as photo/video limit (1024)
-                     caption_limit_group = MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP
-
-                     if first_item_full_caption_candidate and len(first_item_full_caption_candidate) <= caption_limit_group:
-                          item_caption_for_group = first_item_full_caption_candidate
-                     elif text:
-                          # If the combined caption is too long for the group, the full post text will be sent separately.
-                          send_full_text_separately_flag = True # Mark that text will be separate
-                          # The first media item's caption in the group should then only be its individual caption if it fits
-                          if individual_caption and len(individual_caption) <= caption_limit_group:
-                               item_caption_for_group = individual_caption
-                          # Otherwise, send with no caption
-                     # else: If text is empty and individual caption is too long, send with no caption.
-                else:
-                    # Subsequent items in a media group can have individual captions, but limited to 1024 chars.
-                    # However, Telegram API generally only displays the caption of the *first* item.
-                    # Aiogram's InputMedia objects have a caption parameter, but Telegram ignores it for subsequent items in the group.
-                    # So, we technically *can* pass captions for subsequent items, but they won't be shown.
-                    # Let's pass individual captions anyway, in case Telegram API changes or for different client behaviors, but be aware they won't appear.
-                    # The limit is still 1024 for captions *within* a media group.
-                    caption_limit_group_item = MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP # Apply the same limit as the group caption
-                    if individual_caption and len(individual_caption) <= caption_limit_group_item:
-                         item_caption_for_group = individual_caption
-                    else:
-                         item_caption_for_group = None # Individual caption too long or empty
-
-
-                # Create InputMedia object
-                try:
-                    input_media_obj = None
-                    # Need to use FSInputFile for local paths, file_id string directly for Telegram file_ids
-                    media_source = FSInputFile(media_data) if isinstance(media_data, str) and os.path.exists(media_data) else media_data
-
-                    if media_type == 'photo':
-                        input_media_obj = InputMediaPhoto(media=media_source, caption=item_caption_for_group, parse_mode=parse_mode)
-                    elif media_type == 'video':
-                         input_media_obj = InputMediaVideo(media=media_source, caption=item_caption_for_group, parse_mode=parse_mode)
-                    elif media_type == 'document':
-                         # Documents can be in media groups. Caption limit is 1024 in group.
-                         input_media_obj = InputMediaDocument(media=media_source, caption=item_caption_for_group, parse_mode=parse_mode)
-                    # Audio and Animation generally cannot be mixed with photo/video/document in a single group.
-                    # They can form media groups *with themselves*, but not with photo/video/doc.
-                    elif media_type in ['audio', 'animation']:
-                         # If *any* audio/animation is present, the whole group cannot be sent mixed.
-                         # This logic is simplified; a more robust approach would try to form multiple groups or send individually.
-                         # For simplicity, we mark as cannot form group if mixed types are attempted.
-                         logger.warning(f"Media type '{media_type}' at index {i} is usually not supported in media groups with other types. Cannot form media group.")
-                         can_form_media_group = False
-                         # No break here, just mark that group is not possible and fall through to individual send later
-                    else:
-                         logger.warning(f"Unsupported media type '{media_type}' at index {i}. Cannot form media group.")
-                         can_form_media_group = False
-                         # No break
-
-                    if input_media_obj:
-                        input_media_items.append(input_media_obj)
-
-                except Exception as e: # Catch exceptions during InputMedia object creation (e.g., invalid data format)
-                    logger.warning(f"Failed to create InputMedia object for item {i} of type {media_type} in chat {chat_id}: {e}")
-                    can_form_media_group = False # Cannot form group if any item creation fails
-
+        else: # prepared.kind == 'multi'
+            input_media_items = prepared.input_media_items
+            can_form_media_group = prepared.can_form_media_group
+            send_full_text_separately_flag = prepared.send_full_text_separately
 
             if can_form_media_group and input_media_items:
                  # Attempt to send as a media group
-                 logger.info(f"Attempting to send media group ({len(input_media_items)} items) to chat {chat_id}")
+                 logger.info("Attempting to send media group (%s items) to chat %s", len(input_media_items), chat_id)
                  try:
                     # Send full text separately BEFORE the media group if needed
                     # This happens if the combined caption was too long for the first item
+                    # (sequential, like in the single media branch: sends to one chat can't overlap)
                     if send_full_text_separately_flag and text and not main_text_sent_separately:
                         try:
-                            text_message = await bot.send_message(
+                            text_message = await _send(bot.send_message,
                                 chat_id=chat_id,
                                 text=text, # Send full original text
                                 parse_mode=parse_mode
                             )
                             sent_messages.append(text_message)
                             main_text_sent_separately = True
-                            logger.debug(f"Sent separate text message BEFORE media group to chat {chat_id}, message_id: {text_message.message_id}")
+                            logger.debug("Sent separate text message BEFORE media group to chat %s, message_id: %s", chat_id, text_message.message_id)
                         except TelegramAPIError as text_e:
-                            logger.error(f"Failed to send separate text message BEFORE media group to chat {chat_id}: {text_e}", exc_info=True)
+                            logger.error("Failed to send separate text message BEFORE media group to chat %s: %s: %s", chat_id, type(text_e).__name__, text_e)
                             # Decide whether to proceed with media group sending. Yes, proceed.
 
 
-                    messages = await bot.send_media_group(chat_id=chat_id, media=input_media_items)
+                    messages = await _send_media_group(bot, chat_id, prepared.media_group_request, prepared.input_media_refs)
                     sent_messages.extend(messages)
-                    logger.info(f"Media group sent to chat {chat_id}. Message IDs: {[m.message_id for m in messages]}")
+                    logger.info("Media group sent to chat %s. Message IDs: %s", chat_id, [m.message_id for m in messages])
 
                  except TelegramBadRequest as e:
                       # This often happens if the media group is invalid (e.g., unsupported mix of types by Telegram)
-                      logger.warning(f"Failed to send media group to chat {chat_id} due to BadRequest: {e}. Attempting to send items individually.", exc_info=True)
+                      logger.warning("Failed to send media group to chat %s due to BadRequest: %s: %s. Attempting to send items individually.", chat_id, type(e).__name__, e)
                       can_form_media_group = False # Group sending failed, fall through to individual send logic
                       # If text was marked for separate send but sending media group failed, ensure text is sent now
                       if send_full_text_separately_flag and text and not main_text_sent_separately:
-                           logger.warning(f"Media group failed, attempting text fallback BEFORE individual media items to chat {chat_id}")
+                           logger.warning("Media group failed, attempting text fallback BEFORE individual media items to chat %s", chat_id)
                            try:
-                               text_message = await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                               text_message = await _send(bot.send_message, chat_id=chat_id, text=text, parse_mode=parse_mode)
                                sent_messages.append(text_message)
                                main_text_sent_separately = True
                            except TelegramAPIError as text_e:
-                                logger.error(f"Failed text fallback after media group BadRequest to chat {chat_id}: {text_e}", exc_info=True)
+                                logger.error("Failed text fallback after media group BadRequest to chat %s: %s: %s", chat_id, type(text_e).__name__, text_e)
 
                  except TelegramAPIError as e:
-                      logger.error(f"Failed to send media group to chat {chat_id}: {e}", exc_info=True)
+                      logger.error("Failed to send media group to chat %s: %s: %s", chat_id, type(e).__name__, e)
                       # In case of other API errors during group send, attempt text fallback if needed
                       if text and not main_text_sent_separately:
-                           logger.warning(f"Media group failed, attempting text fallback to chat {chat_id}")
+                           logger.warning("Media group failed, attempting text fallback to chat %s", chat_id)
                            try:
-                                text_message = await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                                text_message = await _send(bot.send_message, chat_id=chat_id, text=text, parse_mode=parse_mode)
                                 sent_messages.append(text_message)
                                 main_text_sent_separately = True
                            except TelegramAPIError as text_e:
-                                logger.error(f"Failed text fallback to chat {chat_id} after media group failure: {text_e}", exc_info=True)
+                                logger.error("Failed text fallback to chat %s after media group failure: %s: %s", chat_id, type(text_e).__name__, text_e)
                       # Return whatever was successfully sent (text or nothing) or None if nothing was attempted/sent
                       return sent_messages if sent_messages else None
 
@@ -364,102 +880,59 @@ async def send_post(
                  # This block is only reached if can_form_media_group is False or input_media_items was empty initially.
                  # If input_media_items was empty, we would have returned earlier (no media).
                  # So this means can_form_media_group is False (due to type mix, missing data, or group API failure).
-                 logger.info(f"Cannot send as media group or group sending failed. Sending {len(media_files)} media items individually to chat {chat_id}.")
+                 logger.info("Cannot send as media group or group sending failed. Sending %s media items individually to chat %s.", len(prepared.individual_items), chat_id)
 
                  # First send the main post text if it exists and hasn't been sent separately yet
                  # This covers cases where group failed or text was too long for group caption
                  if text and not main_text_sent_separately:
                      try:
-                         text_message = await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                         text_message = await _send(bot.send_message, chat_id=chat_id, text=text, parse_mode=parse_mode)
                          sent_messages.append(text_message)
                          main_text_sent_separately = True
-                         logger.debug(f"Sent separate text message before individual media items to chat {chat_id}, message_id: {text_message.message_id}")
+                         logger.debug("Sent separate text message before individual media items to chat %s, message_id: %s", chat_id, text_message.message_id)
                      except TelegramAPIError as e:
-                         logger.error(f"Failed to send text before individual media items to chat {chat_id}: {e}", exc_info=True)
+                         logger.error("Failed to send text before individual media items to chat %s: %s: %s", chat_id, type(e).__name__, e)
                          # Proceed with sending media even if text failed
 
                  # Send each media item individually
-                 for i, media_item in enumerate(media_files):
-                    media_type = media_item.get('type')
-                    media_data = media_item.get('media') # This should be InputFile, bytes, or file_id
-                    individual_caption = media_item.get('caption', '') # Individual caption from content_manager
-
-                    if media_data is None:
-                        logger.warning(f"Skipping individual media item {i} due to missing data in chat {chat_id}")
-                        continue
-
-                    # When sending individually, the main post text is NOT automatically the caption.
-                    # Use only the individual caption for the media item if it exists and fits its type's limit.
-                    # Apply specific caption limits for individual items.
-                    caption_limit_individual = MAX_CAPTION_LENGTH_DOCUMENT if media_type == 'document' else MAX_CAPTION_LENGTH_PHOTO_VIDEO_GROUP # 1024 for photo/video/animation/audio
-
-                    send_caption = individual_caption if individual_caption and len(individual_caption) <= caption_limit_individual else None
-
-
+                 for i, media_type, media_ref, send_caption in prepared.individual_items:
                     try:
-                        message = None
-                        # Need to use FSInputFile for local paths, file_id string directly for Telegram file_ids
-                        media_source = FSInputFile(media_data) if isinstance(media_data, str) and os.path.exists(media_data) else media_data
-
-                        if media_type == 'photo':
-                            message = await bot.send_photo(
-                                chat_id=chat_id,
-                                photo=media_source,
-                                caption=send_caption,
-                                parse_mode=parse_mode
-                            )
-                        elif media_type == 'video':
-                            message = await bot.send_video(
-                                chat_id=chat_id,
-                                video=media_source,
-                                caption=send_caption,
-                                parse_mode=parse_mode
-                            )
-                        elif media_type == 'document':
-                             message = await bot.send_document(
-                                chat_id=chat_id,
-                                document=media_source,
-                                caption=send_caption,
-                                parse_mode=parse_mode
-                            )
-                        elif media_type == 'audio':
-                             message = await bot.send_audio(
-                                chat_id=chat_id,
-                                audio=media_source,
-                                caption=send_caption,
-                                parse_mode=parse_mode
-                            )
-                        elif media_type == 'animation':
-                             message = await bot.send_animation(
-                                chat_id=chat_id,
-                                animation=media_source,
-                                caption=send_caption,
-                                parse_mode=parse_mode
-                            )
+                        if media_type in _SEND_DISPATCH:
+                            message = await _send_media(bot, chat_id, media_type, media_ref, send_caption, parse_mode)
                         else:
-                            logger.warning(f"Unsupported media type '{media_type}' for individual sending at index {i} in chat {chat_id}. Skipping.")
+                            logger.warning("Unsupported media type '%s' for individual sending at index %s in chat %s. Skipping.", media_type, i, chat_id)
                             continue # Skip unsupported file type
 
                         if message:
                             sent_messages.append(message)
-                            logger.info(f"Sent individual media item {i+1} ({media_type}) to chat {chat_id}, message_id: {message.message_id}")
+                            logger.info("Sent individual media item %s (%s) to chat %s, message_id: %s", i+1, media_type, chat_id, message.message_id)
 
                     except TelegramAPIError as e:
-                        logger.error(f"Failed to send individual media item {i+1} of type {media_type} to chat {chat_id}: {e}", exc_info=True)
+                        logger.error("Failed to send individual media item %s of type %s to chat %s: %s: %s", i+1, media_type, chat_id, type(e).__name__, e)
                         # Continue attempting to send other media items even if one fails
 
 
     except TelegramAPIError as e:
-        logger.critical(f"A critical Telegram API error occurred during send_post to chat {chat_id}: {e}", exc_info=True)
+        # Expected API errors (blocked bot, flood, ...): the traceback adds nothing, format it only when debugging
+        logger.critical("A critical Telegram API error occurred during send_post to chat %s: %s: %s", chat_id, type(e).__name__, e,
+                        exc_info=logger.isEnabledFor(logging.DEBUG))
         return None # Indicate critical failure for this chat_id
     except Exception as e:
-        logger.critical(f"An unexpected critical error occurred during send_post to chat {chat_id}: {e}", exc_info=True)
+        logger.critical("An unexpected critical error occurred during send_post to chat %s: %s", chat_id, e, exc_info=True)
         return None # Indicate critical failure for this chat_id
 
     # Return the list of successfully sent messages
     return sent_messages if sent_messages else None # Return None if nothing was sent at all
 
 
+# Известные отказы deleteMessage (TelegramBadRequest, по описанию ошибки) -> (уровень лога, результат delete_message, пояснение).
+# "Not found" считается успехом: сообщения уже нет. Остальные ошибки API - False с уровнем ERROR.
+_DELETE_RESULTS: dict[str, tuple[int, bool, str]] = {
+    "message to delete not found": (logging.WARNING, True, "it was not found or already deleted"),
+    "message can't be deleted": (logging.WARNING, False, "the bot does not have permissions or it's a service message"),
+}
+
+
 async def delete_message(
     bot: Bot,
     chat_id: Union[int, str],
@@ -477,29 +950,121 @@ async def delete_message(
         # Aiogram's delete_message returns True on success.
         # It raises exceptions for MessageToDeleteNotFound and MessageCantBeDeleted.
         # We wrap it to handle these exceptions and return True/False accordingly.
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Message {message_id} successfully deleted in chat {chat_id}.")
+        await _call(bot.delete_message, chat_id=chat_id, message_id=message_id)
+        logger.info("Message %s successfully deleted in chat %s.", message_id, chat_id)
         return True # Successfully deleted
 
-    except MessageToDeleteNotFound:
-        logger.warning(f"Attempted to delete message {message_id} in chat {chat_id}, but it was not found or already deleted.")
-        return True # Consider it a success if the desired state (message gone) is achieved
-
-    except MessageCantBeDeleted:
-        logger.warning(f"Attempted to delete message {message_id} in chat {chat_id}, but the bot does not have permissions or it's a service message.")
-        # This indicates a permission issue or message type that cannot be deleted by the bot
-        return False # Indicate failure due to permissions/type
-
     except TelegramAPIError as e:
-        # Catch other API errors
-        logger.error(f"Failed to delete message {message_id} in chat {chat_id} due to API error: {e}", exc_info=True)
+        if isinstance(e, TelegramBadRequest):
+            description = e.message.lower()
+            for marker, (level, result, explanation) in _DELETE_RESULTS.items():
+                if marker in description:
+                    logger.log(level, "Attempted to delete message %s in chat %s, but %s.", message_id, chat_id, explanation)
+                    return result
+        logger.error("Failed to delete message %s in chat %s due to API error: %s: %s", message_id, chat_id, type(e).__name__, e)
         return False # Indicate other API error
 
     except Exception as e:
-        logger.error(f"An unexpected error occurred while deleting message {message_id} in chat {chat_id}: {e}", exc_info=True)
+        logger.error("An unexpected error occurred while deleting message %s in chat %s: %s", message_id, chat_id, e, exc_info=True)
         return False
 
 
+DELETE_MESSAGES_BATCH_SIZE = 100 # Bot API deleteMessages accepts up to 100 message IDs per call
+
+
+async def delete_messages(
+    bot: Bot,
+    chat_id: Union[int, str],
+    message_ids: List[int]
+) -> dict[int, bool]:
+    """
+    Удаляет несколько сообщений в чате пачками по DELETE_MESSAGES_BATCH_SIZE (один запрос deleteMessages на пачку).
+    Если Telegram отклоняет пачку (например, среди сообщений есть те, которые уже нельзя удалить),
+    сообщения этой пачки удаляются по одному через delete_message.
+
+    :param bot: Экземпляр aiogram.Bot.
+    :param chat_id: ID целевого чата.
+    :param message_ids: ID сообщений для удаления.
+    :return: message_id -> результат, как у delete_message (True - сообщение удалено или уже отсутствует).
+    """
+    results: dict[int, bool] = {}
+    unique_ids = list(dict.fromkeys(message_ids))
+    for batch_start in range(0, len(unique_ids), DELETE_MESSAGES_BATCH_SIZE):
+        batch = unique_ids[batch_start:batch_start + DELETE_MESSAGES_BATCH_SIZE]
+        if len(batch) == 1:
+            results[batch[0]] = await delete_message(bot, chat_id, batch[0])
+            continue
+        try:
+            # deleteMessages skips messages that are already gone, so success covers the whole batch
+            await _call(bot.delete_messages, chat_id=chat_id, message_ids=batch)
+            results.update(dict.fromkeys(batch, True))
+            logger.info("Messages %s successfully deleted in chat %s.", batch, chat_id)
+        except TelegramBadRequest as e:
+            logger.warning("Batch deletion of %s messages in chat %s failed (%s), deleting them one by one.", len(batch), chat_id, e.message)
+            for message_id in batch:
+                results[message_id] = await delete_message(bot, chat_id, message_id)
+        except TelegramAPIError as e:
+            logger.error("Failed to delete messages %s in chat %s due to API error: %s: %s", batch, chat_id, type(e).__name__, e)
+            results.update(dict.fromkeys(batch, False))
+        except Exception as e:
+            logger.error("An unexpected error occurred while deleting messages %s in chat %s: %s", batch, chat_id, e, exc_info=True)
+            results.update(dict.fromkeys(batch, False))
+    return results
+
+
+# Кэш getChatMember / getChatAdministrators: статусы администраторов меняются редко, а проверки прав идут
+# на каждое нажатие кнопки. Кэшируются только успешные ответы: после ошибки или "не найден" следующий вызов
+# снова спрашивает Telegram.
+CHAT_MEMBER_CACHE_TTL_SECONDS = 30.0
+_CHAT_MEMBER_CACHE_PRUNE_SIZE = 1024 # Prune expired entries (and idle locks) once there are more than this
+
+
+class _AsyncTTLCache:
+    """
+    In-memory cache of coroutine results with a TTL (by time.monotonic()). Concurrent lookups of one missing key
+    wait on a per-key lock for a single fetch instead of each sending its own request. None results are not cached.
+    """
+    __slots__ = ('ttl', '_entries', '_locks')
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[Any, tuple[Any, float]] = {}
+        self._locks: dict[Any, asyncio.Lock] = {}
+
+    def _get(self, key: Any) -> Any:
+        cached = self._entries.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    async def get_or_fetch(self, key: Any, fetch) -> Any:
+        value = self._get(key)
+        if value is not None:
+            return value
+        lock = self._locks.get(key)
+        if lock is None:
+            if len(self._locks) > _CHAT_MEMBER_CACHE_PRUNE_SIZE:
+                for idle_key in [k for k, l in self._locks.items() if not l.locked()]:
+                    del self._locks[idle_key]
+            lock = self._locks[key] = asyncio.Lock()
+        async with lock:
+            value = self._get(key) # Fetched by a concurrent call while this one waited
+            if value is not None:
+                return value
+            value = await fetch()
+            if value is not None:
+                now = time.monotonic()
+                if len(self._entries) > _CHAT_MEMBER_CACHE_PRUNE_SIZE:
+                    for expired_key in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+                        del self._entries[expired_key]
+                self._entries[key] = (value, now + self.ttl)
+            return value
+
+
+_chat_member_cache = _AsyncTTLCache(CHAT_MEMBER_CACHE_TTL_SECONDS) # (chat_id, user_id) -> ChatMember
+_chat_admins_cache = _AsyncTTLCache(CHAT_MEMBER_CACHE_TTL_SECONDS) # chat_id -> list of administrators
+
+
 async def get_chat_member_status(
     bot: Bot,
     chat_id: Union[int, str],
@@ -507,27 +1072,62 @@ async def get_chat_member_status(
 ) -> Optional[ChatMember]:
     """
     Получает информацию о статусе пользователя в чате.
+    Успешные ответы кэшируются на CHAT_MEMBER_CACHE_TTL_SECONDS.
 
     :param bot: Экземпляр aiogram.Bot.
     :param chat_id: ID целевого чата.
     :param user_id: ID пользователя.
     :return: Объект ChatMember или None при ошибке/пользователь не найден в чате.
     """
+    return await _chat_member_cache.get_or_fetch((chat_id, user_id), lambda: _fetch_chat_member(bot, chat_id, user_id))
+
+
+async def get_chat_administrators(bot: Bot, chat_id: Union[int, str]) -> Optional[List[ChatMember]]:
+    """
+    Получает список администраторов чата одним запросом (кэшируется на CHAT_MEMBER_CACHE_TTL_SECONDS).
+
+    :param bot: Экземпляр aiogram.Bot.
+    :param chat_id: ID чата.
+    :return: Список ChatMember администраторов (включая создателя) или None при ошибке.
+    """
+    async def fetch() -> Optional[List[ChatMember]]:
+        try:
+            return await _call(bot.get_chat_administrators, chat_id=chat_id)
+        except TelegramAPIError as e:
+            logger.info("Failed to get administrators of chat %s: %s: %s", chat_id, type(e).__name__, e)
+            return None
+    return await _chat_admins_cache.get_or_fetch(chat_id, fetch)
+
+
+async def _fetch_chat_member(bot: Bot, chat_id: Union[int, str], user_id: int) -> Optional[ChatMember]:
+    """getChatMember without the cache; errors are logged and return None (see get_chat_member_status)."""
     try:
-        member = await bot.get_chat_member(chat_id=chat_id, user_id=user_id)
-        # logger.debug(f"Got chat member status for user {user_id} in chat {chat_id}: {member.status}")
+        member = await _call(bot.get_chat_member, chat_id=chat_id, user_id=user_id)
+        # logger.debug("Got chat member status for user %s in chat %s: %s", user_id, chat_id, member.status)
         return member
-    except UserNotFoundError:
-        logger.info(f"User {user_id} not found in chat {chat_id}.")
+    except TelegramBadRequest as e:
+        if "user not found" in e.message.lower() or "participant_id_invalid" in e.message.lower():
+            logger.info("User %s not found in chat %s.", user_id, chat_id)
+            return None
+        logger.error("Failed to get chat member status for user %s in chat %s: %s: %s", user_id, chat_id, type(e).__name__, e)
         return None
     except TelegramAPIError as e:
-        logger.error(f"Failed to get chat member status for user {user_id} in chat {chat_id}: {e}", exc_info=True)
+        logger.error("Failed to get chat member status for user %s in chat %s: %s: %s", user_id, chat_id, type(e).__name__, e)
         return None
     except Exception as e:
-        logger.error(f"An unexpected error occurred while getting chat member status for user {user_id} in chat {chat_id}: {e}", exc_info=True)
+        logger.error("An unexpected error occurred while getting chat member status for user %s in chat %s: %s", user_id, chat_id, e, exc_info=True)
         return None
 
 
+def _bot_admin_status(member: Optional[ChatMember]) -> Tuple[bool, bool]:
+    """(является ли администратором, имеет ли право публиковать сообщения) по ChatMember бота."""
+    # Check if member exists and status is administrator
+    if member and member.status == 'administrator':
+        # Check specific permission for posting messages
+        return True, getattr(member, 'can_post_messages', False)
+    return False, False
+
+
 async def is_bot_admin_in_channel(
     bot: Bot,
     chat_id: Union[int, str]
@@ -540,23 +1140,14 @@ async def is_bot_admin_in_channel(
     :return: Кортеж (является ли администратором, имеет ли право публиковать сообщения).
     """
     try:
-        # Get bot's own ID first
-        me = await bot.get_me()
-        bot_id = me.id
-        # Then get the bot's member status in the chat
-        member = await get_chat_member_status(bot, chat_id, bot_id)
-
-        # Check if member exists and status is administrator
-        if member and member.status == 'administrator':
-            # Check specific permission for posting messages
-            can_post = member.can_post_messages if hasattr(member, 'can_post_messages') else False
-            logger.debug(f"Bot is admin in chat {chat_id}, can_post_messages: {can_post}")
-            return True, can_post
-        else:
-            logger.debug(f"Bot is not an administrator in chat {chat_id}.")
-            return False, False
+        # Bot's own ID is the numeric part of its token (Bot.id): no getMe round trip per check
+        member = await get_chat_member_status(bot, chat_id, bot.id)
+
+        is_admin, can_post = _bot_admin_status(member)
+        logger.debug("Bot admin status in chat %s: is_admin %s, can_post_messages: %s", chat_id, is_admin, can_post)
+        return is_admin, can_post
     except Exception as e:
-        logger.error(f"An error occurred while checking bot admin status in chat {chat_id}: {e}", exc_info=True)
+        logger.error("An error occurred while checking bot admin status in chat %s: %s", chat_id, e, exc_info=True)
         # In case of any error (e.g., chat_id is not a channel/group, bot is not in chat), return False
         return False, False
 
@@ -580,28 +1171,44 @@ async def check_user_channel_permissions(
     bot_can_post_messages = False
 
     try:
-        # Check user status
-        user_member = await get_chat_member_status(bot, chat_id, user_id)
+        # One getChatAdministrators answers for both the user and the bot (the list is cached, see get_chat_administrators)
+        admins = await get_chat_administrators(bot, chat_id)
+        if admins is not None:
+            admins_by_id = {admin.user.id: admin for admin in admins}
+            user_member = admins_by_id.get(user_id) # Not in the list: not an administrator
+            bot_status = _bot_admin_status(admins_by_id.get(bot.id))
+        else:
+            # Administrators are not available (e.g. the bot is not in the chat): check both members.
+            # User and bot status are independent requests: run them concurrently
+            user_member, bot_status = await asyncio.gather(
+                get_chat_member_status(bot, chat_id, user_id),
+                is_bot_admin_in_channel(bot, chat_id),
+                return_exceptions=True
+            )
+        if isinstance(user_member, BaseException):
+            logger.error("Failed to check status of user %s in chat %s: %s: %s", user_id, chat_id, type(user_member).__name__, user_member)
+            user_member = None # No permissions
+        if isinstance(bot_status, BaseException):
+            logger.error("Failed to check bot admin status in chat %s: %s: %s", chat_id, type(bot_status).__name__, bot_status)
+            bot_status = (False, False)
+        bot_is_admin, bot_can_post_messages = bot_status
+
         # User is considered admin with post rights if status is 'administrator' or 'creator' AND they have can_post_messages permission
         if user_member and user_member.status in ['administrator', 'creator']:
              # Check if the user admin specifically has post messages permission
              # For creator this is usually true, for admin it might be explicit
              # Default to True if attribute missing, assuming older API or chat type where all admins can post
-             user_has_post_perm = user_member.can_post_messages if hasattr(user_member, 'can_post_messages') else True # Assume creator/full admin can post if field missing
+             user_has_post_perm = getattr(user_member, 'can_post_messages', True) # Assume creator/full admin can post if field missing
              if user_has_post_perm:
                  user_is_admin_with_post_rights = True
-                 logger.debug(f"User {user_id} is admin with post rights in chat {chat_id}.")
+                 logger.debug("User %s is admin with post rights in chat %s.", user_id, chat_id)
              else:
-                 logger.debug(f"User {user_id} is admin but NO post rights in chat {chat_id}.")
+                 logger.debug("User %s is admin but NO post rights in chat %s.", user_id, chat_id)
         else:
-            logger.debug(f"User {user_id} is not an administrator or creator in chat {chat_id}.")
-
-
-        # Check bot status
-        bot_is_admin, bot_can_post_messages = await is_bot_admin_in_channel(bot, chat_id)
+            logger.debug("User %s is not an administrator or creator in chat %s.", user_id, chat_id)
 
     except Exception as e:
-        logger.error(f"An unexpected error occurred while checking user/bot permissions in chat {chat_id} for user {user_id}: {e}", exc_info=True)
+        logger.error("An unexpected error occurred while checking user/bot permissions in chat %s for user %s: %s", chat_id, user_id, e, exc_info=True)
         # In case of any error, assume no sufficient permissions
         return False, False, False
 
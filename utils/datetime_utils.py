@@ -1,26 +1,54 @@
 # utils/datetime_utils.py
 
 import pytz
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Optional
 
 # Note: The list of timezones is extensive. Using pytz.all_timezones is sufficient.
 # A limited list could be used for a more user-friendly selection interface if needed.
 
-def _ensure_utc_aware(dt: Optional[datetime]) -> Optional[datetime]:
+# stdlib UTC: replace()/astimezone() with it need no pytz localize, and asyncpg returns datetimes with this very tzinfo
+_UTC = timezone.utc
+_ZERO = timedelta(0)
+
+
+def get_timezone(tz_str: str) -> Optional[pytz.BaseTzInfo]:
+    """
+    Cached pytz.timezone(): one dict lookup per call instead of pytz's name normalization.
+    Returns None for an unknown timezone name (or a non-string) instead of raising pytz.UnknownTimeZoneError.
+    """
+    if not isinstance(tz_str, str):
+        return None
+    return _lookup_timezone(tz_str)
+
+
+@lru_cache(maxsize=512)
+def _lookup_timezone(tz_str: str) -> Optional[pytz.BaseTzInfo]:
+    try:
+        return pytz.timezone(tz_str)
+    except pytz.UnknownTimeZoneError:
+        return None # Cached too: repeated lookups of a bad stored timezone cost nothing
+
+
+def to_utc_aware(dt: Optional[datetime]) -> Optional[datetime]:
     """
     Ensures a datetime object is timezone-aware UTC.
     Assumes naive datetime is UTC if no timezone is provided.
     Returns None if input is None.
+    Used for validating datetimes once at the boundary of the scheduling API.
     """
     if dt is None:
         return None
-    if dt.tzinfo is None:
-        # Assume naive datetime is UTC
-        return pytz.utc.localize(dt)
-    else:
-        # Convert to UTC if already timezone-aware
-        return dt.astimezone(pytz.utc)
+    tz = dt.tzinfo
+    if tz is None:
+        # Assume naive datetime is UTC (fixed offset: replace() is equivalent to localize())
+        return dt.replace(tzinfo=_UTC)
+    if tz is _UTC:
+        # Already UTC: no new datetime
+        return dt
+    # Convert to UTC if already timezone-aware
+    return dt.astimezone(_UTC)
 
 
 def format_datetime(dt_utc: datetime, user_tz_str: str) -> str:
@@ -35,20 +63,19 @@ def format_datetime(dt_utc: datetime, user_tz_str: str) -> str:
     Returns:
         str: Formatted datetime string (e.g., "01.01.2024 15:30"). Returns empty string on error.
     """
-    if dt_utc is None or dt_utc.tzinfo is None or dt_utc.tzinfo.utcoffset(dt_utc) != timedelta(0):
+    if dt_utc is None or dt_utc.tzinfo is None or (dt_utc.tzinfo is not _UTC and dt_utc.utcoffset() != _ZERO):
         # Input is not a timezone-aware UTC datetime
         # Try to convert it to UTC first, assuming naive is UTC
-        dt_utc = _ensure_utc_aware(dt_utc)
+        dt_utc = to_utc_aware(dt_utc)
         if dt_utc is None:
              return "" # Cannot format invalid input
 
+    user_tz = get_timezone(user_tz_str)
     try:
-        user_tz = pytz.timezone(user_tz_str)
-        dt_user_tz = dt_utc.astimezone(user_tz)
-        return dt_user_tz.strftime('%d.%m.%Y %H:%M')
-    except pytz.UnknownTimeZoneError:
-        # Fallback to UTC if user timezone is invalid
-        return dt_utc.strftime('%d.%m.%Y %H:%M (UTC)')
+        if user_tz is None:
+            # Fallback to UTC if user timezone is invalid
+            return dt_utc.strftime('%d.%m.%Y %H:%M (UTC)')
+        return dt_utc.astimezone(user_tz).strftime('%d.%m.%Y %H:%M')
     except Exception:
         # Catch any other formatting errors
         return ""
@@ -69,16 +96,17 @@ def convert_to_utc(naive_dt_user_tz: datetime, user_tz_str: str) -> Optional[dat
     if naive_dt_user_tz is None:
         return None
 
+    user_tz = get_timezone(user_tz_str)
+    if user_tz is None:
+        # Invalid user timezone
+        return None
+
     try:
-        user_tz = pytz.timezone(user_tz_str)
         # Localize the naive datetime with the user's timezone
         localized_dt = user_tz.localize(naive_dt_user_tz)
         # Convert the localized datetime to UTC
-        utc_dt = localized_dt.astimezone(pytz.utc)
+        utc_dt = localized_dt.astimezone(_UTC)
         return utc_dt
-    except pytz.UnknownTimeZoneError:
-        # Invalid user timezone
-        return None
     except Exception:
          # Catch any other errors during localization or conversion
         return None
@@ -96,19 +124,20 @@ def convert_from_utc(dt_utc: datetime, target_tz_str: str) -> Optional[datetime]
     Returns:
         Optional[datetime]: Timezone-aware datetime object in the target timezone, or None on error.
     """
-    if dt_utc is None or dt_utc.tzinfo is None or dt_utc.tzinfo.utcoffset(dt_utc) != timedelta(0):
+    if dt_utc is None or dt_utc.tzinfo is None or (dt_utc.tzinfo is not _UTC and dt_utc.utcoffset() != _ZERO):
          # Input is not a timezone-aware UTC datetime, try to convert first
-         dt_utc = _ensure_utc_aware(dt_utc)
+         dt_utc = to_utc_aware(dt_utc)
          if dt_utc is None:
               return None # Cannot process invalid input
 
+    target_tz = get_timezone(target_tz_str)
+    if target_tz is None:
+        # Invalid target timezone
+        return None
+
     try:
-        target_tz = pytz.timezone(target_tz_str)
         dt_target_tz = dt_utc.astimezone(target_tz)
         return dt_target_tz
-    except pytz.UnknownTimeZoneError:
-        # Invalid target timezone
-        return None
     except Exception:
          # Catch any other errors during conversion
          return None
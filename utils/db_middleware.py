@@ -0,0 +1,29 @@
+# utils/db_middleware.py
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+import services.db as db_service
+
+logger = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Wraps each update in db_service.session_scope(), so all CRUD calls made by a handler
+    share one pooled connection and one transaction (committed after the handler returns,
+    rolled back if it raises).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with db_service.session_scope() as session:
+            data["db_session"] = session # Available to handlers that want direct session access
+            return await handler(event, data)
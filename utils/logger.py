@@ -1,39 +1,49 @@
 import logging
 import sys
+from logging.handlers import RotatingFileHandler
 
 # Определение формата логирования
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+LOG_FILE = 'bot.log'
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024 # bot.log is rotated at this size
+LOG_FILE_BACKUP_COUNT = 5 # bot.log.1 ... bot.log.5
 
 # Получение корневого логгера
 # Можно использовать logging.getLogger(__name__) для логгера конкретного модуля,
 # но для централизованной настройки часто используют корневой логгер или логгер с определенным именем,
 # чтобы все модули могли его использовать.
-# Используем корневой логгер для простой настройки приложения
+# Используем корневой логгер для простой настройки приложения: модули пишут в logging.getLogger(__name__),
+# и именованный логгер (например, 'bot') не получил бы их сообщения
 logger = logging.getLogger() # Get the root logger
 
 # Установка общего уровня логирования для логгера
 # Сообщения ниже этого уровня будут игнорироваться логгером
 logger.setLevel(logging.INFO)
 
-# Создание обработчика для стандартного вывода (stdout)
-stream_handler = logging.StreamHandler(sys.stdout)
-# Установка уровня для обработчика (необходимо, даже если уровень логгера уже установлен)
-stream_handler.setLevel(logging.INFO)
-# Создание форматтера
+# Один форматтер на все обработчики
 formatter = logging.Formatter(LOG_FORMAT)
-# Установка форматтера для обработчика стандартного вывода
-stream_handler.setFormatter(formatter)
-
-# Создание обработчика для файла
-file_handler = logging.FileHandler('bot.log', encoding='utf-8') # Указываем кодировку для совместимости с русским языком
-# Установка уровня для обработчика
-file_handler.setLevel(logging.INFO)
-# Установка форматтера для файлового обработчика
-file_handler.setFormatter(formatter)
 
 # Добавление обработчиков к логгеру
 # Проверяем, чтобы обработчики не были добавлены повторно, если скрипт выполняется несколько раз (например, в Jupyter или при перезагрузке модуля)
 if not logger.handlers:
+    # Создание обработчика для стандартного вывода (stdout)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    # Установка уровня для обработчика (необходимо, даже если уровень логгера уже установлен)
+    stream_handler.setLevel(logging.INFO)
+    stream_handler.setFormatter(formatter)
+
+    # Создание обработчика для файла: размер ограничен ротацией, а delay=True откладывает открытие файла
+    # до первой записи (импорт модуля не держит открытый дескриптор)
+    file_handler = RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=LOG_FILE_MAX_BYTES,
+        backupCount=LOG_FILE_BACKUP_COUNT,
+        encoding='utf-8', # Указываем кодировку для совместимости с русским языком
+        delay=True
+    )
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+
     logger.addHandler(stream_handler)
     logger.addHandler(file_handler)
 
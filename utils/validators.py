@@ -8,22 +8,36 @@
 
 from datetime import datetime
 import pytz
+from pytz import utc as _UTC
 import re
 from typing import Optional, Dict, Any
+
+from utils.datetime_utils import get_timezone
 # Для Python < 3.9, импортировать Dict из typing
 # from typing import Dict
 
 # Ограничение на размер медиафайлов в байтах (20 МБ)
 MAX_MEDIA_SIZE_BYTES = 20 * 1024 * 1024
 
+# Все названия часовых поясов IANA: pytz.all_timezones_set - ленивый LazySet, каждая проверка идет через его обертку
+_ALL_TIMEZONES: frozenset[str] = frozenset(pytz.all_timezones) # Not frozenset(all_timezones_set): copying the LazySet yields an empty set
+
+# Привязаны один раз: validate_datetime вызывается на каждый ввод даты и обходится без поиска атрибутов
+_strptime = datetime.strptime
+_now = datetime.now
+
+# Базовая проверка URL (только схема http/https) и username Telegram: 5-32 латинских букв, цифр или '_'
+_URL_RE = re.compile(r'^https?://.+')
+_USERNAME_RE = re.compile(r'\A[a-zA-Z0-9_]{5,32}\Z')
+
 # Разрешенные MIME-типы для медиафайлов
-ALLOWED_MIME_TYPES = {
+ALLOWED_MIME_TYPES = frozenset({
     'image/jpeg',
     'image/png',
     'video/mp4',
     'image/gif',
     'application/pdf'
-}
+})
 
 def validate_datetime(text_datetime: str, user_tz_str: str) -> Optional[datetime]:
     """
@@ -40,38 +54,60 @@ def validate_datetime(text_datetime: str, user_tz_str: str) -> Optional[datetime
     """
     try:
         # Парсим строку в наивный объект datetime
-        naive_dt = datetime.strptime(text_datetime, '%d.%m.%Y %H:%M')
+        naive_dt = _strptime(text_datetime, '%d.%m.%Y %H:%M')
     except ValueError:
         # Ошибка парсинга формата
         return None
 
-    try:
-        # Получаем объект часового пояса пользователя
-        user_tz = pytz.timezone(user_tz_str)
-    except pytz.UnknownTimeZoneError:
-        # Некорректный часовой пояс пользователя
+    # Получаем объект часового пояса пользователя (None - некорректный часовой пояс)
+    user_tz = get_timezone(user_tz_str)
+    if user_tz is None:
         return None
 
-    # Локализуем наивный datetime с учетом часового пояса пользователя
-    localized_dt = user_tz.localize(naive_dt)
-
-    # Получаем текущее время в часовом поясе пользователя
-    now_in_user_tz = datetime.now(user_tz)
+    # Локализуем наивный datetime с учетом часового пояса пользователя и конвертируем в UTC
+    utc_dt = user_tz.localize(naive_dt).astimezone(_UTC)
 
-    # Проверяем, что указанная дата и время находятся в будущем
-    if localized_dt <= now_in_user_tz:
+    # Проверяем, что указанная дата и время находятся в будущем. Сравнение в UTC равносильно сравнению
+    # в часовом поясе пользователя, но текущее время не пересчитывается через правила перехода pytz
+    if utc_dt <= _now(_UTC):
         return None # Время не в будущем
 
-    # Конвертируем локализованное время в UTC
-    utc_dt = localized_dt.astimezone(pytz.utc)
-
     return utc_dt
 
+def _is_valid_time_format(time_str: Any) -> bool:
+    """
+    Базовая проверка формата времени HH:MM (опционально, APScheduler более гибок, но для формы ввода может быть полезно).
+    Принимает то же, что datetime.strptime(time_str, '%H:%M') (часы и минуты из 1-2 цифр), без разбора через strptime.
+    """
+    if not isinstance(time_str, str):
+        return False
+    hours, separator, minutes = time_str.partition(':')
+    if not separator or not (0 < len(hours) <= 2 and 0 < len(minutes) <= 2):
+        return False
+    digits = hours + minutes
+    if not (digits.isascii() and digits.isdigit()):
+        return False
+    return int(hours) < 24 and int(minutes) < 60
+
+# Обязательные поля параметров cron для каждого типа расписания: (поле, допустимые типы).
+# _TIME - поле времени в формате 'HH:MM' (см. _is_valid_time_format).
+_TIME = object()
+_CRON_SCHEMA: Dict[str, tuple[tuple[str, Any], ...]] = {
+    'daily': (('time', _TIME),),
+    # APScheduler принимает days_of_week как str (напр. 'mon,fri'), int (0-6) или list
+    'weekly': (('time', _TIME), ('days_of_week', (str, int, list))),
+    # day_of_month: str (напр. '1-5') или int (1-31)
+    'monthly': (('time', _TIME), ('day_of_month', (str, int))),
+    # month: str (напр. '1-3') или int (1-12); day: str (напр. '1-5') или int (1-31)
+    'yearly': (('time', _TIME), ('month', (str, int)), ('day', (str, int))),
+}
+
 def validate_cron_params(params: Dict[str, Any]) -> bool:
     """
     Проверяет словарь параметров для APScheduler cron-задач.
     Выполняет базовую проверку наличия и типа необходимых полей
-    для каждого типа расписания ('daily', 'weekly', 'monthly', 'yearly').
+    для каждого типа расписания ('daily', 'weekly', 'monthly', 'yearly'), см. _CRON_SCHEMA.
+    Диапазоны значений (day 1-31, month 1-12) не проверяются.
 
     Args:
         params (Dict[str, Any]): Словарь с параметрами cron.
@@ -79,69 +115,21 @@ def validate_cron_params(params: Dict[str, Any]) -> bool:
     Returns:
         bool: True, если параметры кажутся корректными для APScheduler, иначе False.
     """
-    if not isinstance(params, dict) or 'type' not in params:
-        return False # Параметры не словарь или отсутствует тип
-
-    schedule_type = params['type']
-
-    # Базовая проверка формата времени HH:MM (опционально, APScheduler более гибок, но для формы ввода может быть полезно)
-    def is_valid_time_format(time_str):
-        if not isinstance(time_str, str):
-            return False
-        try:
-            datetime.strptime(time_str, '%H:%M')
-            return True
-        except ValueError:
-            return False
-
-    # Проверка параметров в зависимости от типа расписания
-    if schedule_type == 'daily':
-        # Ожидаем поле 'time' в формате 'HH:MM'
-        if 'time' not in params or not is_valid_time_format(params['time']):
-            return False
-
-    elif schedule_type == 'weekly':
-        # Ожидаем поля 'time' и 'days_of_week'
-        if 'time' not in params or not is_valid_time_format(params['time']):
-            return False
-        if 'days_of_week' not in params or not isinstance(params['days_of_week'], (str, int, list)):
-             # APScheduler принимает str (напр. 'mon,fri'), int (0-6), или list
-             # Базовая проверка: просто убедимся, что поле присутствует и имеет ожидаемый тип (str/int/list)
-             return False
-
-    elif schedule_type == 'monthly':
-        # Ожидаем поля 'time' и 'day_of_month'
-        if 'time' not in params or not is_valid_time_format(params['time']):
-            return False
-        if 'day_of_month' not in params or not isinstance(params['day_of_month'], (str, int)):
-            # APScheduler принимает str (напр. '1-5') или int (1-31)
-            # Базовая проверка: просто убедимся, что поле присутствует и имеет ожидаемый тип (str/int)
-             return False
-        # Можно добавить проверку на диапазон 1-31, если day_of_month int/str число
-        # if isinstance(params['day_of_month'], int) and not (1 <= params['day_of_month'] <= 31):
-        #    return False
-        # if isinstance(params['day_of_month'], str) and not re.fullmatch(r'\d+', params['day_of_month']) and not re.fullmatch(r'\d+-\d+', params['day_of_month']):
-        #     return False
-
-
-    elif schedule_type == 'yearly':
-        # Ожидаем поля 'time', 'month' и 'day'
-        if 'time' not in params or not is_valid_time_format(params['time']):
+    if not isinstance(params, dict):
+        return False # Параметры не словарь
+
+    schedule_type = params.get('type')
+    fields = _CRON_SCHEMA.get(schedule_type) if isinstance(schedule_type, str) else None
+    if fields is None:
+        return False # Отсутствует или неизвестный тип расписания
+
+    for field, expected in fields:
+        value = params.get(field)
+        if expected is _TIME:
+            if not _is_valid_time_format(value):
+                return False
+        elif value is None or not isinstance(value, expected):
             return False
-        if 'month' not in params or not isinstance(params['month'], (str, int)):
-             # APScheduler принимает str (напр. '1-3') или int (1-12)
-             return False
-        if 'day' not in params or not isinstance(params['day'], (str, int)):
-            # APScheduler принимает str (напр. '1-5') или int (1-31)
-            return False
-        # Можно добавить проверку на диапазон month (1-12) и day (1-31)
-        # if isinstance(params['month'], int) and not (1 <= params['month'] <= 12): return False
-        # if isinstance(params['day'], int) and not (1 <= params['day'] <= 31): return False
-
-
-    else:
-        # Неизвестный тип расписания
-        return False
 
     # Если проверки для конкретного типа прошли, считаем параметры корректными
     return True
@@ -157,15 +145,9 @@ def validate_media_file(file_size: int, mime_type: Optional[str]) -> bool:
     Returns:
         bool: True, если файл допустим по размеру и типу, иначе False.
     """
-    # Проверка размера файла (должен быть больше 0 и не превышать MAX_MEDIA_SIZE_BYTES)
-    if not (0 < file_size <= MAX_MEDIA_SIZE_BYTES):
-        return False
-
-    # Проверка MIME-типа
-    if mime_type is None or mime_type not in ALLOWED_MIME_TYPES:
-        return False
-
-    return True
+    # Размер файла должен быть больше 0 и не превышать MAX_MEDIA_SIZE_BYTES,
+    # MIME-тип - из ALLOWED_MIME_TYPES (None в наборе нет)
+    return 0 < file_size <= MAX_MEDIA_SIZE_BYTES and mime_type in ALLOWED_MIME_TYPES
 
 def validate_url(url_text: str) -> bool:
     """
@@ -179,8 +161,7 @@ def validate_url(url_text: str) -> bool:
     """
     # Используем регулярное выражение для проверки начала строки
     # Это базовая проверка, не гарантирующая полную валидность URL
-    url_regex = re.compile(r'^https?://.+')
-    return bool(url_regex.match(url_text))
+    return bool(_URL_RE.match(url_text))
 
 def validate_username(username: str) -> bool:
     """
@@ -196,16 +177,9 @@ def validate_username(username: str) -> bool:
     if not isinstance(username, str) or not username:
         return False
 
-    # Удаляем необязательный символ '@' в начале
-    cleaned_username = username.lstrip('@')
-
-    # Проверяем длину (от 5 до 32 символов)
-    if not (5 <= len(cleaned_username) <= 32):
-        return False
-
-    # Проверяем допустимые символы: латинские буквы, цифры и подчеркивания
-    username_regex = re.compile(r'^[a-zA-Z0-9_]+$')
-    return bool(username_regex.fullmatch(cleaned_username))
+    # Удаляем необязательный символ '@' в начале и проверяем допустимые символы
+    # (латинские буквы, цифры и подчеркивания) и длину (от 5 до 32 символов) одним регулярным выражением
+    return bool(_USERNAME_RE.match(username.lstrip('@')))
 
 def validate_timezone(tz_str: str) -> bool:
     """
@@ -217,11 +191,8 @@ def validate_timezone(tz_str: str) -> bool:
     Returns:
         bool: True, если название часового пояса корректно, иначе False.
     """
-    if not isinstance(tz_str, str):
-        return False
-
     # Проверяем наличие строки в наборе всех известных часовых поясов IANA
-    return tz_str in pytz.all_timezones_set
+    return isinstance(tz_str, str) and tz_str in _ALL_TIMEZONES
 
 if __name__ == '__main__':
     # Пример использования функций валидации